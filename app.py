@@ -12,17 +12,18 @@ from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_jwt_extended import (
     JWTManager, create_access_token, create_refresh_token, jwt_required, 
-    get_jwt_identity, get_jwt
+    get_jwt_identity, get_jwt, decode_token
 )
 from flask_bcrypt import Bcrypt
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_talisman import Talisman
 import sqlite3
-import pickle
 import numpy as np
 import json
 import os
+import time
+import hmac
 from datetime import datetime, timedelta
 from functools import wraps
 from reportlab.lib.pagesizes import letter
@@ -32,6 +33,20 @@ from flask import send_file
 
 # Import new simulator service
 from simulator_service import BackgroundSimulator
+from subscriptions import SubscriptionTracker
+from persistence import ReadingWriter
+from replay import ReplaySource, DEFAULT_CSV
+from message_broker import make_client_manager
+from sharding import ShardRouter
+from green_runtime import HubMonitor, run_blocking
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache, CachedPredictor, DEFAULT_CACHE_TTL
+from inference_service import InferenceService
+from metrics import REGISTRY, CONTENT_TYPE, DB_QUERY_SECONDS
+from baseline_filter import BaselineFilter, GatedPredictor, AUDIT_EVERY
+import atexit
+import signal
+import sys
 
 # ==================== APP CONFIGURATION ====================
 app = Flask(__name__)
@@ -52,7 +67,15 @@ CORS(app,
      supports_credentials=True
 )
 
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+# Multi-worker mode (environment):
+#   MESSAGE_QUEUE=<url>            shared pub/sub queue: tcp://host:port (local message_broker.py) or redis://...
+#   WORKER_ID=<i> WORKER_COUNT=<n>  this worker's share of the pet_id hash ring
+#   PORT=<port>                    listen port (default 5000)
+MESSAGE_QUEUE = os.environ.get('MESSAGE_QUEUE')
+WORKER_ID = int(os.environ.get('WORKER_ID', 0))
+WORKER_COUNT = int(os.environ.get('WORKER_COUNT', 1))
+socketio_options = {'client_manager': make_client_manager(MESSAGE_QUEUE)} if MESSAGE_QUEUE else {}
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', **socketio_options)
 
 # MANUAL CORS OVERRIDE (Belt & Suspenders)
 @app.after_request
@@ -74,9 +97,6 @@ limiter = Limiter(
 # 4. BCRYPT HASHING
 bcrypt = Bcrypt(app)
 
-# Initialize Simulator
-simulator = BackgroundSimulator(socketio)
-
 # JWT Configuration
 app.config['JWT_SECRET_KEY'] = 'pet-health-monitor-secret-key-2024'  # Change in production
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=7)
@@ -86,6 +106,49 @@ jwt = JWTManager(app)
 DATABASE = os.path.join(os.path.dirname(__file__), 'pet_health.db')
 MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
 
+# Initialize Simulator
+# Live readings are persisted to health_readings in background batches; the
+# writer starts on the first reading, and exits flush what is still queued
+reading_writer = ReadingWriter(DATABASE)
+atexit.register(reading_writer.close)
+# Optional simulator modes (environment):
+#   SIM_SEED=<int>         reproducible per-pet streams
+#   SIM_REPLAY=<csv path>  replay recorded data ('1' = data/pet_health_data.csv), not persisted
+#   SIM_SPEED=<x>          replay speed vs. real time (0 = as fast as possible)
+#   SIM_ADAPTIVE=0         every pet at the full tick rate (no per-tier rates)
+simulator_options = {}
+# Optional out-of-process inference (environment):
+#   INFERENCE_WORKERS=<n>  run the models in n worker processes (0 = in this process)
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
+inference = InferenceService(INFERENCE_WORKERS, MODELS_DIR) if INFERENCE_WORKERS > 0 else None
+if inference:
+    simulator_options['inference'] = inference
+if os.environ.get('SIM_ADAPTIVE') == '0':
+    simulator_options['adaptive'] = False
+if os.environ.get('SIM_SEED'):
+    simulator_options['seed'] = int(os.environ['SIM_SEED'])
+if os.environ.get('SIM_REPLAY'):
+    replay_path = os.environ['SIM_REPLAY']
+    replay_source = ReplaySource.from_csv(DEFAULT_CSV if replay_path == '1' else replay_path)
+    replay_speed = float(os.environ.get('SIM_SPEED', 60))
+    simulator_options.update(
+        source=replay_source, tick_interval=replay_source.interval, n_buckets=1,
+        speed=replay_speed or None, start_time=replay_source.start_time
+    )
+# Simulations stop once their room has been empty for this many seconds
+app.config['STREAM_IDLE_GRACE_SECONDS'] = 30
+simulator = BackgroundSimulator(socketio, writer=reading_writer, **simulator_options)
+if MESSAGE_QUEUE and WORKER_COUNT > 1:
+    # Simulate only this worker's pets; other pets are forwarded to their owner
+    simulator = ShardRouter(simulator, socketio.server.manager, WORKER_ID, WORKER_COUNT)
+subscriptions = SubscriptionTracker(simulator, socketio, app.config['STREAM_IDLE_GRACE_SECONDS'])
+# Measures eventlet hub stalls (how late sleeping green threads wake up)
+hub_monitor = HubMonitor(socketio)
+# Statement kinds with their own DB_QUERY_SECONDS series
+DB_STATEMENTS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE'}
+# Optional bearer token for Prometheus scrapes of /api/metrics (vets' JWTs always work)
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+
 # Feature columns for ML prediction
 FEATURE_COLUMNS = [
     'hour_of_day', 'heart_rate', 'body_temperature', 'accel_magnitude',
@@ -93,14 +156,30 @@ FEATURE_COLUMNS = [
     'activity_level', 'step_count', 'sleep_indicator', 'movement_intensity',
     'distance_meters', 'calories_burned', 'stress_score', 'home_distance_m', 'geofence_alert'
 ]
+# Largest reading batch accepted by /api/predict/batch
+MAX_BATCH_READINGS = 10000
+# Most pets one subscribe_ward message may watch
+MAX_WARD_PETS = 200
 
 
 # ==================== DATABASE FUNCTIONS ====================
 
+class TimedConnection(sqlite3.Connection):
+    """Connection whose execute() is timed into DB_QUERY_SECONDS (up to the first row)."""
+
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            statement = sql.lstrip()[:6].upper()
+            DB_QUERY_SECONDS.labels(statement if statement in DB_STATEMENTS else 'OTHER').observe(
+                time.perf_counter() - start)
+
 def get_db():
     """Get database connection."""
     if 'db' not in g:
-        g.db = sqlite3.connect(DATABASE)
+        g.db = sqlite3.connect(DATABASE, factory=TimedConnection)
         g.db.row_factory = sqlite3.Row
     return g.db
 
@@ -270,29 +349,67 @@ def init_db():
 
 # ==================== ML MODEL LOADING ====================
 
+# Fused scaler/detector/classifier pipeline, set by load_models
+predictor = None
+# Optional prediction cache (environment):
+#   PREDICTION_CACHE_SIZE=<n>  keep up to n quantized readings' predictions (0 = off)
+#   PREDICTION_CACHE_TTL=<s>   seconds a cached prediction stays valid
+app.config['PREDICTION_CACHE_SIZE'] = int(os.environ.get('PREDICTION_CACHE_SIZE', 0))
+app.config['PREDICTION_CACHE_TTL'] = float(os.environ.get('PREDICTION_CACHE_TTL', DEFAULT_CACHE_TTL))
+prediction_cache = (PredictionCache(app.config['PREDICTION_CACHE_SIZE'], app.config['PREDICTION_CACHE_TTL'])
+                    if app.config['PREDICTION_CACHE_SIZE'] > 0 else None)
+# Optional per-pet baseline prefilter (environment):
+#   HEALTH_PREFILTER=1            answer readings inside their pet's usual range without the models
+#   HEALTH_PREFILTER_AUDIT=<n>    still run the models on every n-th reading of each pet
+app.config['HEALTH_PREFILTER'] = os.environ.get('HEALTH_PREFILTER') == '1'
+app.config['HEALTH_PREFILTER_AUDIT'] = int(os.environ.get('HEALTH_PREFILTER_AUDIT', AUDIT_EVERY))
+baseline_filter = (BaselineFilter(FEATURE_COLUMNS, audit_every=app.config['HEALTH_PREFILTER_AUDIT'])
+                   if app.config['HEALTH_PREFILTER'] else None)
+# predictor behind baseline_filter, for readings that name their pet
+gated_predictor = None
+# Versioned models, swapped in without a restart (environment):
+#   MODEL_REGISTRY=<dir>         published versions (python model_registry.py publishes models/)
+#   MODEL_RELOAD_INTERVAL=<s>    seconds between checks for a newer version (0 = off)
+app.config['MODEL_REGISTRY'] = os.environ.get('MODEL_REGISTRY', os.path.join(MODELS_DIR, 'registry'))
+app.config['MODEL_RELOAD_INTERVAL'] = float(os.environ.get('MODEL_RELOAD_INTERVAL', 30))
+model_registry = ModelRegistry(app.config['MODEL_REGISTRY'], MODELS_DIR, FEATURE_COLUMNS, inference)
+
+def install_models(version):
+    """Point predictions and the simulator at a version the registry just swapped in."""
+    global predictor, gated_predictor
+    health = version.health
+    if prediction_cache:
+        prediction_cache.bind(version.fingerprint)  # Cleared if the models changed
+        health = CachedPredictor(health, prediction_cache, version.fingerprint)
+    gated = GatedPredictor(health, baseline_filter) if baseline_filter else None
+    # Calls already running keep the objects they read; new ones get these
+    predictor, gated_predictor = health, gated
+    if version.trend is not None:
+        simulator.swap_model(version.trend)
+    print(f"[OK] Serving model version {version.name} ({version.fingerprint})")
+
+model_registry.on_swap(install_models)
+
 def load_models():
-    """Load trained ML models."""
-    global scaler, anomaly_detector, classifier, label_encoder
-    
+    """Serve the newest published model version (else the models in MODELS_DIR)."""
     print("Loading ML models...")
     try:
-        with open(os.path.join(MODELS_DIR, 'scaler.pkl'), 'rb') as f:
-            scaler = pickle.load(f)
-        with open(os.path.join(MODELS_DIR, 'anomaly_detector.pkl'), 'rb') as f:
-            anomaly_detector = pickle.load(f)
-        with open(os.path.join(MODELS_DIR, 'disease_classifier.pkl'), 'rb') as f:
-            classifier = pickle.load(f)
-        with open(os.path.join(MODELS_DIR, 'label_encoder.pkl'), 'rb') as f:
-            label_encoder = pickle.load(f)
-        print("[OK] ML models loaded")
+        model_registry.activate()
     except Exception as e:
         print(f"[WARNING] ML models not found: {e}. Skipping prediction logic.")
-        scaler = None
+
+def watch_models():
+    """Background task: swap in newly published model versions."""
+    while True:
+        socketio.sleep(app.config['MODEL_RELOAD_INTERVAL'])
+        # Stays on this green thread: the registry sends only local loading and
+        # warm-up to an OS thread, and inference workers must be awaited here
+        model_registry.check()
 
 
 def predict_health(data: dict) -> dict:
     """Make health predictions from sensor data."""
-    if not scaler:
+    if not predictor:
         return {
             'health_status': 'unknown', 'health_score': 0, 
             'is_anomaly': False, 'anomaly_score': 0, 'confidence': 0,
@@ -300,38 +417,127 @@ def predict_health(data: dict) -> dict:
         }
 
     features = np.array([[data.get(col, 0) for col in FEATURE_COLUMNS]])
-    features_scaled = scaler.transform(features)
-    
-    # Anomaly detection
-    anomaly_pred = anomaly_detector.predict(features_scaled)[0]
-    anomaly_score_raw = anomaly_detector.score_samples(features_scaled)[0]
-    anomaly_score = max(0, min(100, 50 - anomaly_score_raw * 100))
-    
-    # Disease classification
-    disease_pred = classifier.predict(features_scaled)[0]
-    disease_proba = classifier.predict_proba(features_scaled)[0]
-    disease_label = label_encoder.inverse_transform([disease_pred])[0]
-    confidence = float(max(disease_proba))
-    
-    is_anomaly = anomaly_pred == -1
-    
-    # Health score
-    if disease_label == 'healthy':
-        health_score = min(100, max(50, 100 - anomaly_score))
+    if gated_predictor and data.get('pet_id') is not None:
+        return gated_predictor.predict(features, [data['pet_id']])[0]
+    return predictor.predict(features)[0]
+
+
+def predict_health_batch(features: np.ndarray, pet_ids: list = None) -> list:
+    """Predictions for an (n, 18) matrix of readings; same dicts as predict_health."""
+    if not predictor:
+        return [predict_health({}) for _ in range(len(features))]
+    if gated_predictor and pet_ids:
+        return gated_predictor.predict(features, pet_ids)
+    return predictor.predict(features)
+
+
+def parse_reading_batch(payload) -> np.ndarray:
+    """
+    Feature matrix from a batch payload: a list of reading dicts (bare or as
+    {"readings": [...]}) or columnar {"columns": {"heart_rate": [...], ...}}.
+    Missing features default to 0, as in predict_health. Raises ValueError.
+    """
+    if isinstance(payload, dict) and 'columns' in payload:
+        columns = payload['columns']
+        if not isinstance(columns, dict):
+            raise ValueError('columns must map feature names to lists')
+        lengths = {len(v) for k, v in columns.items() if k in FEATURE_COLUMNS and isinstance(v, list)}
+        if len(lengths) != 1:
+            raise ValueError('columns must be lists of equal length')
+        n = lengths.pop()
+        rows = np.array([columns.get(col, [0] * n) for col in FEATURE_COLUMNS], dtype=np.float64).T
     else:
-        health_score = max(0, 100 - anomaly_score - (1 - confidence) * 30)
-    
-    return {
-        'health_status': disease_label,
-        'health_score': round(health_score, 1),
-        'is_anomaly': is_anomaly,
-        'anomaly_score': round(anomaly_score, 1),
-        'confidence': round(confidence * 100, 1),
-        'class_probabilities': {
-            label_encoder.classes_[i]: round(float(p) * 100, 1)
-            for i, p in enumerate(disease_proba)
-        }
-    }
+        readings = payload.get('readings') if isinstance(payload, dict) else payload
+        if not isinstance(readings, list) or not all(isinstance(r, dict) for r in readings):
+            raise ValueError('readings must be a list of objects')
+        rows = np.array([[r.get(col, 0) for col in FEATURE_COLUMNS] for r in readings],
+                        dtype=np.float64).reshape(len(readings), len(FEATURE_COLUMNS))
+
+    if len(rows) == 0:
+        raise ValueError('no readings')
+    if len(rows) > MAX_BATCH_READINGS:
+        raise ValueError(f'at most {MAX_BATCH_READINGS} readings per batch')
+    if not np.isfinite(rows).all():
+        raise ValueError('readings must be finite numbers')
+    return rows
+
+
+def is_pet_id_list(pet_ids):
+    return isinstance(pet_ids, list) and all(isinstance(p, int) and not isinstance(p, bool) for p in pet_ids)
+
+
+def accessible_pet_ids(user_id, pet_ids):
+    """The ids in pet_ids of existing pets user_id may see: their own, or any pet for vets."""
+    distinct = set(pet_ids)
+    if not distinct:
+        return set()
+    db = get_db()
+    user = db.execute('SELECT role FROM users WHERE id = ?', (user_id,)).fetchone()
+    query = f"SELECT id FROM pets WHERE id IN ({','.join('?' * len(distinct))})"
+    params = list(distinct)
+    if not user or user['role'] != 'vet':
+        query += ' AND owner_id = ?'
+        params.append(user_id)
+    return {row['id'] for row in db.execute(query, params).fetchall()}
+
+
+def parse_batch_pet_ids(payload, n: int):
+    """
+    Pet id of every reading in a batch payload, or None unless each one is
+    the id of a pet the caller may see (their own; any pet for vets). Ids
+    reach the per-pet baselines, so made-up ones must not.
+    """
+    if isinstance(payload, dict) and 'columns' in payload:
+        pet_ids = payload['columns'].get('pet_id')
+    else:
+        readings = payload.get('readings') if isinstance(payload, dict) else payload
+        pet_ids = [r.get('pet_id') for r in readings]
+    if not is_pet_id_list(pet_ids) or len(pet_ids) != n:
+        return None
+    return pet_ids if accessible_pet_ids(get_jwt_identity(), pet_ids) == set(pet_ids) else None
+
+
+# ==================== METRICS ====================
+
+# Gauges and counters read from the components' get_stats() at scrape time
+REGISTRY.gauge('petmon_active_simulations', 'Pets being simulated',
+               lambda: simulator.get_stats()['active_pets'])
+REGISTRY.gauge('petmon_simulated_pets', 'Simulated pets per tick-rate tier',
+               lambda: simulator.get_stats()['tiers'], ['tier'])
+REGISTRY.gauge('petmon_shed_level', 'Simulator load-shedding level',
+               lambda: simulator.get_stats()['shed_level'])
+REGISTRY.counter('petmon_simulator_events_total', 'Simulator sub-ticks, overruns and shed inferences',
+                 lambda: {k: v for k, v in simulator.get_stats().items()
+                          if k in ('ticks', 'overruns', 'skipped_ticks', 'inferences_shed')}, ['event'])
+REGISTRY.gauge('petmon_stream_rooms', 'Pet rooms and wards with listeners',
+               lambda: {kind: len(rooms) for kind, rooms in subscriptions.listener_counts().items()
+                        if kind in ('rooms', 'wards')}, ['kind'])
+REGISTRY.gauge('petmon_stream_listeners', 'Listeners across all pet rooms',
+               lambda: sum(subscriptions.listener_counts()['rooms'].values()))
+REGISTRY.gauge('petmon_fanout_pending', 'Frames held back for slow socket clients',
+               lambda: simulator.fanout.get_stats()['totals']['pending'])
+REGISTRY.gauge('petmon_writer_queue_depth', 'Readings waiting for the SQLite writer',
+               lambda: reading_writer.get_stats()['queue_depth'])
+REGISTRY.counter('petmon_writer_readings_total', 'Readings queued, written, dropped and failed',
+                 lambda: {k: v for k, v in reading_writer.get_stats().items()
+                          if k in ('queued', 'written', 'dropped', 'failed')}, ['outcome'])
+REGISTRY.gauge('petmon_inference_queue_depth', 'Inference requests waiting for a batch, and tasks in flight',
+               lambda: {'pending': inference.get_stats()['pending'],
+                        'in_flight': inference.get_stats()['in_flight']} if inference else {}, ['queue'])
+REGISTRY.gauge('petmon_hub_lag_seconds', 'Recent eventlet hub wakeup lag',
+               lambda: {q: ms / 1000 for q, ms in hub_monitor.get_stats().get('lag_ms', {}).items()},
+               ['quantile'])
+REGISTRY.counter('petmon_prediction_cache_total', 'Prediction cache hits and misses',
+                 lambda: {k: prediction_cache.get_stats()[k] for k in ('hits', 'misses')}
+                 if prediction_cache else {}, ['result'])
+REGISTRY.counter('petmon_prefilter_readings_total', 'Readings screened by the baselines or escalated, by reason',
+                 lambda: {k: baseline_filter.get_stats()[k]
+                          for k in ('screened', 'warmup', 'unresolved', 'deviations', 'audits')}
+                 if baseline_filter else {}, ['outcome'])
+
+
+def metrics_response():
+    return app.response_class(REGISTRY.render(), content_type=CONTENT_TYPE)
 
 
 # ==================== ROLE DECORATORS ====================
@@ -360,8 +566,9 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected:', request.sid)
-    # Note: We don't automatically stop simulations here because other clients might be listening
-    # Logic to stop simulation could be added if we track active listeners count
+    # Simulations with no listeners left are stopped after the grace period
+    subscriptions.disconnect(request.sid)
+    simulator.fanout.forget(request.sid)
 
 @socketio.on('subscribe_pet')
 def handle_subscribe_pet(data):
@@ -370,20 +577,149 @@ def handle_subscribe_pet(data):
     if not pet_id:
         return
     
+    # Opt-in: 'compact' receives binary live_reading_compact keyframe/delta frames
+    compact = data.get('encoding') == 'compact'
     print(f"Client {request.sid} subscribing to pet {pet_id}")
-    join_room(f"pet_{pet_id}")
+    join_room(f"pet_{pet_id}:compact" if compact else f"pet_{pet_id}")
     
     # Start simulation for this pet if not already running
-    simulator.start_simulation(pet_id)
-    emit('status', {'msg': f'Subscribed to pet {pet_id}'})
+    subscriptions.subscribe(request.sid, pet_id, compact)
+    emit('status', {'msg': f'Subscribed to pet {pet_id}', 'encoding': 'compact' if compact else 'json'})
 
 @socketio.on('unsubscribe_pet')
 def handle_unsubscribe_pet(data):
     pet_id = data.get('pet_id')
     if pet_id:
         leave_room(f"pet_{pet_id}")
+        leave_room(f"pet_{pet_id}:compact")
+        subscriptions.unsubscribe(request.sid, pet_id)
         emit('status', {'msg': f'Unsubscribed form pet {pet_id}'})
 
+@socketio.on('subscribe_ward')
+def handle_subscribe_ward(data):
+    """
+    Client requests one columnar ward_snapshot per tick for a set of pets.
+    Every id starts a simulation, so the message carries the caller's access
+    token and is refused unless each pet is one the caller may see.
+    """
+    ward_id = data.get('ward_id')
+    pet_ids = data.get('pet_ids') or []
+    if not ward_id:
+        return
+    if not is_pet_id_list(pet_ids) or len(pet_ids) > MAX_WARD_PETS:
+        emit('status', {'msg': f'pet_ids must be a list of at most {MAX_WARD_PETS} pet ids', 'error': True})
+        return
+    try:
+        user_id = decode_token(data.get('token') or '')['sub']
+    except Exception:
+        emit('status', {'msg': 'A valid access token is required to watch a ward', 'error': True})
+        return
+    if accessible_pet_ids(user_id, pet_ids) != set(pet_ids):
+        emit('status', {'msg': 'Unknown pet ids in ward', 'error': True})
+        return
+
+    print(f"Client {request.sid} watching ward {ward_id} ({len(pet_ids)} pets)")
+    subscriptions.subscribe_ward(request.sid, ward_id, pet_ids)
+    emit('status', {'msg': f'Subscribed to ward {ward_id}'})
+
+@socketio.on('unsubscribe_ward')
+def handle_unsubscribe_ward(data):
+    ward_id = data.get('ward_id')
+    if ward_id:
+        subscriptions.unsubscribe_ward(request.sid, ward_id)
+        emit('status', {'msg': f'Unsubscribed from ward {ward_id}'})
+
+@app.route('/api/stream/listeners', methods=['GET'])
+@vet_required
+def get_stream_listeners():
+    """Active socket listeners per pet room."""
+    return jsonify(subscriptions.listener_counts())
+
+@app.route('/api/stream/pets/<int:pet_id>/priority', methods=['PUT'])
+@vet_required
+def set_stream_priority(pet_id):
+    """Pin a live pet to the 'critical' (1 Hz) or 'stable' (0.1 Hz) tick rate, or 'auto'."""
+    priority = (request.get_json() or {}).get('priority')
+    if priority not in ('critical', 'stable', 'auto'):
+        return jsonify({'error': "priority must be 'critical', 'stable' or 'auto'"}), 400
+    if not simulator.set_priority(pet_id, None if priority == 'auto' else priority):
+        return jsonify({'error': 'Pet is not being simulated'}), 404
+    return jsonify({'pet_id': pet_id, 'priority': priority})
+
+@app.route('/api/stream/stats', methods=['GET'])
+@vet_required
+def get_stream_stats():
+    """Scheduler, persistence and event-loop health of the live stream."""
+    return jsonify({
+        'simulator': simulator.get_stats(),
+        'writer': reading_writer.get_stats(),
+        'hub': hub_monitor.get_stats(),
+        'inference': inference.get_stats() if inference else None
+    })
+
+@app.route('/api/predict/cache', methods=['GET'])
+@vet_required
+def get_prediction_cache_stats():
+    """Hit, miss and eviction counters of the prediction cache."""
+    if not prediction_cache:
+        return jsonify({'enabled': False})
+    return jsonify(dict(prediction_cache.get_stats(), enabled=True))
+
+@app.route('/api/predict/prefilter', methods=['GET'])
+@vet_required
+def get_prefilter_stats():
+    """Readings screened by the per-pet baselines and readings escalated to the models, by reason."""
+    if not baseline_filter:
+        return jsonify({'enabled': False})
+    return jsonify(dict(baseline_filter.get_stats(), enabled=True))
+
+@app.route('/api/models', methods=['GET'])
+@vet_required
+def get_model_versions():
+    """Serving and previous model versions, published versions and swap counters."""
+    return jsonify(model_registry.get_stats())
+
+@app.route('/api/models/activate', methods=['POST'])
+@vet_required
+def activate_model_version():
+    """Load, warm and swap in a published version (default: the newest)."""
+    version = (request.get_json(silent=True) or {}).get('version')
+    try:
+        loaded = model_registry.activate(version)
+    except KeyError:
+        return jsonify({'error': f'Unknown model version {version}'}), 404
+    except Exception as e:
+        return jsonify({'error': f'Model version not activated: {e}'}), 500
+    return jsonify(loaded.describe())
+
+@app.route('/api/models/rollback', methods=['POST'])
+@vet_required
+def rollback_model_version():
+    """Serve the previous model version again."""
+    try:
+        version = model_registry.rollback()
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(version.describe())
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text metrics: stage latency histograms, queue depths, room counts."""
+    token = app.config['METRICS_TOKEN']
+    if token and hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return metrics_response()
+    return get_metrics_as_vet()
+
+@vet_required
+def get_metrics_as_vet():
+    return metrics_response()
+
+@app.route('/api/stream/clients', methods=['GET'])
+@vet_required
+def get_stream_clients():
+    """Per-connection delivery counters (frames sent, deferred and conflated for slow clients)."""
+    return jsonify(simulator.fanout.get_stats())
+
 
 # ==================== REST AUTH ENDPOINTS ====================
 
@@ -704,6 +1040,31 @@ def get_latest_reading(pet_id):
     reading = db.execute('SELECT * FROM health_readings WHERE pet_id = ? ORDER BY timestamp DESC LIMIT 1', (pet_id,)).fetchone()
     return jsonify(dict(reading)) if reading else (jsonify({'error': 'No readings'}), 404)
 
+# Short-term backfill for live charts, served from the simulator's ring buffer
+@app.route('/api/health/<int:pet_id>/live', methods=['GET'])
+@jwt_required()
+def get_live_backfill(pet_id):
+    limit = request.args.get('limit', None, type=int)
+    return jsonify(simulator.get_recent_readings(pet_id, limit))
+
+# Gateways upload many collar readings at once; the models run once per batch
+@app.route('/api/predict/batch', methods=['POST'])
+@jwt_required()
+def predict_batch():
+    payload = request.get_json(silent=True)
+    try:
+        features = parse_reading_batch(payload)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid batch: {e}'}), 400
+    # Readings that name their pet can be screened against its baseline
+    pet_ids = parse_batch_pet_ids(payload, len(features)) if baseline_filter else None
+    # Off the hub, so a large batch does not stall sockets and other requests
+    if inference:
+        predictions = predict_health_batch(features, pet_ids)  # Waits on the inference workers, not the hub
+    else:
+        predictions = run_blocking(predict_health_batch, features, pet_ids)
+    return jsonify({'count': len(predictions), 'predictions': predictions})
+
 
 # ==================== ALERTS & VET ENDPOINTS ====================
 
@@ -884,13 +1245,35 @@ def ratelimit_handler(e):
 
 # ==================== MAIN ====================
 
+def handle_sigterm(signum, frame):
+    """
+    Exit the way Ctrl+C does: SystemExit unwinds socketio.run, then the atexit
+    handlers (reading_writer.close's final flush, inference.stop) run on the
+    main thread. The handler itself runs inside the eventlet hub, where
+    close() could not wait for the flush thread.
+    """
+    sys.exit(0)
+
+
 if __name__ == '__main__':
     print("=" * 60)
     print("Pet Health Monitoring API v2.0 (Real-Time + Secured)")
     print("============================================================")
     init_db()
     load_models()
+    # run_workers.py stops workers with SIGTERM, which skips atexit by default
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    hub_monitor.start()
+    if app.config['MODEL_RELOAD_INTERVAL'] > 0:
+        socketio.start_background_task(watch_models)
+    if inference:
+        atexit.register(inference.stop)
+    if isinstance(simulator, ShardRouter):
+        simulator.start()
+        print(f"[INFO] Worker {WORKER_ID}/{WORKER_COUNT} on queue {MESSAGE_QUEUE}")
     print("\\n[INFO] Starting WebSocket Server with Rate Limiting & BCrypt...")
     # Use socketio.run instead of app.run
     # DEBUG=True is kept for Development. In Prod, set to False.
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # The reloader would fork a second copy of every worker, so only single-process mode uses it
+    socketio.run(app, debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)),
+                 use_reloader=WORKER_COUNT == 1)
\ No newline at end of file
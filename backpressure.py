@@ -0,0 +1,120 @@
+"""
+Per-client backpressure for live streams.
+Room emits go through ClientFanout, which checks every recipient's
+engine.io outbound queue first. Clients whose queue is full are skipped
+and keep only the latest undelivered frame per room (latest value wins),
+which is sent once their queue drains. A slow connection therefore holds
+at most MAX_CLIENT_BACKLOG queued packets plus one pending frame per room.
+"""
+import threading
+
+# Outbound packets a client may have queued before frames are conflated
+MAX_CLIENT_BACKLOG = 8
+# Pending frames are delivered once the queue is back down to this
+RESUME_BACKLOG = 4
+
+NAMESPACE = '/'
+
+
+class ClientFanout:
+    def __init__(self, socketio, max_backlog=MAX_CLIENT_BACKLOG, resume_backlog=RESUME_BACKLOG):
+        self.socketio = socketio
+        self.max_backlog = max_backlog
+        self.resume_backlog = resume_backlog
+        self.pending = {}  # {sid: {room: (event, data)}} latest undelivered frame per room
+        self.clients = {}  # {sid: {'sent', 'conflated', 'deferred'}}
+        self.lock = threading.Lock()
+        # Sharded workers: every worker delivers to its own clients, so skip the queue
+        self.local_only = False
+
+    def _backlog(self, eio_sid):
+        """Packets waiting in the client's engine.io queue (None if gone)."""
+        sock = self.socketio.server.eio.sockets.get(eio_sid)
+        return sock.queue.qsize() if sock is not None else None
+
+    def _counters(self, sid):
+        # Caller holds self.lock
+        counters = self.clients.get(sid)
+        if counters is None:
+            counters = self.clients[sid] = {'sent': 0, 'conflated': 0, 'deferred': 0}
+        return counters
+
+    def emit(self, event, data, room, resync=None):
+        """
+        Emit to every client in room that keeps up; park the frame for the rest.
+        For stateful streams (compact deltas) pass resync, a callable returning
+        the frame that brings a lagging client back in sync; it is called when
+        the parked frame is finally delivered instead of sending a stale delta.
+        """
+        server = self.socketio.server
+        if server is None:
+            return
+        participants = list(server.manager.get_participants(NAMESPACE, room))
+        if not participants:
+            return
+
+        slow = []
+        with self.lock:
+            for sid, eio_sid in participants:
+                counters = self._counters(sid)
+                parked = self.pending.get(sid)
+                backlog = self._backlog(eio_sid)
+                if backlog is None:
+                    continue  # Disconnecting; nothing will be delivered
+                if backlog < self.max_backlog and not (parked and room in parked):
+                    counters['sent'] += 1
+                    continue
+                slow.append(sid)
+                parked = self.pending.setdefault(sid, {})
+                if room in parked:
+                    counters['conflated'] += 1  # Older frame replaced, never sent
+                else:
+                    counters['deferred'] += 1
+                parked[room] = (event, resync if resync is not None else data)
+
+        self.socketio.emit(event, data, to=room, skip_sid=slow or None, ignore_queue=self.local_only)
+
+    def flush(self):
+        """Deliver parked frames to clients whose queue has drained."""
+        if not self.pending:
+            return
+        server = self.socketio.server
+        ready = []
+        with self.lock:
+            for sid in list(self.pending):
+                eio_sid = server.manager.eio_sid_from_sid(sid, NAMESPACE)
+                backlog = self._backlog(eio_sid) if eio_sid is not None else None
+                if backlog is None:
+                    del self.pending[sid]  # Client is gone
+                elif backlog <= self.resume_backlog:
+                    ready.append((sid, self.pending.pop(sid)))
+                    self._counters(sid)['sent'] += len(ready[-1][1])
+
+        for sid, frames in ready:
+            for event, data in frames.values():
+                if callable(data):
+                    data = data()  # Resync frame; None if there is nothing to resync from
+                if data is not None:
+                    self.socketio.emit(event, data, to=sid, ignore_queue=self.local_only)
+
+    def forget(self, sid):
+        """Drop the state of a disconnected client."""
+        with self.lock:
+            self.pending.pop(sid, None)
+            self.clients.pop(sid, None)
+
+    def get_stats(self):
+        """Per-connection delivery counters plus totals."""
+        with self.lock:
+            clients = {
+                sid: dict(counters, pending=len(self.pending.get(sid, ())))
+                for sid, counters in self.clients.items()
+            }
+        totals = {key: sum(c[key] for c in clients.values())
+                  for key in ('sent', 'conflated', 'deferred', 'pending')}
+        return {
+            'max_backlog': self.max_backlog,
+            'slow_clients': sum(1 for c in clients.values() if c['pending']),
+            'totals': totals,
+            'clients': clients
+        }
@@ -0,0 +1,176 @@
+"""
+Per-pet baseline prefilter for the health models.
+Most readings sit inside the pet's own normal range, yet each one pays for
+the IsolationForest and the classifier. BaselineFilter keeps exponentially
+weighted means and variances of a few vitals per pet and hour of day (the
+daily rhythm moves heart rate and activity far more than illness does),
+and an EWMA of each reading's z-scores to catch sustained drifts. A reading
+is escalated to the full models only when:
+  - its pet's hour slot is still warming up, or this is an audit sample
+  - the pet's last full prediction was not healthy
+  - a single z-score exceeds READING_Z, or the z-score trend exceeds TREND_Z
+Every other reading is answered from the pet's last full prediction.
+Baselines learn only from readings the models did not call ill, so a long
+illness does not become the pet's new normal. Each reading costs O(1).
+"""
+import math
+from collections import OrderedDict
+
+from green_runtime import os_lock
+
+# Vitals tracked per pet; illnesses move these away from the pet's baseline
+BASELINE_VITALS = ('heart_rate', 'body_temperature', 'activity_level', 'stress_score')
+HOURS = 24
+
+BASELINE_ALPHA = 0.05   # Weight of a new reading in its hour slot's mean/variance
+TREND_ALPHA = 0.1       # Weight of a new reading in the z-score trend
+READING_Z = 4.5         # Escalate on one reading this far from the baseline
+TREND_Z = 3.0           # Escalate when the z-score trend is this many of its std devs off
+Z_CLIP = 6.0            # One wild reading moves the trend by at most this
+WARMUP_READINGS = 8     # Readings per hour slot before it screens anything
+AUDIT_EVERY = 64        # Escalate every n-th reading of a pet regardless
+MAX_PETS = 10000        # Baselines kept; the least recently screened pet is dropped first
+
+
+class PetBaseline:
+    """Baseline state of one pet: per-hour means/variances, z-score trend, last prediction."""
+
+    def __init__(self, n_vitals):
+        self.mean = [[0.0] * n_vitals for _ in range(HOURS)]
+        self.var = [[0.0] * n_vitals for _ in range(HOURS)]
+        self.count = [0] * HOURS
+        self.trend = [0.0] * n_vitals
+        self.readings = 0
+        self.last = None  # Last full prediction
+
+
+class BaselineFilter:
+    def __init__(self, feature_columns, vitals=BASELINE_VITALS, reading_z=READING_Z,
+                 trend_z=TREND_Z, alpha=BASELINE_ALPHA, trend_alpha=TREND_ALPHA,
+                 warmup=WARMUP_READINGS, audit_every=AUDIT_EVERY, max_pets=MAX_PETS):
+        self.hour_index = feature_columns.index('hour_of_day')
+        self.vital_index = [feature_columns.index(v) for v in vitals]
+        self.reading_z = reading_z
+        self.alpha = alpha
+        self.trend_alpha = trend_alpha
+        # Stationary std dev of an EWMA of unit-variance z-scores
+        self.trend_limit = trend_z * math.sqrt(trend_alpha / (2 - trend_alpha))
+        self.warmup = warmup
+        self.audit_every = audit_every
+        self.max_pets = max_pets
+        self.pets = OrderedDict()  # {pet_id: PetBaseline}, least recently screened first
+        self.lock = os_lock()
+        self.stats = {'readings': 0, 'screened': 0, 'escalated': 0, 'warmup': 0, 'audits': 0,
+                      'unresolved': 0, 'deviations': 0, 'evicted': 0}
+
+    def screen(self, pet_id, row):
+        """Reason to run the full models on this reading, or None if the baseline covers it."""
+        with self.lock:
+            pet = self.pets.get(pet_id)
+            if pet is None:
+                pet = self.pets[pet_id] = PetBaseline(len(self.vital_index))
+                if len(self.pets) > self.max_pets:
+                    self.pets.popitem(last=False)
+                    self.stats['evicted'] += 1
+            else:
+                self.pets.move_to_end(pet_id)
+            hour = int(row[self.hour_index]) % HOURS
+            mean, var, trend = pet.mean[hour], pet.var[hour], pet.trend
+            warm = pet.count[hour] >= self.warmup
+            deviation = False
+            if warm:
+                for i, column in enumerate(self.vital_index):
+                    z = (row[column] - mean[i]) / (math.sqrt(var[i]) or 1.0)
+                    deviation |= abs(z) > self.reading_z
+                    trend[i] += self.trend_alpha * (max(-Z_CLIP, min(Z_CLIP, z)) - trend[i])
+                    deviation |= abs(trend[i]) > self.trend_limit
+            pet.readings += 1
+
+            if not warm:
+                reason = 'warmup'
+            elif pet.last is None or pet.last['health_status'] != 'healthy':
+                reason = 'unresolved'
+            elif deviation:
+                reason = 'deviations'
+            elif pet.readings % self.audit_every == 0:
+                reason = 'audits'
+            else:
+                reason = None
+            self.stats['readings'] += 1
+            self.stats[reason or 'screened'] += 1
+            if reason:
+                self.stats['escalated'] += 1
+            return reason
+
+    def learn(self, pet_id, row, prediction=None):
+        """Fold a reading into its hour slot; prediction is the full result when it was escalated."""
+        with self.lock:
+            pet = self.pets.get(pet_id)
+            if pet is None:
+                return  # Evicted since it was screened
+            if prediction is not None:
+                pet.last = prediction
+                if prediction['health_status'] != 'healthy':
+                    return
+            hour = int(row[self.hour_index]) % HOURS
+            mean, var = pet.mean[hour], pet.var[hour]
+            # Plain running mean until the slot has 1/alpha readings, then EWMA
+            pet.count[hour] += 1
+            weight = max(self.alpha, 1.0 / pet.count[hour])
+            for i, column in enumerate(self.vital_index):
+                diff = row[column] - mean[i]
+                mean[i] += weight * diff
+                var[i] = (1 - weight) * (var[i] + weight * diff * diff)
+
+    def last_prediction(self, pet_id):
+        with self.lock:
+            pet = self.pets.get(pet_id)
+            return pet.last if pet is not None else None
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats, pets=len(self.pets))
+        stats['escalation_rate'] = round(stats['escalated'] / stats['readings'], 4) if stats['readings'] else 0.0
+        return stats
+
+
+def _copy(prediction, **changes):
+    # The filter keeps the last prediction; callers may modify what they get back
+    return dict(prediction, class_probabilities=dict(prediction['class_probabilities']), **changes)
+
+
+class GatedPredictor:
+    """HealthPredictor.predict behind a BaselineFilter; rows need their pet ids."""
+
+    def __init__(self, predictor, baselines):
+        self.predictor = predictor
+        self.baselines = baselines
+
+    def predict(self, features, pet_ids):
+        """
+        One prediction dict per row, each with 'screened': True when it is the
+        pet's last full prediction rather than a new one. Rows of one batch are
+        all screened against the baselines as they were before the batch.
+        """
+        rows = features.tolist()
+        escalated = [i for i, (pet_id, row) in enumerate(zip(pet_ids, rows))
+                     if self.baselines.screen(pet_id, row)]
+        full = [None] * len(rows)
+        if escalated:
+            for i, prediction in zip(escalated, self.predictor.predict(features[escalated])):
+                full[i] = prediction
+        results = []
+        for i, (pet_id, row, prediction) in enumerate(zip(pet_ids, rows, full)):
+            self.baselines.learn(pet_id, row, prediction)
+            if prediction is not None:
+                results.append(_copy(prediction, screened=False))
+                continue
+            last = self.baselines.last_prediction(pet_id)
+            if last is None:
+                # Baseline evicted since screening: run the models after all
+                last = self.predictor.predict(features[i:i + 1])[0]
+                results.append(_copy(last, screened=False))
+            else:
+                # Within the pet's normal range: not an anomaly, whatever the last reading was
+                results.append(_copy(last, is_anomaly=False, screened=True))
+        return results
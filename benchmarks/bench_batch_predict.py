@@ -0,0 +1,65 @@
+"""
+Batch Prediction Benchmark
+==========================
+Readings per second through app.predict_health (one call per reading, as
+a single-reading API would make) versus app.predict_health_batch (one
+pass of the scaler, anomaly detector and classifier per batch), over
+readings from data/pet_health_data.csv.
+
+Usage: python benchmarks/bench_batch_predict.py [models_dir]
+"""
+import os
+import sys
+import time
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+import app
+
+DATA_PATH = os.path.join(ROOT_DIR, 'data', 'pet_health_data.csv')
+BATCH_SIZES = [1, 16, 64, 256, 1024, 4096]
+# Readings pushed through the single-reading path
+SINGLE_READINGS = 500
+
+
+def main(models_dir=None):
+    if models_dir:
+        app.MODELS_DIR = models_dir
+    app.load_models()
+    if not app.predictor:
+        print("Models missing; pass a models directory with disease_classifier.pkl")
+        return
+
+    readings = pd.read_csv(DATA_PATH)[app.FEATURE_COLUMNS]
+    records = readings.head(SINGLE_READINGS).to_dict('records')
+    matrix = readings.to_numpy(dtype=float)
+
+    # Same answers both ways (the batch path returns plain bools)
+    for record, batched in zip(records[:50], app.predict_health_batch(matrix[:50])):
+        single = app.predict_health(record)
+        single['is_anomaly'] = bool(single['is_anomaly'])
+        assert single == batched, (single, batched)
+
+    start = time.perf_counter()
+    for record in records:
+        app.predict_health(record)
+    single_rate = len(records) / (time.perf_counter() - start)
+
+    print(f"{'path':<16} | {'batch':>5} | {'readings/s':>11} | {'speedup':>7}")
+    print("-" * 50)
+    print(f"{'predict_health':<16} | {1:>5} | {single_rate:>11,.0f} | {1.0:>6.1f}x")
+    for size in BATCH_SIZES:
+        batches = [matrix[i:i + size] for i in range(0, len(matrix) - size + 1, size)]
+        done, start = 0, time.perf_counter()
+        for batch in batches:
+            app.predict_health_batch(batch)
+            done += len(batch)
+            if time.perf_counter() - start > 2.0:
+                break
+        rate = done / (time.perf_counter() - start)
+        print(f"{'batch':<16} | {size:>5} | {rate:>11,.0f} | {rate / single_rate:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,66 @@
+"""
+Rolling Feature Extraction Benchmark
+====================================
+Rows per second of the trend-classifier features in batch mode
+(rolling_features.extract_rolling_features, NumPy over blocks of rows)
+versus the pandas rolling() code training used before, over synthetic
+streams of up to millions of readings, plus the grouped batch (one window
+per pet) and the incremental mode the simulator serves with.
+
+Usage: python benchmarks/bench_feature_extraction.py [max_rows]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rolling_features import RollingFeatures, extract_rolling_features
+from verify_feature_parity import pandas_features
+
+ROW_COUNTS = [100_000, 1_000_000, 5_000_000]
+PETS = 1000
+INCREMENTAL_SLOTS = 1000
+
+
+def readings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'heart_rate': rng.normal(95, 15, n).round(1),
+        'body_temperature': rng.normal(38.4, 0.3, n).round(2),
+        'stress_score': rng.uniform(0, 100, n).round(1),
+        'pet_id': np.repeat(np.arange(PETS), -(-n // PETS))[:n]
+    })
+
+
+def rate(fn, rows):
+    start = time.perf_counter()
+    fn()
+    return rows / (time.perf_counter() - start)
+
+
+def main(max_rows=None):
+    counts = [n for n in ROW_COUNTS if max_rows is None or n <= int(max_rows)]
+    print(f"{'rows':>9} | {'pandas rows/s':>13} | {'batch rows/s':>12} | {'speedup':>7} | {'grouped rows/s':>14}")
+    print("-" * 70)
+    for n in counts:
+        df = readings(n)
+        pandas_rate = rate(lambda: pandas_features(df), n)
+        batch_rate = rate(lambda: extract_rolling_features(df), n)
+        grouped_rate = rate(lambda: extract_rolling_features(df, group_column='pet_id'), n)
+        print(f"{n:>9,} | {pandas_rate:>13,.0f} | {batch_rate:>12,.0f} | {batch_rate / pandas_rate:>6.1f}x | "
+              f"{grouped_rate:>14,.0f}")
+
+    # Incremental mode: one push per tick for every slot
+    engine = RollingFeatures(capacity=INCREMENTAL_SLOTS)
+    slots = np.arange(INCREMENTAL_SLOTS)
+    values = readings(INCREMENTAL_SLOTS * 200)[['heart_rate', 'body_temperature', 'stress_score']].to_numpy()
+    ticks = values.reshape(200, INCREMENTAL_SLOTS, 3)
+    incremental_rate = rate(lambda: [engine.push(slots, tick) for tick in ticks], len(values))
+    print(f"\nIncremental ({INCREMENTAL_SLOTS} slots per push): {incremental_rate:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
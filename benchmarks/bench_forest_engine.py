@@ -0,0 +1,61 @@
+"""
+Forest Inference Benchmark
+==========================
+Per-call latency of sklearn's predict_proba/score_samples versus the
+compiled flat-array forests of forest_engine.py, for batches of 1, 64
+and 4096 rows.
+
+Usage: python benchmarks/bench_forest_engine.py [models_dir]
+"""
+import os
+import pickle
+import sys
+import time
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forest_engine import compile_model, MODELS_DIR, MODEL_FILES
+
+BATCH_SIZES = [1, 64, 4096]
+# Wall time spent timing each (model, batch size, engine)
+TARGET_SECONDS = 1.0
+
+
+def time_call(fn, X):
+    """Mean seconds per call over roughly TARGET_SECONDS."""
+    fn(X)  # Warm-up
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < TARGET_SECONDS:
+        fn(X)
+        calls += 1
+    return (time.perf_counter() - start) / calls
+
+
+def main(models_dir=MODELS_DIR):
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    rng = np.random.default_rng(42)
+    print(f"{'model':<20} | {'batch':>5} | {'sklearn ms':>10} | {'compiled ms':>11} | {'speedup':>7}")
+    print("-" * 66)
+    for name in MODEL_FILES:
+        path = os.path.join(models_dir, f'{name}.pkl')
+        if not os.path.exists(path):
+            print(f"{name:<20} | (no {name}.pkl)")
+            continue
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+        model.n_jobs = 1  # Same single core for both engines
+        compiled = compile_model(model)
+        method = 'predict_proba' if hasattr(model, 'predict_proba') else 'score_samples'
+
+        # Standardized inputs, like the scaled features the models see live
+        X = rng.standard_normal((max(BATCH_SIZES), model.n_features_in_))
+        for size in BATCH_SIZES:
+            batch = X[:size]
+            base = time_call(getattr(model, method), batch)
+            fast = time_call(getattr(compiled, method), batch)
+            print(f"{name:<20} | {size:>5} | {base * 1000:>10.3f} | {fast * 1000:>11.3f} | {base / fast:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
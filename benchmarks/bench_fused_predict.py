@@ -0,0 +1,64 @@
+"""
+Fused Prediction Latency Benchmark
+==================================
+Single-reading latency of the original predict_health pipeline (two walks
+of each forest plus inverse_transform) versus the fused HealthPredictor,
+on the sklearn models and on the compiled forests.
+
+Usage: python benchmarks/bench_fused_predict.py [models_dir]
+"""
+import os
+import sys
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forest_engine import compile_model, MODELS_DIR
+from health_predictor import HealthPredictor
+from verify_fused_predictor import load_models, reference_predictions, DATA_PATH, FEATURE_COLUMNS
+
+N_READINGS = 300
+
+
+def latencies(fn, rows):
+    fn(rows[0])  # Warm-up
+    times = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row)
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1000
+
+
+def main(models_dir=MODELS_DIR):
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    models = load_models(models_dir)
+    features = pd.read_csv(DATA_PATH)[FEATURE_COLUMNS].to_numpy(dtype=float)
+    rows = [features[i:i + 1] for i in range(N_READINGS)]
+
+    sklearn_fused = HealthPredictor(models['scaler'], models['anomaly_detector'],
+                                    models['disease_classifier'], models['label_encoder'])
+    compiled_fused = HealthPredictor(models['scaler'], compile_model(models['anomaly_detector']),
+                                     compile_model(models['disease_classifier']),
+                                     models['label_encoder'])
+    paths = [
+        ('unfused, sklearn', lambda row: reference_predictions(models, row)),
+        ('fused, sklearn', sklearn_fused.predict),
+        ('fused, compiled', compiled_fused.predict),
+    ]
+
+    print(f"Single readings: {N_READINGS}")
+    print(f"{'pipeline':<18} | {'p50 ms':>8} | {'p99 ms':>8} | {'speedup':>7}")
+    print("-" * 50)
+    baseline = None
+    for name, fn in paths:
+        ms = latencies(fn, rows)
+        p50 = np.percentile(ms, 50)
+        baseline = baseline or p50
+        print(f"{name:<18} | {p50:>8.3f} | {np.percentile(ms, 99):>8.3f} | {baseline / p50:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
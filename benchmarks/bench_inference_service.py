@@ -0,0 +1,104 @@
+"""
+Inference Service Benchmark
+===========================
+Readings per second through the health models in this process versus an
+InferenceService with 1..N worker processes, for many small concurrent
+requests (one reading each, as the simulator and single-reading API make
+them; the service micro-batches them) and for large batches (split across
+workers). Also reports the worst stall of a ticking thread in this
+process, which stands in for the eventlet hub.
+
+Usage: python benchmarks/bench_inference_service.py [models_dir] [max_workers]
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+from inference_service import InferenceService
+from model_bundle import load_health_predictor, MODELS_DIR
+
+DATA_PATH = os.path.join(ROOT_DIR, 'data', 'pet_health_data.csv')
+FEATURE_COLUMNS = [
+    'hour_of_day', 'heart_rate', 'body_temperature', 'accel_magnitude',
+    'gyro_x', 'gyro_y', 'gyro_z', 'ambient_temperature', 'humidity',
+    'activity_level', 'step_count', 'sleep_indicator', 'movement_intensity',
+    'distance_meters', 'calories_burned', 'stress_score', 'home_distance_m',
+    'geofence_alert'
+]
+# Concurrent callers for the single-reading workload
+SUBMITTERS = 64
+SINGLE_READINGS = 4000
+BATCH_ROWS = 4096
+
+
+class TickMonitor:
+    """Worst delay of a 1 ms ticker, like green_runtime.HubMonitor."""
+
+    def __init__(self):
+        self.max_lag = 0.0
+        self.running = True
+        threading.Thread(target=self._tick, daemon=True).start()
+
+    def _tick(self):
+        while self.running:
+            start = time.perf_counter()
+            time.sleep(0.001)
+            self.max_lag = max(self.max_lag, time.perf_counter() - start - 0.001)
+
+
+def run_singles(predict, rows):
+    monitor = TickMonitor()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(SUBMITTERS) as pool:
+        list(pool.map(predict, rows))
+    elapsed = time.perf_counter() - start
+    monitor.running = False
+    return len(rows) / elapsed, monitor.max_lag * 1000
+
+
+def run_batches(predict, matrix, seconds=3.0):
+    monitor = TickMonitor()
+    done, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        predict(matrix)
+        done += len(matrix)
+    elapsed = time.perf_counter() - start
+    monitor.running = False
+    return done / elapsed, monitor.max_lag * 1000
+
+
+def main(models_dir=MODELS_DIR, max_workers=None):
+    max_workers = int(max_workers or os.cpu_count() or 1)
+    local, _ = load_health_predictor(models_dir, FEATURE_COLUMNS)
+    features = pd.read_csv(DATA_PATH)[FEATURE_COLUMNS].to_numpy(dtype=float)
+    rows = [features[i:i + 1] for i in range(SINGLE_READINGS)]
+    matrix = features[:BATCH_ROWS]
+
+    print(f"CPUs: {os.cpu_count()}, submitters: {SUBMITTERS}, batch: {BATCH_ROWS} rows")
+    print(f"{'mode':<12} | {'single/s':>9} | {'max lag ms':>10} | {'batch rows/s':>12} | {'max lag ms':>10}")
+    print("-" * 66)
+    single, single_lag = run_singles(local.predict, rows)
+    batch, batch_lag = run_batches(local.predict, matrix)
+    print(f"{'in-process':<12} | {single:>9,.0f} | {single_lag:>10.1f} | {batch:>12,.0f} | {batch_lag:>10.1f}")
+
+    for n_workers in range(1, max_workers + 1):
+        service = InferenceService(n_workers, models_dir)
+        service.start()
+        try:
+            assert service.predict('health', matrix[:200]) == local.predict(matrix[:200])
+            single, single_lag = run_singles(lambda row: service.predict('health', row), rows)
+            batch, batch_lag = run_batches(lambda m: service.predict('health', m), matrix)
+        finally:
+            service.stop()
+        print(f"{f'{n_workers} workers':<12} | {single:>9,.0f} | {single_lag:>10.1f} | "
+              f"{batch:>12,.0f} | {batch_lag:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
@@ -0,0 +1,54 @@
+"""
+Metrics Overhead Benchmark
+==========================
+Cost of the instrumentation on the hot paths: one Histogram observe(), a
+stage timed with two perf_counter() calls, and their share of a
+single-reading HealthPredictor.predict (four timed stages per call).
+Also times a full /api/metrics render.
+
+Usage: python benchmarks/bench_metrics.py [models_dir]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import Histogram, REGISTRY
+from model_bundle import load_health_predictor, MODELS_DIR
+from verify_fused_predictor import FEATURE_COLUMNS
+
+CALLS = 200000
+
+
+def per_call_ns(fn, calls=CALLS):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main(models_dir=MODELS_DIR):
+    child = Histogram('bench_seconds', 'benchmark', ['stage']).labels('stage')
+    perf_counter = time.perf_counter
+    baseline = per_call_ns(lambda: None)
+    observe = per_call_ns(lambda: child.observe(0.0003)) - baseline
+    timed = per_call_ns(lambda: child.observe(perf_counter() - perf_counter())) - baseline
+    print(f"observe():                  {observe:>7.0f} ns")
+    print(f"timed stage (2 clocks):     {timed:>7.0f} ns")
+
+    predictor, _ = load_health_predictor(models_dir, FEATURE_COLUMNS)
+    row = np.zeros((1, len(FEATURE_COLUMNS)))
+    predictor.predict(row)
+    predict = per_call_ns(lambda: predictor.predict(row), calls=5000)
+    print(f"single-row predict:         {predict / 1000:>7.1f} us "
+          f"(4 timed stages = {4 * timed / predict:.2%} of it)")
+
+    start = time.perf_counter()
+    text = REGISTRY.render()
+    print(f"render ({len(text.splitlines())} lines):         {(time.perf_counter() - start) * 1000:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
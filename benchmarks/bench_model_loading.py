@@ -0,0 +1,94 @@
+"""
+Model Loading Benchmark
+=======================
+Cold start and memory per worker for the pickled models (unpickle and
+compile everything at startup) versus the memory-mapped bundle (open the
+manifest, map arrays on first use). Starts WORKERS processes per format
+side by side, like run_workers.py, and reports each one's time to the
+first prediction, RSS, private (anonymous) memory and PSS, the RSS share
+that counts shared file pages once per process that maps them.
+
+Usage: python benchmarks/bench_model_loading.py [models_dir]
+       (models_dir needs the pickles and a bundle: python model_bundle.py)
+"""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = 4
+
+# Runs in each worker: load like app.load_models + BackgroundSimulator, predict once
+WORKER_SCRIPT = r'''
+import json, os, sys, time
+start = time.perf_counter()
+import numpy as np
+sys.path.insert(0, {root!r})
+from health_predictor import HealthPredictor
+from model_bundle import open_bundle, LazyModel, PREDICTOR_MODELS
+mode, models_dir = sys.argv[1], sys.argv[2]
+if mode == 'pickle':
+    import pickle
+    from forest_engine import compile_model
+    def load(name):
+        with open(os.path.join(models_dir, name + '.pkl'), 'rb') as f:
+            return pickle.load(f)
+    predictor = HealthPredictor(load('scaler'), compile_model(load('anomaly_detector')),
+                                compile_model(load('disease_classifier')), load('label_encoder'))
+    trend = compile_model(load('trend_classifier'))
+else:
+    bundle = open_bundle(models_dir, required=PREDICTOR_MODELS + ('trend_classifier',))
+    predictor = LazyModel(bundle.predictor)
+    trend = bundle.lazy('trend_classifier')
+ready = time.perf_counter()
+predictor.predict(np.zeros((1, 18)))
+trend.predict_proba(np.zeros((1, trend.n_features_in_)))
+first = time.perf_counter()
+print(json.dumps({{'ready_ms': (ready - start) * 1000, 'first_prediction_ms': (first - start) * 1000}}),
+      flush=True)
+sys.stdin.read()  # Stay alive until every worker has been measured
+'''
+
+
+def memory_kb(pid):
+    """RSS, anonymous RSS and PSS of a process, in kB."""
+    fields = {}
+    for filename in ('status', 'smaps_rollup'):
+        with open(f'/proc/{pid}/{filename}') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'RssAnon', 'Pss'):
+                    fields[key] = int(value.split()[0])
+    return fields
+
+
+def run(mode, models_dir):
+    script = WORKER_SCRIPT.format(root=ROOT_DIR)
+    workers = [subprocess.Popen([sys.executable, '-W', 'ignore', '-c', script, mode, models_dir],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+               for _ in range(WORKERS)]
+    timings = [json.loads(w.stdout.readline()) for w in workers]
+    memory = [memory_kb(w.pid) for w in workers]
+    for w in workers:
+        w.stdin.close()
+        w.wait()
+    return timings, memory
+
+
+def main(models_dir=os.path.join(ROOT_DIR, 'models')):
+    print(f"Workers per format: {WORKERS} (running side by side)")
+    print(f"{'format':<7} | {'ready ms':>8} | {'1st pred ms':>11} | {'RSS MB':>7} | {'private MB':>10} | {'PSS MB':>7}")
+    print("-" * 66)
+    for mode in ('pickle', 'mmap'):
+        timings, memory = run(mode, models_dir)
+        ready = np.median([t['ready_ms'] for t in timings])
+        first = np.median([t['first_prediction_ms'] for t in timings])
+        rss, anon, pss = (np.mean([m[key] for m in memory]) / 1024 for key in ('VmRSS', 'RssAnon', 'Pss'))
+        print(f"{mode:<7} | {ready:>8.0f} | {first:>11.0f} | {rss:>7.1f} | {anon:>10.1f} | {pss:>7.1f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
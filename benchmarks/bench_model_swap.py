@@ -0,0 +1,96 @@
+"""
+Model Swap Benchmark
+====================
+Hot swapping under load: client threads keep calling predict through the
+registry's swap callback while a second version is published, activated
+(loaded and warmed beside the serving one) and rolled back. Reports
+predictions served and failed, single-reading latency while swapping
+versus steady state, and how long activation and rollback took.
+Versions are published into a temporary registry; models_dir is not changed.
+
+Usage: python benchmarks/bench_model_swap.py [models_dir] [inference_workers]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference_service import InferenceService
+from model_registry import ModelRegistry, MODELS_DIR
+from verify_fused_predictor import FEATURE_COLUMNS
+
+CLIENT_THREADS = 4
+STEADY_SECONDS = 2.0
+
+
+def main(models_dir=MODELS_DIR, inference_workers=0):
+    root = tempfile.mkdtemp(prefix='model_registry_')
+    inference = InferenceService(int(inference_workers), models_dir) if int(inference_workers) else None
+    registry = ModelRegistry(root, models_dir, FEATURE_COLUMNS, inference)
+    serving = {}
+    registry.on_swap(lambda version: serving.update(predictor=version.health))
+
+    try:
+        registry.publish(models_dir, 'v1')
+        registry.activate()
+        rows = np.random.default_rng(0).normal(size=(512, len(FEATURE_COLUMNS)))
+        latencies, swapping, errors = {False: [], True: []}, [False], []
+        stop = threading.Event()
+
+        def client(offset):
+            i = offset
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    serving['predictor'].predict(rows[i % len(rows)][np.newaxis, :])
+                except Exception as e:
+                    errors.append(e)
+                latencies[swapping[0]].append(time.perf_counter() - start)
+                i += 1
+
+        threads = [threading.Thread(target=client, args=(t,)) for t in range(CLIENT_THREADS)]
+        for thread in threads:
+            thread.start()
+        time.sleep(STEADY_SECONDS)
+
+        swapping[0] = True
+        publish_start = time.perf_counter()
+        registry.publish(models_dir, 'v2')
+        activate_start = time.perf_counter()
+        registry.activate()
+        rollback_start = time.perf_counter()
+        registry.rollback()
+        rollback_end = time.perf_counter()
+        swapping[0] = False
+        time.sleep(STEADY_SECONDS / 4)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        served = sum(len(v) for v in latencies.values())
+        print(f"Mode:                 {'%d inference workers' % int(inference_workers) if inference else 'in-process'}")
+        print(f"Publish v2:           {(activate_start - publish_start) * 1000:>8.1f} ms")
+        print(f"Activate v2:          {(rollback_start - activate_start) * 1000:>8.1f} ms "
+              f"(warm-up {registry.previous.warmup_ms} ms)")
+        print(f"Roll back to v1:      {(rollback_end - rollback_start) * 1000:>8.3f} ms")
+        print(f"Predictions served:   {served:>8,} ({len(latencies[True]):,} while swapping)")
+        print(f"Predictions failed:   {len(errors):>8,}")
+        for label, key in (('steady', False), ('swapping', True)):
+            timings = np.array(latencies[key]) * 1e6
+            if len(timings):
+                print(f"Latency {label + ':':<13} p50 {np.percentile(timings, 50):>7.0f} us, "
+                      f"p99 {np.percentile(timings, 99):>7.0f} us, max {timings.max():>8.0f} us")
+        print(f"Serving:              {registry.active.name} ({registry.active.fingerprint})")
+    finally:
+        if inference:
+            inference.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
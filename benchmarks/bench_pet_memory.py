@@ -0,0 +1,80 @@
+"""
+Per-Pet Memory Benchmark
+========================
+Heap memory held per simulated pet by the previous dict/deque layout and
+by the array-backed VitalsStore + RollingFeatures + PetSlot layout.
+
+Usage: python benchmarks/bench_pet_memory.py
+"""
+import os
+import sys
+import threading
+import tracemalloc
+from collections import deque
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vitals_store import VitalsStore, PetSlot
+from rolling_features import RollingFeatures
+
+N_PETS = 10_000
+WINDOWS = [5, 60, 300]
+
+
+def legacy_pets(n):
+    """Per-pet structures as kept before the array-backed store."""
+    pets = {}
+    for pet_id in range(n):
+        state = {
+            'heart_rate': np.float64(80), 'temperature': np.float64(38.5),
+            'activity': np.float64(10), 'stress_score': np.float64(20),
+            'timestamp': 0.0, 'trend_factor': 0
+        }
+        history = deque(maxlen=5)
+        for _ in range(5):
+            history.append({
+                'heart_rate': np.float64(80), 'temperature': np.float64(38.5),
+                'stress_score': np.float64(20)
+            })
+        pets[pet_id] = {'stop_event': threading.Event(), 'state': state, 'history': history}
+    return pets
+
+
+def array_pets(n, window):
+    store = VitalsStore(n, history_window=window)
+    features = RollingFeatures(5, n)
+    pets = {}
+    for pet_id in range(n):
+        slot = store.allocate(pet_id)
+        features.reset(slot)
+        pets[pet_id] = PetSlot(pet_id, slot, 0, 0.0)
+    # Fill the rings so nothing is lazily allocated
+    slots = store.active_slots()
+    for _ in range(window):
+        store.record(slots, 0.0)
+    return store, features, pets
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    return (after - before) / N_PETS
+
+
+def main():
+    legacy = measure(lambda: legacy_pets(N_PETS))
+    print(f"Pets measured: {N_PETS}")
+    print(f"{'layout':<34} | {'bytes/pet':>10}")
+    print("-" * 48)
+    print(f"{'dict state + deque(5) of dicts':<34} | {legacy:>10.0f}  (excludes thread stacks)")
+    for window in WINDOWS:
+        size = measure(lambda: array_pets(N_PETS, window))
+        print(f"{f'array store, history window {window}':<34} | {size:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
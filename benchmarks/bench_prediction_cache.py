@@ -0,0 +1,60 @@
+"""
+Prediction Cache Benchmark
+==========================
+Replays data/pet_health_data.csv reading by reading (the predict_health
+path) through the HealthPredictor with and without the quantized LRU
+cache, for several cache sizes. Reports hit rate, evictions, readings/s
+and how often the snapped-to-precision prediction agrees with the exact
+one.
+
+Usage: python benchmarks/bench_prediction_cache.py [models_dir]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_bundle import open_bundle, PREDICTOR_MODELS, MODELS_DIR
+from prediction_cache import PredictionCache, CachedPredictor, SENSOR_PRECISION
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'data', 'pet_health_data.csv')
+CACHE_SIZES = [256, 1024, 4096, 16384]
+
+
+def replay(predictor, rows):
+    start = time.perf_counter()
+    predictions = [predictor.predict(row)[0] for row in rows]
+    return predictions, len(rows) / (time.perf_counter() - start)
+
+
+def main(models_dir=MODELS_DIR):
+    bundle = open_bundle(models_dir, required=PREDICTOR_MODELS)
+    if bundle is None:
+        print(f"No model bundle in {models_dir}; run python model_bundle.py first")
+        return
+    predictor = bundle.predictor()
+    features = pd.read_csv(DATA_PATH)[list(SENSOR_PRECISION)].to_numpy(dtype=float)
+    rows = [features[i:i + 1] for i in range(len(features))]
+
+    exact, base_rate = replay(predictor, rows)
+    print(f"Replayed readings: {len(rows)} (uncached: {base_rate:,.0f} readings/s)")
+    print(f"{'size':>6} | {'hit rate':>8} | {'evictions':>9} | {'readings/s':>10} | {'speedup':>7} | "
+          f"{'same status':>11} | {'same anomaly':>12}")
+    print("-" * 86)
+    for size in CACHE_SIZES:
+        cache = PredictionCache(max_size=size)
+        cache.bind(bundle.fingerprint)
+        cached, rate = replay(CachedPredictor(predictor, cache), rows)
+        stats = cache.get_stats()
+        same_status = sum(a['health_status'] == b['health_status'] for a, b in zip(exact, cached))
+        same_anomaly = sum(a['is_anomaly'] == b['is_anomaly'] for a, b in zip(exact, cached))
+        print(f"{size:>6} | {stats['hit_rate']:>8.1%} | {stats['evictions']:>9} | {rate:>10,.0f} | "
+              f"{rate / base_rate:>6.1f}x | {same_status / len(rows):>11.2%} | "
+              f"{same_anomaly / len(rows):>12.2%}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,92 @@
+"""
+Baseline Prefilter Benchmark
+============================
+Replays data/pet_health_data.csv in timestamp order, one reading at a time
+(the predict_health path), through the HealthPredictor alone and behind the
+per-pet BaselineFilter. Reports the share of readings escalated to the full
+models (by reason), time per reading, and against the labelled health_status:
+  - missed: ill readings reported healthy (full models alone vs. gated)
+  - lost catches: ill readings the full models caught but the gate answered
+    from a healthy baseline
+Pets whose readings are all labelled healthy are also reported on their own
+(the healthy-fleet case), as is the steady state after the first week.
+
+Usage: python benchmarks/bench_prefilter.py [models_dir]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+from baseline_filter import BaselineFilter, GatedPredictor
+from model_bundle import load_health_predictor, MODELS_DIR
+from verify_fused_predictor import FEATURE_COLUMNS, DATA_PATH
+
+WARM_DAYS = 7
+
+
+def replay(predict, features, pet_ids):
+    """Results and microseconds of every single-reading call."""
+    results, times = [], np.empty(len(features))
+    for i in range(len(features)):
+        start = time.perf_counter()
+        results.append(predict(features[i:i + 1], pet_ids[i:i + 1])[0])
+        times[i] = time.perf_counter() - start
+    return results, times * 1e6
+
+
+def rate(count, total):
+    return f"{count / total:.1%}" if total else "-"
+
+
+def main(models_dir=MODELS_DIR):
+    predictor, _ = load_health_predictor(models_dir, FEATURE_COLUMNS)
+    data = pd.read_csv(DATA_PATH, parse_dates=['timestamp']).sort_values('timestamp', kind='stable')
+    features = data[FEATURE_COLUMNS].to_numpy(dtype=float)
+    pet_ids = data['pet_id'].tolist()
+    ill = (data['health_status'] != 'healthy').to_numpy()
+    healthy_pets = data.groupby('pet_id')['health_status'].transform(lambda s: (s == 'healthy').all()).to_numpy()
+    steady = (data['timestamp'] >= data['timestamp'].min() + pd.Timedelta(days=WARM_DAYS)).to_numpy()
+
+    full, full_us = replay(lambda x, _: predictor.predict(x), features, pet_ids)
+    baselines = BaselineFilter(FEATURE_COLUMNS)
+    gated_predictor = GatedPredictor(predictor, baselines)
+    gated, gated_us = replay(gated_predictor.predict, features, pet_ids)
+    escalated = np.array([not r['screened'] for r in gated])
+
+    full_ill = np.array([r['health_status'] != 'healthy' for r in full])
+    gated_ill = np.array([r['health_status'] != 'healthy' for r in gated])
+    full_anomaly = np.array([bool(r['is_anomaly']) for r in full])
+    stats = baselines.get_stats()
+
+    print(f"Readings: {len(features)} from {data['pet_id'].nunique()} pets, {ill.sum()} labelled ill")
+    print(f"Time per reading: full {full_us.mean():.0f} us, gated {gated_us.mean():.0f} us "
+          f"({full_us.mean() / gated_us.mean():.1f}x); a screened reading takes {gated_us[~escalated].mean():.0f} us")
+    print("Escalated by reason: " + ", ".join(
+        f"{reason} {stats[reason] / stats['readings']:.1%}"
+        for reason in ('warmup', 'unresolved', 'deviations', 'audits')))
+    print()
+    print(f"{'readings':<26} | {'escalated':>9} | {'missed (full)':>13} | {'missed (gated)':>14} | "
+          f"{'lost catches':>12} | {'anomaly flags':>13}")
+    print("-" * 104)
+    for name, subset in (('all', np.ones(len(features), dtype=bool)),
+                         (f'all, after day {WARM_DAYS}', steady),
+                         ('healthy pets', healthy_pets),
+                         (f'healthy pets, after day {WARM_DAYS}', healthy_pets & steady)):
+        sick = subset & ill
+        caught = sick & full_ill
+        # Detector flags on healthy readings that the gate answered as not anomalous
+        flags = subset & ~ill & full_anomaly
+        print(f"{name:<26} | {escalated[subset].mean():>9.1%} | {rate((sick & ~full_ill).sum(), sick.sum()):>13} | "
+              f"{rate((sick & ~gated_ill).sum(), sick.sum()):>14} | {rate((caught & ~gated_ill).sum(), caught.sum()):>12} | "
+              f"{(flags & ~escalated).sum():>6} of {flags.sum():<5}")
+    print()
+    print("anomaly flags: detector flags on labelled-healthy readings that the gate screened out")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,264 @@
+"""
+Forest Compaction
+=================
+Smaller variants of the trained disease classifier, with their serving
+latency and held-out accuracy, to show what each point of F1 costs.
+
+Variants combine:
+  - subset selection: the k trees picked greedily for accuracy on a selection split
+  - depth capping: nodes at depth d become leaves (with their training class mix)
+  - pruning: splits leaving fewer than m training samples on a side are undone
+Each variant is a plain RandomForestClassifier, timed through the compiled
+engine as it is served (single rows and 1024-row batches). The test split of
+train_models.py is halved: one half picks the tree subsets, the other scores
+every variant. The Pareto front (variants no other variant beats on both
+latency and F1) is written to model_metadata.json under "compaction", and
+pick_variant() chooses from it under a latency budget.
+
+Usage: python compact_models.py [models_dir] [--save]
+       (--save also writes the Pareto variants to models_dir/compact/<name>.pkl)
+"""
+
+import copy
+import json
+import os
+import pickle
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.tree._tree import Tree
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(os.path.dirname(DATA_DIR), 'models')
+sys.path.insert(0, os.path.dirname(DATA_DIR))
+from forest_engine import compile_model, _node_depths
+from model_bundle import export_bundle, BUNDLE_DIR, MANIFEST_FILE, METADATA_FILE
+from train_models import load_and_prepare_data, RANDOM_STATE
+
+DATA_PATH = os.path.join(DATA_DIR, 'pet_health_data.csv')
+MODEL_NAME = 'disease_classifier'
+
+# Variant grid (None = as trained)
+TREE_COUNTS = (10, 25, 50, None)
+DEPTH_CAPS = (None, 12, 9, 6)
+MIN_SAMPLES_LEAF = (None, 16)
+
+SINGLE_ROW_RUNS = 300
+TIMING_ROUNDS = 3
+BATCH_ROWS = 1024
+BATCH_RUNS = 5
+
+TREE_LEAF, TREE_UNDEFINED = -1, -2
+
+
+# ==================== VARIANTS ====================
+
+def prune_tree(tree, collapse):
+    """Copy of an sklearn Tree in which every node flagged in collapse is a leaf."""
+    state = tree.__getstate__()
+    nodes, values = state['nodes'], state['values']
+
+    # Kept nodes in depth-first order, left before right, as sklearn builds them
+    order, depth, stack = [], {0: 0}, [0]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        left, right = nodes['left_child'][node], nodes['right_child'][node]
+        if left != TREE_LEAF and not collapse[node]:
+            depth[left] = depth[right] = depth[node] + 1
+            stack.extend((right, left))
+    new_id = {node: i for i, node in enumerate(order)}
+
+    new_nodes = nodes[order].copy()
+    for i, node in enumerate(order):
+        if new_nodes['left_child'][i] == TREE_LEAF or collapse[node]:
+            new_nodes['left_child'][i] = new_nodes['right_child'][i] = TREE_LEAF
+            new_nodes['feature'][i] = TREE_UNDEFINED
+            new_nodes['threshold'][i] = TREE_UNDEFINED
+        else:
+            new_nodes['left_child'][i] = new_id[nodes['left_child'][node]]
+            new_nodes['right_child'][i] = new_id[nodes['right_child'][node]]
+
+    pruned = Tree(tree.n_features, np.asarray(tree.n_classes), tree.n_outputs)
+    pruned.__setstate__({'max_depth': max(depth.values()), 'node_count': len(order),
+                         'nodes': new_nodes, 'values': values[order].copy()})
+    return pruned
+
+
+def compact_forest(model, trees, max_depth=None, min_samples_leaf=None):
+    """RandomForestClassifier of the given trees of model, depth-capped and pruned."""
+    estimators = []
+    for t in trees:
+        estimator = copy.copy(model.estimators_[t])
+        tree = estimator.tree_
+        collapse = np.zeros(tree.node_count, dtype=bool)
+        if max_depth is not None:
+            collapse |= _node_depths(tree) >= max_depth
+        if min_samples_leaf is not None:
+            internal = tree.children_left != TREE_LEAF
+            samples = tree.n_node_samples
+            smallest_side = np.minimum(samples[tree.children_left], samples[tree.children_right])
+            collapse |= internal & (smallest_side < min_samples_leaf)
+        if collapse.any():
+            estimator.tree_ = prune_tree(tree, collapse)
+        estimators.append(estimator)
+    variant = copy.copy(model)
+    variant.estimators_ = estimators
+    variant.n_estimators = len(estimators)
+    return variant
+
+
+def select_trees(model, X, y, count):
+    """Greedy forward selection: the count trees whose average is most accurate on (X, y)."""
+    proba = np.stack([estimator.predict_proba(X) for estimator in model.estimators_])
+    truth = np.searchsorted(model.classes_, y)
+    chosen, total = [], np.zeros(proba.shape[1:])
+    remaining = list(range(len(proba)))
+    for _ in range(count):
+        candidates = total + proba[remaining]
+        accuracy = (candidates.argmax(axis=2) == truth).mean(axis=1)
+        # Ties go to the tree putting more weight on the true class
+        confidence = candidates[:, np.arange(len(truth)), truth].mean(axis=1) / (len(chosen) + 1)
+        best = int(np.lexsort((-confidence, -accuracy))[0])
+        total = candidates[best]
+        chosen.append(remaining.pop(best))
+    return chosen
+
+
+# ==================== EVALUATION ====================
+
+def evaluate(variant, X, y):
+    """Accuracy on (X, y) and latency of the compiled variant, as served."""
+    compiled = compile_model(variant)
+    y_pred = compiled.predict(X)
+
+    rows = [row[np.newaxis, :] for row in X[:SINGLE_ROW_RUNS]]
+    for row in rows[:20]:
+        compiled.predict_proba(row)  # Warm-up
+    # Best of several rounds' medians, so a noisy neighbour does not reorder the variants
+    single_row = []
+    for _ in range(TIMING_ROUNDS):
+        timings = []
+        for row in rows:
+            start = time.perf_counter()
+            compiled.predict_proba(row)
+            timings.append(time.perf_counter() - start)
+        single_row.append(np.median(timings))
+    batch = np.resize(X, (BATCH_ROWS, X.shape[1]))
+    batch_timings = []
+    for _ in range(BATCH_RUNS):
+        start = time.perf_counter()
+        compiled.predict_proba(batch)
+        batch_timings.append(time.perf_counter() - start)
+
+    return {
+        'nodes': int(compiled.trees.n_nodes),
+        'single_row_us': round(float(min(single_row)) * 1e6, 1),
+        'batch_ms': round(float(min(batch_timings)) * 1e3, 2),
+        'accuracy': round(float(accuracy_score(y, y_pred)), 4),
+        'f1_score': round(float(f1_score(y, y_pred, average='weighted')), 4)
+    }
+
+
+def pareto_front(variants):
+    """Names of the variants no other variant beats on both single-row latency and F1."""
+    front, best_f1 = [], -1.0
+    for variant in sorted(variants, key=lambda v: (v['single_row_us'], -v['f1_score'])):
+        if variant['f1_score'] > best_f1:
+            front.append(variant['name'])
+            best_f1 = variant['f1_score']
+    return front
+
+
+def pick_variant(compaction, budget_us):
+    """Most accurate Pareto variant whose single-row latency fits budget_us, or None."""
+    variants = {v['name']: v for v in compaction['variants']}
+    fitting = [variants[name] for name in compaction['pareto'] if variants[name]['single_row_us'] <= budget_us]
+    return max(fitting, key=lambda v: v['f1_score']) if fitting else None
+
+
+def variant_name(trees, max_depth, min_samples_leaf):
+    name = f't{trees}'
+    if max_depth is not None:
+        name += f'-d{max_depth}'
+    if min_samples_leaf is not None:
+        name += f'-m{min_samples_leaf}'
+    return name
+
+
+# ==================== MAIN ====================
+
+def compact_models(models_dir=MODELS_DIR, save=False):
+    with open(os.path.join(models_dir, f'{MODEL_NAME}.pkl'), 'rb') as f:
+        model = pickle.load(f)
+    with open(os.path.join(models_dir, 'scaler.pkl'), 'rb') as f:
+        scaler = pickle.load(f)
+
+    # The test split of train_models.py, halved into selection and evaluation rows
+    X, y, _, _ = load_and_prepare_data(DATA_PATH)
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE, stratify=y)
+    X_select, X_eval, y_select, y_eval = train_test_split(
+        scaler.transform(X_test), y_test, test_size=0.5, random_state=RANDOM_STATE, stratify=y_test)
+    print(f"\nSelection rows: {len(X_select)}, evaluation rows: {len(X_eval)}")
+
+    n_trees = len(model.estimators_)
+    counts = sorted({min(count or n_trees, n_trees) for count in TREE_COUNTS})
+    ranked = select_trees(model, X_select, y_select, max(c for c in counts if c < n_trees)
+                          if len(counts) > 1 else 0)
+
+    variants, models = [], {}
+    print(f"\n{'variant':<14} | {'nodes':>7} | {'1 row us':>8} | {f'{BATCH_ROWS} rows ms':>12} | "
+          f"{'accuracy':>8} | {'F1':>6}")
+    print("-" * 72)
+    for count in counts:
+        trees = list(range(n_trees)) if count == n_trees else ranked[:count]
+        for max_depth in DEPTH_CAPS:
+            for min_samples_leaf in MIN_SAMPLES_LEAF:
+                name = variant_name(count, max_depth, min_samples_leaf)
+                variant = compact_forest(model, trees, max_depth, min_samples_leaf)
+                result = dict(name=name, trees=count, max_depth=max_depth,
+                              min_samples_leaf=min_samples_leaf, **evaluate(variant, X_eval, y_eval))
+                variants.append(result)
+                models[name] = variant
+                print(f"{name:<14} | {result['nodes']:>7} | {result['single_row_us']:>8.1f} | "
+                      f"{result['batch_ms']:>12.2f} | {result['accuracy']:>8.4f} | {result['f1_score']:>6.4f}")
+
+    front = pareto_front(variants)
+    print(f"\nPareto front (fastest first): {', '.join(front)}")
+
+    metadata_path = os.path.join(models_dir, METADATA_FILE)
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    metadata['compaction'] = {
+        'model': MODEL_NAME,
+        'created_at': datetime.now().isoformat(),
+        'evaluation_rows': len(X_eval),
+        'batch_rows': BATCH_ROWS,
+        'variants': variants,
+        'pareto': front
+    }
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    print(f"[OK] Saved compaction report to {metadata_path}")
+
+    if save:
+        compact_dir = os.path.join(models_dir, 'compact')
+        os.makedirs(compact_dir, exist_ok=True)
+        for name in front:
+            with open(os.path.join(compact_dir, f'{name}.pkl'), 'wb') as f:
+                pickle.dump(models[name], f)
+        print(f"[OK] Saved {len(front)} Pareto variants to {compact_dir}")
+
+    # The metadata is part of the bundle fingerprint; keep an existing bundle current
+    if os.path.exists(os.path.join(models_dir, BUNDLE_DIR, MANIFEST_FILE)):
+        export_bundle(models_dir)
+    return metadata['compaction']
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != '--save']
+    compact_models(args[0] if args else MODELS_DIR, save='--save' in sys.argv)
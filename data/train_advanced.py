@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 import pickle
 import os
+import sys
 from sklearn.ensemble import RandomForestClassifier, IsolationForest
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
@@ -12,6 +13,10 @@ DATA_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(os.path.dirname(DATA_DIR), 'models')
 os.makedirs(MODELS_DIR, exist_ok=True)
 
+# Rolling-window features come from the module the simulator serves with
+sys.path.insert(0, os.path.dirname(DATA_DIR))
+from rolling_features import extract_rolling_features
+
 class AdvancedSimulator:
     """Generates time-series sequences for training"""
     def __init__(self):
@@ -56,25 +61,6 @@ class AdvancedSimulator:
             
         return pd.DataFrame(data)
 
-def extract_rolling_features(df, window=5):
-    """Compute rolling statistics for time-series model"""
-    # Calculate rolling mean and standard deviation
-    rolled = df[['heart_rate', 'body_temperature', 'stress_score']].rolling(window=window)
-    
-    features = pd.DataFrame()
-    features['hr_mean'] = rolled['heart_rate'].mean()
-    features['hr_std'] = rolled['heart_rate'].std()
-    features['temp_mean'] = rolled['body_temperature'].mean()
-    features['temp_std'] = rolled['body_temperature'].std()
-    features['stress_mean'] = rolled['stress_score'].mean()
-    
-    # Calculate slope (simple differencing for trend)
-    features['hr_trend'] = df['heart_rate'].diff(window)
-    features['temp_trend'] = df['body_temperature'].diff(window)
-    
-    features = features.fillna(0)
-    return features
-
 def train_advanced_models():
     print("Generating advanced synthetic time-series data...")
     sim = AdvancedSimulator()
@@ -0,0 +1,322 @@
+"""
+Compiled tree-ensemble inference.
+sklearn's predict/predict_proba re-validate the input and walk each tree
+separately on every call, which dominates the cost of scoring one reading.
+Here every tree of a fitted RandomForestClassifier or IsolationForest is
+flattened into packed NumPy node arrays once, and all trees are walked
+together, one level per step, for a single row or a batch. Batches of
+NATIVE_BATCH_ROWS or more go through sklearn's per-tree Cython walk instead,
+which is faster at that size, and share the same accumulation.
+
+Results match sklearn: inputs are cast to float32 (as sklearn does) before
+being compared with the float64 thresholds, and per-tree outputs are summed
+in tree order.
+"""
+import os
+import pickle
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+# Forests compiled by load_compiled_models, by file name
+MODEL_FILES = ('disease_classifier', 'trend_classifier', 'anomaly_detector')
+# From this many rows, per-tree outputs are added tree by tree instead of
+# through one (n_trees, n_rows, ...) temporary
+LOOP_SUM_ROWS = 256
+# From this many rows the level walk falls behind sklearn's per-tree Cython
+# walk (the (tree, row) arrays outgrow the CPU cache), which is used instead
+NATIVE_BATCH_ROWS = 2048
+# Finished (tree, row) pairs are dropped from the walk whenever the share of
+# pairs still walking is expected to have fallen by this factor
+COMPACT_RATIO = 0.5
+
+
+class PackedTrees:
+    """Every tree of an ensemble in one set of flat node arrays."""
+
+    ARRAYS = ('feature', 'threshold', 'children', 'is_leaf', 'roots')
+
+    def __init__(self, trees, feature_maps=None):
+        sizes = [tree.node_count for tree in trees]
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+        n_nodes = int(sum(sizes))
+
+        self.feature = np.zeros(n_nodes, dtype=np.int64)
+        self.threshold = np.zeros(n_nodes, dtype=np.float64)
+        # Left/right child of node i at 2i/2i+1; leaves point at themselves
+        self.children = np.empty(2 * n_nodes, dtype=np.int64)
+        for t, (tree, offset) in enumerate(zip(trees, offsets)):
+            nodes = np.arange(tree.node_count) + offset
+            leaf = tree.children_left == -1
+            feature = tree.feature.astype(np.int64)
+            if feature_maps is not None:
+                # Trees fitted on a feature subset index into that subset
+                feature = np.where(leaf, 0, np.asarray(feature_maps[t])[np.maximum(feature, 0)])
+            self.feature[nodes] = np.where(leaf, 0, feature)
+            self.threshold[nodes] = np.where(leaf, 0.0, tree.threshold)
+            self.children[2 * nodes] = np.where(leaf, nodes, tree.children_left + offset)
+            self.children[2 * nodes + 1] = np.where(leaf, nodes, tree.children_right + offset)
+
+        self.is_leaf = self.children[0::2] == np.arange(n_nodes)
+        self.roots = offsets
+        self.n_trees = len(trees)
+        self.n_nodes = n_nodes
+        self.depth = max(tree.max_depth for tree in trees)
+        self.compact_levels = self._compact_schedule(trees)
+        # sklearn's own Cython walkers, for batches too large for the level walk
+        self.native = list(zip(trees, offsets, feature_maps if feature_maps is not None
+                               else [None] * len(trees)))
+
+    def get_state(self):
+        """(arrays, params) from which from_state rebuilds these trees."""
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        params = {'n_trees': self.n_trees, 'n_nodes': self.n_nodes, 'depth': self.depth,
+                  'compact_levels': sorted(self.compact_levels)}
+        return arrays, params
+
+    @classmethod
+    def from_state(cls, arrays, params):
+        """Trees over existing node arrays (e.g. read-only memory maps)."""
+        self = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(self, name, np.asarray(arrays[name]))
+        self.n_trees = params['n_trees']
+        self.n_nodes = params['n_nodes']
+        self.depth = params['depth']
+        self.compact_levels = set(params['compact_levels'])
+        self.native = []  # No sklearn trees: every batch takes the level walk
+        return self
+
+    def _compact_schedule(self, trees):
+        """Levels after which to compact, from where the training samples ended up."""
+        # Share of (tree, row) pairs still walking after each level
+        walking = np.zeros(self.depth + 1)
+        for tree in trees:
+            leaf = tree.children_left == -1
+            share = tree.n_node_samples[leaf] / tree.n_node_samples[0] / len(trees)
+            np.add.at(walking, _node_depths(tree)[leaf].astype(np.int64), share)
+        walking = 1.0 - np.cumsum(walking)
+
+        levels, current = set(), 1.0
+        for level in range(self.depth - 1):
+            if walking[level + 1] <= current * COMPACT_RATIO:
+                levels.add(level)
+                current = walking[level + 1]
+        return levels
+
+    def apply(self, X):
+        """Global leaf index of every (tree, row): shape (n_trees, n_rows)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+        n, n_features = X.shape
+        if n >= NATIVE_BATCH_ROWS and self.native:
+            return self._apply_native(np.ascontiguousarray(X))
+        values = X.astype(np.float64).ravel()  # float32 values, compared in float64
+
+        # Flat (tree, row) pairs. Leaves point at themselves, so finished pairs
+        # can keep stepping; at the scheduled levels the finished ones are
+        # dropped, so shallow trees stop costing the depth of the deepest one.
+        leaves = np.repeat(self.roots, n)
+        pairs = None
+        idx = leaves
+        row_base = np.tile(np.arange(n, dtype=np.int64) * n_features, self.n_trees)
+        for level in range(self.depth):
+            # take(mode='clip') skips the bounds checks of fancy indexing
+            go_right = (values.take(row_base + self.feature.take(idx, mode='clip'), mode='clip')
+                        > self.threshold.take(idx, mode='clip'))
+            idx = self.children.take(2 * idx + go_right, mode='clip')
+            if level not in self.compact_levels:
+                continue
+            inner = ~self.is_leaf.take(idx, mode='clip')
+            if pairs is None:
+                leaves, pairs = idx, np.arange(idx.size)
+            else:
+                leaves[pairs] = idx
+            pairs, idx, row_base = pairs[inner], idx[inner], row_base[inner]
+        if pairs is None:
+            leaves = idx
+        else:
+            leaves[pairs] = idx
+        return leaves.reshape(self.n_trees, n)
+
+    def _apply_native(self, X):
+        leaves = np.empty((self.n_trees, len(X)), dtype=np.int64)
+        for t, (tree, offset, features) in enumerate(self.native):
+            rows = X if features is None else np.ascontiguousarray(X[:, features])
+            leaves[t] = tree.apply(rows) + offset
+        return leaves
+
+
+def _sum_trees(values, leaves):
+    """Sum values[leaves] over the tree axis, one tree after another like sklearn."""
+    if leaves.shape[1] < LOOP_SUM_ROWS:
+        # .sum() switches to pairwise summation for a single row; cumsum never does
+        return np.cumsum(values[leaves], axis=0)[-1]
+    total = values[leaves[0]]
+    for tree_leaves in leaves[1:]:
+        total += values[tree_leaves]
+    return total
+
+
+class CompiledForestClassifier:
+    """Drop-in predict/predict_proba for a fitted RandomForestClassifier."""
+
+    def __init__(self, model):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        self.trees = PackedTrees(trees)
+        self.classes_ = model.classes_
+        self.n_classes_ = len(model.classes_)
+        self.n_features_in_ = model.n_features_in_
+        self.feature_names_in_ = getattr(model, 'feature_names_in_', None)
+
+        # Per-node class probabilities. sklearn >= 1.4 stores them in tree_.value
+        # and uses them as-is; older pickles hold class counts to normalize.
+        self.leaf_proba = np.empty((self.trees.n_nodes, self.n_classes_))
+        start = 0
+        for tree in trees:
+            proba = tree.value[:, 0, :self.n_classes_].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            if not np.allclose(normalizer, 1.0):
+                normalizer[normalizer == 0.0] = 1.0
+                proba /= normalizer
+            self.leaf_proba[start:start + tree.node_count] = proba
+            start += tree.node_count
+
+    def get_state(self):
+        arrays, params = _tree_state(self.trees)
+        arrays['leaf_proba'] = self.leaf_proba
+        params.update(classes=self.classes_.tolist(), n_features_in=self.n_features_in_)
+        return arrays, params
+
+    @classmethod
+    def from_state(cls, arrays, params):
+        self = cls.__new__(cls)
+        self.trees = _trees_from_state(arrays, params)
+        self.leaf_proba = np.asarray(arrays['leaf_proba'])
+        self.classes_ = np.array(params['classes'])
+        self.n_classes_ = len(self.classes_)
+        self.n_features_in_ = params['n_features_in']
+        self.feature_names_in_ = None
+        return self
+
+    def predict_proba(self, X):
+        proba = _sum_trees(self.leaf_proba, self.trees.apply(X))
+        proba /= self.trees.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1), axis=0)
+
+
+def _average_path_length(n_samples_leaf):
+    """sklearn.ensemble._iforest._average_path_length."""
+    n_samples_leaf = np.asarray(n_samples_leaf, dtype=np.float64)
+    result = np.zeros(n_samples_leaf.shape)
+    small = n_samples_leaf <= 1
+    two = n_samples_leaf == 2
+    rest = ~(small | two)
+    result[two] = 1.0
+    result[rest] = (2.0 * (np.log(n_samples_leaf[rest] - 1.0) + np.euler_gamma)
+                    - 2.0 * (n_samples_leaf[rest] - 1.0) / n_samples_leaf[rest])
+    return result
+
+
+class CompiledIsolationForest:
+    """Drop-in score_samples/decision_function/predict for a fitted IsolationForest."""
+
+    def __init__(self, model):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        subsampled = model._max_features != model.n_features_in_
+        self.trees = PackedTrees(trees, model.estimators_features_ if subsampled else None)
+        self.offset_ = model.offset_
+        self.n_features_in_ = model.n_features_in_
+
+        # Path length credited to a row ending in each node, as in _parallel_compute_tree_depths
+        if hasattr(model, '_decision_path_lengths'):
+            path_lengths = model._decision_path_lengths
+            average_lengths = model._average_path_length_per_tree
+        else:
+            path_lengths = [_node_depths(tree) + 1.0 for tree in trees]
+            average_lengths = [_average_path_length(tree.n_node_samples) for tree in trees]
+        self.leaf_depth = np.concatenate([
+            path + average - 1.0 for path, average in zip(path_lengths, average_lengths)
+        ])
+        self.denominator = self.trees.n_trees * _average_path_length([model._max_samples])[0]
+
+    def get_state(self):
+        arrays, params = _tree_state(self.trees)
+        arrays['leaf_depth'] = self.leaf_depth
+        params.update(offset=float(self.offset_), denominator=float(self.denominator),
+                      n_features_in=self.n_features_in_)
+        return arrays, params
+
+    @classmethod
+    def from_state(cls, arrays, params):
+        self = cls.__new__(cls)
+        self.trees = _trees_from_state(arrays, params)
+        self.leaf_depth = np.asarray(arrays['leaf_depth'])
+        self.offset_ = params['offset']
+        self.denominator = params['denominator']
+        self.n_features_in_ = params['n_features_in']
+        return self
+
+    def score_samples(self, X):
+        depths = _sum_trees(self.leaf_depth, self.trees.apply(X))
+        if self.denominator == 0:
+            return -np.ones_like(depths)
+        return -(2 ** (-depths / self.denominator))
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X):
+        is_inlier = np.ones(len(np.atleast_2d(X)), dtype=int)
+        is_inlier[self.decision_function(X) < 0] = -1
+        return is_inlier
+
+
+def _tree_state(trees):
+    arrays, params = trees.get_state()
+    return {f'trees.{name}': array for name, array in arrays.items()}, {'trees': params}
+
+
+def _trees_from_state(arrays, params):
+    return PackedTrees.from_state({name: arrays[f'trees.{name}'] for name in PackedTrees.ARRAYS},
+                                  params['trees'])
+
+
+def _node_depths(tree):
+    """Depth of every node (root = 0)."""
+    depth = np.zeros(tree.node_count)
+    level, frontier = 0, np.array([0])
+    while frontier.size:
+        depth[frontier] = level
+        children = np.concatenate((tree.children_left[frontier], tree.children_right[frontier]))
+        level, frontier = level + 1, children[children != -1]
+    return depth
+
+
+def compile_model(model):
+    """Compiled counterpart of a fitted forest (other models are returned as-is)."""
+    kind = type(model).__name__
+    if kind == 'RandomForestClassifier':
+        return CompiledForestClassifier(model)
+    if kind == 'IsolationForest':
+        return CompiledIsolationForest(model)
+    return model
+
+
+def load_compiled_models(models_dir=MODELS_DIR, names=MODEL_FILES):
+    """Unpickle and compile every forest of names found in models_dir."""
+    models = {}
+    for name in names:
+        path = os.path.join(models_dir, f'{name}.pkl')
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            models[name] = compile_model(pickle.load(f))
+    return models
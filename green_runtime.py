@@ -0,0 +1,109 @@
+"""
+Eventlet runtime helpers.
+app.py monkey-patches eventlet, so every "thread" in the server is a green
+thread sharing one OS thread, and any long CPU-bound or blocking C call
+(sklearn inference, SQLite commits) stalls the hub and with it every HTTP
+request and socket. run_blocking moves such calls onto eventlet's pool of
+real OS threads; HubMonitor measures how late the hub wakes a sleeper.
+Anything those OS threads share with the hub must be guarded by os_lock():
+a monkey-patched threading.Lock is a green lock, and contending for it
+from several OS threads deadlocks.
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    from eventlet import tpool
+    from eventlet.patcher import is_monkey_patched, original
+except ImportError:  # Plain threading (scripts, benchmarks)
+    tpool = None
+
+# Hub probe: sleep this long and measure how late the wakeup is
+PROBE_INTERVAL = 0.05
+# Wakeups later than this count as stalls
+STALL_THRESHOLD = 0.02
+# Recent lags kept for percentiles (one minute at the default interval)
+PROBE_WINDOW = 1200
+
+
+def green_mode():
+    """True when threads are eventlet green threads (app.py after monkey_patch)."""
+    return tpool is not None and is_monkey_patched('thread')
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Run fn on a real OS thread when under eventlet, inline otherwise."""
+    if green_mode():
+        return tpool.execute(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+def on_tpool_thread():
+    """True inside a run_blocking() call under eventlet (an OS thread other than the hub's)."""
+    return green_mode() and original('threading').get_ident() != threading.main_thread().ident
+
+
+def os_lock():
+    """
+    A lock that is safe to take from run_blocking() calls and green threads
+    alike: the unpatched threading.Lock under eventlet, threading.Lock otherwise.
+    Hold it only for short sections that never yield to the hub.
+    """
+    if green_mode():
+        return original('threading').Lock()
+    return threading.Lock()
+
+
+class HubMonitor:
+    def __init__(self, socketio, interval=PROBE_INTERVAL, threshold=STALL_THRESHOLD):
+        self.socketio = socketio
+        self.interval = interval
+        self.threshold = threshold
+        self.lags = deque(maxlen=PROBE_WINDOW)
+        self.lock = threading.Lock()
+        self.running = False
+        self.stats = {
+            'probes': 0,
+            'stalls': 0,             # Wakeups later than the threshold
+            'stalled_ms_total': 0.0,
+            'max_stall_ms': 0.0
+        }
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.socketio.start_background_task(self._probe)
+
+    def stop(self):
+        self.running = False
+
+    def _probe(self):
+        while self.running:
+            expected = time.perf_counter() + self.interval
+            self.socketio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            with self.lock:
+                self.lags.append(lag)
+                self.stats['probes'] += 1
+                if lag > self.threshold:
+                    self.stats['stalls'] += 1
+                    self.stats['stalled_ms_total'] += lag * 1000
+                self.stats['max_stall_ms'] = max(self.stats['max_stall_ms'], lag * 1000)
+
+    def get_stats(self):
+        """Counters plus percentiles of the recent wakeup lag (ms)."""
+        with self.lock:
+            stats = dict(self.stats)
+            lags = np.array(self.lags) * 1000
+        stats['green_mode'] = green_mode()
+        if len(lags):
+            stats['lag_ms'] = {
+                'p50': round(float(np.percentile(lags, 50)), 2),
+                'p99': round(float(np.percentile(lags, 99)), 2),
+                'max': round(float(lags.max()), 2)
+            }
+        return stats
@@ -0,0 +1,80 @@
+"""
+Fused health prediction.
+predict_health used to call anomaly_detector.predict and .score_samples
+(two walks of the isolation trees), classifier.predict and .predict_proba
+(two walks of the forest) and label_encoder.inverse_transform for every
+reading. HealthPredictor walks each forest once: the anomaly flag comes
+from the score and the detector's offset, the label from the probability
+argmax, looked up in a precomputed array of label strings. Each stage is
+timed into metrics.PREDICT_SECONDS.
+"""
+import time
+
+import numpy as np
+
+from metrics import PREDICT_SECONDS
+
+SCALE_SECONDS = PREDICT_SECONDS.labels('scale')
+ANOMALY_SECONDS = PREDICT_SECONDS.labels('anomaly_detector')
+CLASSIFIER_SECONDS = PREDICT_SECONDS.labels('classifier')
+FORMAT_SECONDS = PREDICT_SECONDS.labels('format')
+
+
+class HealthPredictor:
+    def __init__(self, scaler, anomaly_detector, classifier, label_encoder):
+        self.scaler = scaler
+        self.anomaly_detector = anomaly_detector
+        self.classifier = classifier
+        # StandardScaler.transform is (X - mean_) / scale_; done inline it
+        # skips sklearn's per-call input validation and gives the same floats
+        self.standard = getattr(scaler, 'with_mean', False) and getattr(scaler, 'with_std', False)
+        # Label string of every classifier output column
+        self.labels = label_encoder.inverse_transform(classifier.classes_).tolist()
+        self.class_names = label_encoder.classes_.tolist()
+
+    def scale(self, features):
+        if not self.standard:
+            return self.scaler.transform(features)
+        scaled = np.array(features, dtype=np.float64)
+        scaled -= self.scaler.mean_
+        scaled /= self.scaler.scale_
+        return scaled
+
+    def predict(self, features):
+        """One prediction dict per row of an (n, 18) feature matrix."""
+        start = time.perf_counter()
+        features_scaled = self.scale(features)
+        scaled = time.perf_counter()
+        anomaly_score_raw = self.anomaly_detector.score_samples(features_scaled)
+        # IsolationForest.predict: -1 where score_samples - offset_ < 0
+        is_anomaly = anomaly_score_raw - self.anomaly_detector.offset_ < 0
+        scored = time.perf_counter()
+        disease_proba = self.classifier.predict_proba(features_scaled)
+        best = disease_proba.argmax(axis=1)
+        classified = time.perf_counter()
+
+        results = []
+        for label_index, anomalous, raw, proba in zip(best.tolist(), is_anomaly.tolist(),
+                                                      anomaly_score_raw.tolist(), disease_proba.tolist()):
+            label = self.labels[label_index]
+            anomaly_score = max(0, min(100, 50 - raw * 100))
+            confidence = proba[label_index]
+            if label == 'healthy':
+                health_score = min(100, max(50, 100 - anomaly_score))
+            else:
+                health_score = max(0, 100 - anomaly_score - (1 - confidence) * 30)
+            results.append({
+                'health_status': label,
+                'health_score': round(health_score, 1),
+                'is_anomaly': anomalous,
+                'anomaly_score': round(anomaly_score, 1),
+                'confidence': round(confidence * 100, 1),
+                'class_probabilities': {
+                    name: round(p * 100, 1) for name, p in zip(self.class_names, proba)
+                }
+            })
+        SCALE_SECONDS.observe(scaled - start)
+        ANOMALY_SECONDS.observe(scored - scaled)
+        CLASSIFIER_SECONDS.observe(classified - scored)
+        FORMAT_SECONDS.observe(time.perf_counter() - classified)
+        return results
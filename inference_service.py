@@ -0,0 +1,427 @@
+"""
+Out-of-process inference.
+Model evaluation inside the eventlet process serializes with every HTTP
+request and socket emit, and uses one core. InferenceService runs the
+models in worker processes, each loading them once (the memory-mapped
+bundle when there is one). Callers submit feature matrices and get a
+Future; waiting on it only parks the calling green thread. Requests that
+arrive within BATCH_WINDOW are stacked into one matrix per model kind,
+split into chunks of at most MAX_BATCH_ROWS and spread over the least
+busy workers.
+
+Workers are plain subprocesses connected back over an authenticated
+localhost socket (multiprocessing's spawn/forkserver would re-import
+app.py in every child). reload() moves them to another models directory
+one worker at a time; each worker keeps its previous models for rollback().
+
+Futures are resolved by the service's receiver threads, which are green
+threads under eventlet: wait on them (predict, reload, rollback) from green
+threads only. A run_blocking() caller could never be woken, so the blocking
+calls raise there instead of hanging.
+"""
+import itertools
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+from green_runtime import on_tpool_thread
+from metrics import INFERENCE_REQUEST_SECONDS
+from model_bundle import load_health_predictor, load_trend_classifier, LazyModel, MODELS_DIR
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Requests arriving within this window go to the workers together
+BATCH_WINDOW = 0.005
+# Rows per task sent to one worker; larger batches are split across workers
+MAX_BATCH_ROWS = 1024
+# Seconds predict() waits for a result
+PREDICT_TIMEOUT = 30.0
+# Seconds start() waits for every worker to load its models (reload(): per worker)
+START_TIMEOUT = 120.0
+# Rows of zeros each model predicts after loading, before it serves
+WARMUP_ROWS = 8
+
+
+def _check_waiter():
+    if on_tpool_thread():
+        raise RuntimeError('Inference results must be awaited from a green thread, not run_blocking()')
+
+
+class _Request:
+    """One submit(): its rows may be answered by several tasks."""
+
+    def __init__(self, n_rows, timer=None):
+        self.future = Future()
+        self.n_rows = n_rows
+        self.timer = timer  # Histogram child for the submit-to-result time
+        self.started = time.perf_counter()
+        self.parts = {}  # {row offset: results}
+        self.received = 0
+        self.lock = threading.Lock()
+
+    def add(self, offset, results):
+        with self.lock:
+            self.parts[offset] = results
+            self.received += len(results)
+            if self.received < self.n_rows:
+                return
+            parts = [self.parts[k] for k in sorted(self.parts)]
+        if self.timer is not None:
+            self.timer.observe(time.perf_counter() - self.started)
+        if isinstance(parts[0], np.ndarray):
+            self.future.set_result(np.concatenate(parts))
+        else:
+            self.future.set_result([result for part in parts for result in part])
+
+    def fail(self, error):
+        with self.lock:
+            if not self.future.done():
+                self.future.set_exception(error)
+
+
+class _Worker:
+    def __init__(self, process, conn, hello):
+        self.process = process
+        self.conn = conn
+        self.pid = hello['pid']
+        self.tasks = {}  # {task_id: [(request, offset, n_rows)]} sent, not yet answered
+        self.send_lock = threading.Lock()
+        self.alive = True
+
+
+class InferenceClient:
+    """One model kind of an InferenceService, with the model's own method names."""
+
+    def __init__(self, service, kind):
+        self.service = service
+        self.kind = kind
+
+    @property
+    def classes_(self):
+        return np.array(self.service.classes[self.kind])
+
+    def predict(self, features):
+        """Health kind: one prediction dict per row, as HealthPredictor.predict."""
+        return self.service.predict(self.kind, features)
+
+    def predict_proba(self, features):
+        """Trend kind: class probabilities, as the classifier's predict_proba."""
+        return self.service.predict(self.kind, features)
+
+
+class InferenceService:
+    def __init__(self, n_workers=None, models_dir=MODELS_DIR,
+                 batch_window=BATCH_WINDOW, max_batch=MAX_BATCH_ROWS):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.models_dir = models_dir
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.workers = []
+        self.kinds = set()     # Model kinds every worker could load
+        self.classes = {}      # {kind: class labels} for classifier kinds
+        self.fingerprint = None
+        self.pending = []      # [(kind, request, features)] waiting for the batch window
+        self.first_pending = None
+        self.cond = threading.Condition()
+        self.task_ids = itertools.count()
+        self.running = False
+        self.stats = {'requests': 0, 'rows': 0, 'tasks': 0, 'batches': 0, 'errors': 0}
+
+    def start(self):
+        """Start the workers and wait until each has loaded its models."""
+        if self.running:
+            return
+        authkey = secrets.token_bytes(16)
+        listener = Listener(('127.0.0.1', 0), authkey=authkey)
+        host, port = listener.address
+        env = dict(os.environ, INFERENCE_AUTHKEY=authkey.hex())
+        processes = {}
+        for _ in range(self.n_workers):
+            process = subprocess.Popen(
+                [sys.executable, os.path.join(ROOT_DIR, 'inference_service.py'),
+                 '--worker', host, str(port), self.models_dir], env=env, cwd=ROOT_DIR)
+            processes[process.pid] = process
+
+        # Unblocks accept() if a worker never connects (e.g. it crashed on import)
+        watchdog = threading.Timer(START_TIMEOUT, listener.close)
+        watchdog.daemon = True
+        watchdog.start()
+        kinds = None
+        try:
+            for _ in range(self.n_workers):
+                conn = listener.accept()
+                hello = conn.recv()
+                worker = _Worker(processes[hello['pid']], conn, hello)
+                self.workers.append(worker)
+                kinds = set(hello['kinds']) if kinds is None else kinds & set(hello['kinds'])
+                self.classes.update(hello['classes'])
+                self.fingerprint = hello['fingerprint']
+        except OSError:
+            for process in processes.values():
+                process.kill()
+            raise RuntimeError(f'Inference workers did not start within {START_TIMEOUT:.0f}s')
+        finally:
+            watchdog.cancel()
+            listener.close()
+        self.kinds = kinds or set()
+
+        self.running = True
+        for worker in self.workers:
+            threading.Thread(target=self._receive, args=(worker,), daemon=True).start()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+        print(f"[OK] Inference service: {len(self.workers)} workers ({', '.join(sorted(self.kinds)) or 'no models'})")
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        for worker in self.workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            try:
+                worker.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+
+    def client(self, kind):
+        return InferenceClient(self, kind)
+
+    def reload(self, models_dir):
+        """
+        Move every worker to the models in models_dir. Workers load and warm
+        them one at a time while the others keep serving, and each keeps its
+        previous models; if any worker fails, those already moved roll back.
+        Call from a green thread, not through run_blocking().
+        """
+        _check_waiter()
+        moved = []
+        try:
+            for worker in self._alive_workers():
+                hello = self._control(worker, 'reload', models_dir)
+                moved.append(worker)
+        except Exception:
+            for worker in moved:
+                self._control(worker, 'rollback', None)
+            raise
+        self._hello(hello)
+        self.models_dir = models_dir
+        return self.fingerprint
+
+    def rollback(self):
+        """Every worker back to the models it served before the last reload() (green threads only)."""
+        _check_waiter()
+        for worker in self._alive_workers():
+            hello = self._control(worker, 'rollback', None)
+        self._hello(hello)
+        return self.fingerprint
+
+    def _alive_workers(self):
+        alive = [w for w in self.workers if w.alive]
+        if not alive:
+            raise RuntimeError('No inference workers left')
+        return alive
+
+    def _control(self, worker, op, argument):
+        # Queued behind the worker's tasks, so every earlier request is answered first
+        request = _Request(1)
+        task_id = next(self.task_ids)
+        worker.tasks[task_id] = [(request, 0, 1)]
+        try:
+            with worker.send_lock:
+                worker.conn.send((task_id, op, argument))
+        except OSError:
+            self._worker_lost(worker)
+        return request.future.result(START_TIMEOUT)[0]
+
+    def _hello(self, hello):
+        self.kinds = set(hello['kinds'])
+        self.classes.update(hello['classes'])
+        self.fingerprint = hello['fingerprint']
+
+    def submit(self, kind, features):
+        """Future of the kind's predictions for every row of features."""
+        features = np.atleast_2d(np.asarray(features, dtype=np.float64))
+        request = _Request(len(features), INFERENCE_REQUEST_SECONDS.labels(kind))
+        if not self.running:
+            request.fail(RuntimeError('Inference service is not running'))
+        elif kind not in self.kinds:
+            request.fail(RuntimeError(f'Inference workers have no {kind} model'))
+        elif len(features) == 0:
+            request.future.set_result([] if kind == 'health' else np.empty((0, len(self.classes[kind]))))
+        else:
+            with self.cond:
+                if not self.pending:
+                    self.first_pending = time.monotonic()
+                self.pending.append((kind, request, features))
+                self.stats['requests'] += 1
+                self.stats['rows'] += len(features)
+                self.cond.notify()
+        return request.future
+
+    def predict(self, kind, features, timeout=PREDICT_TIMEOUT):
+        _check_waiter()
+        return self.submit(kind, features).result(timeout)
+
+    def _dispatch(self):
+        """Collect requests for one batch window, then send them out as tasks."""
+        while True:
+            with self.cond:
+                while self.running and not self.pending:
+                    self.cond.wait()
+                if not self.running:
+                    break
+                while self.running:
+                    rows = sum(len(features) for _, _, features in self.pending)
+                    remaining = self.first_pending + self.batch_window - time.monotonic()
+                    if rows >= self.max_batch or remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                pending, self.pending = self.pending, []
+            self.stats['batches'] += 1
+            for kind in {kind for kind, _, _ in pending}:
+                self._send_tasks(kind, [(r, f) for k, r, f in pending if k == kind])
+
+    def _send_tasks(self, kind, requests):
+        # Pack requests into tasks of at most max_batch rows, splitting large ones
+        tasks, segments, blocks, rows = [], [], [], 0
+        for request, features in requests:
+            offset = 0
+            while offset < len(features):
+                n = min(len(features) - offset, self.max_batch - rows)
+                segments.append((request, offset, n))
+                blocks.append(features[offset:offset + n])
+                offset += n
+                rows += n
+                if rows == self.max_batch:
+                    tasks.append((segments, blocks))
+                    segments, blocks, rows = [], [], 0
+        if segments:
+            tasks.append((segments, blocks))
+
+        for segments, blocks in tasks:
+            alive = [w for w in self.workers if w.alive]
+            if not alive:
+                for request, _, _ in segments:
+                    request.fail(RuntimeError('No inference workers left'))
+                continue
+            worker = min(alive, key=lambda w: len(w.tasks))
+            task_id = next(self.task_ids)
+            worker.tasks[task_id] = segments
+            self.stats['tasks'] += 1
+            try:
+                with worker.send_lock:
+                    worker.conn.send((task_id, kind, np.concatenate(blocks)))
+            except OSError:
+                self._worker_lost(worker)
+
+    def _receive(self, worker):
+        """Hand results from one worker to the requests they belong to."""
+        while True:
+            try:
+                task_id, ok, results = worker.conn.recv()
+            except (EOFError, OSError):
+                if self.running:
+                    self._worker_lost(worker)
+                return
+            segments = worker.tasks.pop(task_id, [])
+            if not ok:
+                self.stats['errors'] += 1
+                for request, _, _ in segments:
+                    request.fail(RuntimeError(results))
+                continue
+            position = 0
+            for request, offset, n in segments:
+                request.add(offset, results[position:position + n])
+                position += n
+
+    def _worker_lost(self, worker):
+        if not worker.alive:
+            return
+        worker.alive = False
+        print(f"[WARNING] Inference worker {worker.pid} exited; failing its {len(worker.tasks)} tasks")
+        for segments in worker.tasks.values():
+            for request, _, _ in segments:
+                request.fail(RuntimeError('Inference worker exited'))
+        worker.tasks.clear()
+
+    def get_stats(self):
+        return dict(self.stats, workers=sum(w.alive for w in self.workers), pending=len(self.pending),
+                    in_flight=sum(len(w.tasks) for w in self.workers),
+                    kinds=sorted(self.kinds), fingerprint=self.fingerprint)
+
+
+# ==================== WORKER PROCESS ====================
+
+def _load_worker_models(models_dir):
+    """({kind: model}, {kind: class labels}, fingerprint), every model loaded and warmed."""
+    models, classes, fingerprint = {}, {}, None
+    try:
+        predictor, fingerprint = load_health_predictor(models_dir)
+        predictor = predictor.resolve() if isinstance(predictor, LazyModel) else predictor
+        predictor.predict(np.zeros((WARMUP_ROWS, len(predictor.scaler.mean_))))
+        models['health'] = predictor
+    except Exception as e:
+        print(f"[WARNING] Inference worker {os.getpid()}: no health models: {e}")
+    try:
+        trend = load_trend_classifier(models_dir)
+        trend = trend.resolve() if isinstance(trend, LazyModel) else trend
+        trend.predict_proba(np.zeros((WARMUP_ROWS, trend.n_features_in_)))
+        models['trend'] = trend
+        classes['trend'] = trend.classes_.tolist()
+    except Exception as e:
+        print(f"[WARNING] Inference worker {os.getpid()}: no trend classifier: {e}")
+    return models, classes, fingerprint
+
+
+def _worker_main(host, port, models_dir):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent shuts workers down
+    conn = Client((host, int(port)), authkey=bytes.fromhex(os.environ['INFERENCE_AUTHKEY']))
+    current = _load_worker_models(models_dir)
+    previous = current
+
+    def hello():
+        models, classes, fingerprint = current
+        return {'pid': os.getpid(), 'kinds': list(models), 'classes': classes, 'fingerprint': fingerprint}
+    conn.send(hello())
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        task_id, kind, features = message
+        try:
+            if kind == 'reload':
+                loaded = _load_worker_models(features)
+                if 'health' not in loaded[0]:
+                    raise RuntimeError(f'no health models in {features}')
+                current, previous = loaded, current
+                results = [hello()]
+            elif kind == 'rollback':
+                current, previous = previous, current
+                results = [hello()]
+            elif kind == 'health':
+                results = current[0][kind].predict(features)
+            else:
+                results = current[0][kind].predict_proba(features)
+            conn.send((task_id, True, results))
+        except Exception as e:
+            conn.send((task_id, False, f'{type(e).__name__}: {e}'))
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == '--worker':
+        _worker_main(*sys.argv[2:])
@@ -0,0 +1,269 @@
+"""
+Socket Fan-out Load Generator
+=============================
+Opens N socket.io clients against a local app.py, subscribes them across
+M pets and measures end-to-end latency from the server timestamp in each
+payload to its receipt, plus dropped frames and server CPU.
+
+Usage:
+    python load_test_socket.py --spawn --clients 200 --pets 50 --duration 30
+    python load_test_socket.py --server-pid 1234 --encoding compact --report load.json
+
+Servers not started with --spawn should run with SIM_ADAPTIVE=0, otherwise
+stable pets read every 10 s and their gaps count as dropped frames.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import socketio
+
+from stream_codec import DeltaDecoder, unpackb
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CLK_TCK = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+# ==================== SERVER CPU ====================
+
+def _proc_children():
+    """{ppid: [pid, ...]} from /proc (Linux only)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+        except (OSError, IndexError):
+            continue
+    return children
+
+
+def process_tree_cpu_seconds(pid):
+    """utime + stime of pid and all its descendants (covers the debug reloader)."""
+    if not os.path.isdir('/proc'):
+        return None
+    children = _proc_children()
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f'/proc/{current}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+        except (OSError, IndexError):
+            pass
+        stack.extend(children.get(current, []))
+    return total / CLK_TCK
+
+
+# ==================== CLIENTS ====================
+
+class LoadClient:
+    def __init__(self, index, url, pet_ids, encoding, stats):
+        self.index = index
+        self.url = url
+        self.pet_ids = pet_ids
+        self.encoding = encoding
+        self.stats = stats
+        self.decoders = {}
+        self.last_ts = {}  # {pet_id: last payload timestamp}
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('connect', self.on_connect)
+        self.sio.on('live_reading', self.on_reading)
+        self.sio.on('live_reading_compact', self.on_compact)
+
+    def on_connect(self):
+        for pet_id in self.pet_ids:
+            self.sio.emit('subscribe_pet', {'pet_id': pet_id, 'encoding': self.encoding})
+
+    def on_compact(self, data):
+        # One decoder per pet; the pet id is the third frame element
+        pet_id = unpackb(data)[2]
+        payload = self.decoders.setdefault(pet_id, DeltaDecoder()).decode(data)
+        if payload is None:
+            self.stats.record_gap()
+            return
+        self.on_reading(payload, size=len(data))
+
+    def on_reading(self, payload, size=None):
+        received = time.time()
+        sent = datetime.fromisoformat(payload['timestamp']).timestamp()
+        pet_id = payload['pet_id']
+        previous = self.last_ts.get(pet_id)
+        self.last_ts[pet_id] = sent
+        if size is None:
+            size = len(json.dumps(payload, separators=(',', ':')))
+        self.stats.record(received - sent, previous, sent, size)
+
+    def start(self):
+        try:
+            self.sio.connect(self.url, transports=['websocket'])
+            return True
+        except Exception as e:
+            self.stats.record_failure(str(e))
+            return False
+
+    def stop(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+
+class LoadStats:
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.bytes = 0
+        self.dropped = 0
+        self.desynced = 0
+        self.failures = []
+        self.recording = False
+
+    def record(self, latency, previous, sent, size):
+        with self.lock:
+            if not self.recording:
+                return
+            self.latencies.append(latency)
+            self.bytes += size
+            # Missing timestamps between consecutive frames of one subscription
+            if previous is not None and sent - previous > 1.5 * self.interval:
+                self.dropped += int(round((sent - previous) / self.interval)) - 1
+
+    def record_gap(self):
+        with self.lock:
+            self.desynced += 1
+
+    def record_failure(self, error):
+        with self.lock:
+            self.failures.append(error)
+
+
+# ==================== MAIN ====================
+
+def wait_for_port(host, port, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def run(args):
+    server = None
+    server_pid = args.server_pid
+    if args.spawn:
+        # Fixed 1 Hz per pet, so timestamp gaps are real drops and not stable-tier pets
+        env = dict(os.environ, SIM_ADAPTIVE=os.environ.get('SIM_ADAPTIVE', '0'))
+        server = subprocess.Popen([sys.executable, 'app.py'], cwd=ROOT_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        server_pid = server.pid
+        if not wait_for_port('127.0.0.1', args.port, args.startup_timeout):
+            server.terminate()
+            sys.exit("Server did not come up")
+
+    ports = [int(p) for p in args.ports.split(',')] if args.ports else [args.port]
+    stats = LoadStats(args.interval)
+    pets = list(range(1, args.pets + 1))
+    clients = []
+    print(f"Connecting {args.clients} clients over {args.pets} pets ({args.encoding})...")
+    for i in range(args.clients):
+        pet_ids = [pets[(i * args.pets_per_client + j) % len(pets)] for j in range(args.pets_per_client)]
+        # Round-robin over ports exercises every worker of a sharded deployment
+        url = f"http://127.0.0.1:{ports[i % len(ports)]}"
+        client = LoadClient(i, url, pet_ids, args.encoding, stats)
+        if client.start():
+            clients.append(client)
+        if args.ramp:
+            time.sleep(args.ramp / args.clients)
+
+    print(f"Connected {len(clients)}; warming up {args.warmup}s...")
+    time.sleep(args.warmup)
+
+    cpu_start = process_tree_cpu_seconds(server_pid) if server_pid else None
+    wall_start = time.time()
+    with stats.lock:
+        stats.recording = True
+    print(f"Measuring for {args.duration}s...")
+    time.sleep(args.duration)
+    with stats.lock:
+        stats.recording = False
+    wall = time.time() - wall_start
+    cpu_end = process_tree_cpu_seconds(server_pid) if server_pid else None
+
+    for client in clients:
+        client.stop()
+    if server is not None:
+        server.terminate()
+        server.wait(timeout=10)
+
+    lat = np.array(stats.latencies) * 1000
+    subscriptions = len(clients) * args.pets_per_client
+    expected = subscriptions * args.duration / args.interval
+    report = {
+        'config': {
+            'clients': args.clients, 'pets': args.pets, 'pets_per_client': args.pets_per_client,
+            'duration_s': args.duration, 'encoding': args.encoding
+        },
+        'connected_clients': len(clients),
+        'connect_failures': len(stats.failures),
+        'frames_received': int(len(lat)),
+        'frames_expected': int(expected),
+        'frames_dropped': stats.dropped,
+        'compact_desyncs': stats.desynced,
+        'bytes_per_frame': round(stats.bytes / len(lat), 1) if len(lat) else None,
+        'latency_ms': {
+            'p50': round(float(np.percentile(lat, 50)), 2),
+            'p95': round(float(np.percentile(lat, 95)), 2),
+            'p99': round(float(np.percentile(lat, 99)), 2),
+            'max': round(float(lat.max()), 2),
+            'mean': round(float(lat.mean()), 2)
+        } if len(lat) else None,
+        'server_cpu_percent': round((cpu_end - cpu_start) / wall * 100, 1)
+        if cpu_start is not None and cpu_end is not None else None,
+        'measured_at': datetime.now().isoformat()
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[OK] Report written to {args.report}")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Socket.IO fan-out load generator')
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--pets', type=int, default=20)
+    parser.add_argument('--pets-per-client', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=7, help='Seconds before measuring (ML window fill)')
+    parser.add_argument('--ramp', type=float, default=0, help='Seconds to spread client connects over')
+    parser.add_argument('--interval', type=float, default=1.0, help='Expected seconds between readings')
+    parser.add_argument('--encoding', choices=['json', 'compact'], default='json')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--ports', help='Comma-separated worker ports to spread clients over')
+    parser.add_argument('--spawn', action='store_true', help='Start app.py and measure its CPU')
+    parser.add_argument('--server-pid', type=int, help='PID of an already running app.py')
+    parser.add_argument('--startup-timeout', type=float, default=60)
+    parser.add_argument('--report', help='Write the JSON report to this path')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,219 @@
+"""
+Shared message queue for multi-worker deployments.
+Every API/socket worker attaches a pub/sub client manager to the same queue,
+so an emit on any worker reaches clients connected to every other worker.
+Production can point MESSAGE_QUEUE at Redis (redis://...) or any Kombu URL;
+for local runs, tcp://host:port uses the stand-in broker in this file:
+
+    python message_broker.py --port 6380
+
+The broker simply relays every length-prefixed frame a publisher sends to
+every connected subscriber.
+"""
+import argparse
+import json
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import socketio
+
+DEFAULT_BROKER_PORT = 6380
+DEFAULT_CHANNEL = 'flask-socketio'
+
+_HEADER = struct.Struct('>I')
+
+
+def _send_frame(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            return None
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _recv_frame(sock):
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    return _recv_exact(sock, _HEADER.unpack(header)[0])
+
+
+# ==================== STAND-IN BROKER ====================
+
+class _BrokerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # First line says whether this connection publishes or subscribes
+        role = _recv_exact(self.request, 4)
+        if role == b'SUB\n':
+            self.server.add_subscriber(self.request)
+            # Hold the connection open until the subscriber goes away
+            while self.request.recv(1):
+                pass
+            self.server.remove_subscriber(self.request)
+        elif role == b'PUB\n':
+            while True:
+                frame = _recv_frame(self.request)
+                if frame is None:
+                    break
+                self.server.relay(frame)
+
+
+class MessageBroker(socketserver.ThreadingTCPServer):
+    """Minimal fan-out relay: every published frame goes to every subscriber."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_BROKER_PORT):
+        super().__init__((host, port), _BrokerHandler)
+        self.subscribers = {}  # {socket: send lock}
+        self.lock = threading.Lock()
+        self.relayed = 0
+
+    def add_subscriber(self, sock):
+        with self.lock:
+            self.subscribers[sock] = threading.Lock()
+
+    def remove_subscriber(self, sock):
+        with self.lock:
+            self.subscribers.pop(sock, None)
+
+    def relay(self, frame):
+        with self.lock:
+            targets = list(self.subscribers.items())
+            self.relayed += 1
+        for sock, send_lock in targets:
+            try:
+                with send_lock:
+                    _send_frame(sock, frame)
+            except OSError:
+                self.remove_subscriber(sock)
+
+
+def start_broker(host='127.0.0.1', port=DEFAULT_BROKER_PORT):
+    """Run a broker on a daemon thread (in-process use, e.g. local tests)."""
+    broker = MessageBroker(host, port)
+    thread = threading.Thread(target=broker.serve_forever, daemon=True)
+    thread.start()
+    return broker
+
+
+# ==================== CLIENT MANAGERS ====================
+
+class ControlChannelMixin:
+    """
+    Lets the application send its own control messages (shard commands)
+    over the same queue as socket.io traffic. Control messages are handed
+    to control_handler on every other worker and never reach socket.io.
+    """
+    control_handler = None
+
+    def publish_control(self, body):
+        self._publish({'method': 'control', 'host_id': self.host_id, 'body': body})
+
+    def _listen(self):
+        for message in super()._listen():
+            data = message
+            if isinstance(data, (bytes, str)):
+                try:
+                    data = self.json.loads(data)
+                except ValueError:
+                    continue
+            if isinstance(data, dict) and data.get('method') == 'control':
+                if self.control_handler is not None and data.get('host_id') != self.host_id:
+                    try:
+                        self.control_handler(data['body'])
+                    except Exception as e:
+                        print(f"[Broker] Control handler error: {e}")
+                continue
+            yield data
+
+
+class _BrokerTransport(socketio.PubSubManager):
+    """Publish/listen over the stand-in broker (tcp://host:port)."""
+    name = 'broker'
+
+    def __init__(self, url=f'tcp://127.0.0.1:{DEFAULT_BROKER_PORT}', channel=DEFAULT_CHANNEL,
+                 write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        host, port = url[len('tcp://'):].rsplit(':', 1)
+        self.address = (host, int(port))
+        self.pub = None
+        self.pub_lock = threading.Lock()
+
+    def _connect(self, role):
+        sock = socket.create_connection(self.address)
+        sock.sendall(role)
+        return sock
+
+    def _publish(self, data):
+        frame = self.json.dumps({'channel': self.channel, 'data': data}).encode()
+        with self.pub_lock:
+            for attempt in (1, 2):
+                try:
+                    if self.pub is None:
+                        self.pub = self._connect(b'PUB\n')
+                    _send_frame(self.pub, frame)
+                    return
+                except OSError:
+                    self.pub = None  # Reconnect once, then give up on this message
+                    if attempt == 2:
+                        raise
+
+    def _listen(self):
+        while True:
+            try:
+                sub = self._connect(b'SUB\n')
+            except OSError as e:
+                print(f"[Broker] Cannot reach {self.address}: {e}; retrying")
+                time.sleep(1)
+                continue
+            try:
+                while True:
+                    frame = _recv_frame(sub)
+                    if frame is None:
+                        break  # Broker went away; reconnect
+                    message = json.loads(frame)
+                    if message.get('channel') == self.channel:
+                        yield message['data']
+            except OSError:
+                pass
+            finally:
+                sub.close()
+
+
+class BrokerManager(ControlChannelMixin, _BrokerTransport):
+    """socket.io client manager for the stand-in broker."""
+
+
+def make_client_manager(url, channel=DEFAULT_CHANNEL):
+    """Client manager for MESSAGE_QUEUE, with the control channel mixed in."""
+    if url.startswith('tcp://'):
+        return BrokerManager(url, channel=channel)
+    if url.startswith(('redis://', 'rediss://')):
+        base = socketio.RedisManager
+    else:
+        base = socketio.KombuManager
+    manager_class = type('Control' + base.__name__, (ControlChannelMixin, base), {})
+    return manager_class(url, channel=channel)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local stand-in message broker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_BROKER_PORT)
+    args = parser.parse_args()
+    server = MessageBroker(args.host, args.port)
+    print(f"[Broker] Relaying on tcp://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,164 @@
+"""
+Low-overhead metrics in the Prometheus text format.
+Histograms have fixed buckets, so observe() is a bisect and two additions
+under a lock, with nothing allocated; a stage is timed with two
+perf_counter() calls around it. Gauges are callbacks that read the
+existing get_stats() counters only when /api/metrics is scraped. Each
+process keeps its own registry (inference workers' stage timings stay in
+the worker; the service's round-trip histogram covers them).
+"""
+from bisect import bisect_left
+
+from green_runtime import os_lock
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds: 25 us .. 10 s
+LATENCY_BUCKETS = (0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class HistogramChild:
+    """One label combination of a Histogram."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.lock = os_lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.children = {}  # {label values: HistogramChild}
+        self.lock = os_lock()
+        if not self.labelnames:
+            self.children[()] = HistogramChild(self.buckets)
+
+    def labels(self, *values):
+        """Child for these label values; look it up once and keep it on hot paths."""
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, HistogramChild(self.buckets))
+        return child
+
+    def observe(self, value):
+        self.children[()].observe(value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for values, child in sorted(self.children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ('le',), values + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter read at scrape time: fn() returns a number or {label values: number}."""
+
+    def __init__(self, name, documentation, fn, labelnames=(), kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        value = self.fn()
+        samples = value.items() if isinstance(value, dict) else [((), value)]
+        for values, sample in samples:
+            if sample is None:
+                continue
+            values = values if isinstance(values, tuple) else (values,)
+            lines.append(f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(sample)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}  # {name: metric}, in registration order
+        self.lock = os_lock()
+
+    def _register(self, metric):
+        with self.lock:
+            # Re-registering a name (e.g. a reloaded module) replaces the old metric
+            self.metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        with self.lock:
+            existing = self.metrics.get(name)
+        if isinstance(existing, Histogram):
+            return existing
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, fn, labelnames=()):
+        return self._register(CallbackMetric(name, documentation, fn, labelnames, 'gauge'))
+
+    def counter(self, name, documentation, fn, labelnames=()):
+        return self._register(CallbackMetric(name, documentation, fn, labelnames, 'counter'))
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # One broken callback must not take the whole scrape down
+                lines.append(f'# {metric.name} unavailable: {type(e).__name__}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Histograms timed by several modules
+PREDICT_SECONDS = REGISTRY.histogram(
+    'petmon_predict_stage_seconds', 'Time per stage of a health prediction call', ['stage'])
+SIMULATOR_SECONDS = REGISTRY.histogram(
+    'petmon_simulator_stage_seconds', 'Time per stage of a simulator bucket', ['stage'])
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'petmon_db_query_seconds', 'SQLite statement time (to the first row) in request handlers', ['statement'])
+INFERENCE_REQUEST_SECONDS = REGISTRY.histogram(
+    'petmon_inference_request_seconds', 'Inference service time from submit to result', ['kind'])
@@ -0,0 +1,233 @@
+"""
+Memory-mapped model bundle.
+Unpickling the sklearn models costs every worker process the full load
+time and a private copy of every forest. export_bundle writes the compiled
+forests' node arrays and the scaler as raw .npy buffers next to a manifest;
+ModelBundle maps them read-only, so all workers on a machine share one copy
+through the page cache, and only once a model is first used. Feature names
+and class labels come from model_metadata.json. ModelRegistry keeps the
+first version it serves lazy (warming it in the background) but maps and
+warms every later version before swapping it in.
+
+Usage: python model_bundle.py [models_dir]    (writes models_dir/bundle/)
+"""
+import hashlib
+import json
+import os
+import pickle
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from forest_engine import (compile_model, CompiledForestClassifier, CompiledIsolationForest,
+                           MODELS_DIR, MODEL_FILES)
+from green_runtime import os_lock
+from health_predictor import HealthPredictor
+
+BUNDLE_DIR = 'bundle'
+MANIFEST_FILE = 'manifest.json'
+METADATA_FILE = 'model_metadata.json'
+BUNDLE_FORMAT = 1
+# Everything the health predictor needs from a bundle
+PREDICTOR_MODELS = ('scaler', 'anomaly_detector', 'disease_classifier')
+
+FOREST_KINDS = {
+    'forest_classifier': CompiledForestClassifier,
+    'isolation_forest': CompiledIsolationForest
+}
+
+
+class StandardScaling:
+    """StandardScaler.transform over bundled mean_/scale_ arrays."""
+    with_mean = True
+    with_std = True
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        scaled = np.array(X, dtype=np.float64)
+        scaled -= self.mean_
+        scaled /= self.scale_
+        return scaled
+
+
+class LabelIndex:
+    """LabelEncoder.inverse_transform over the classes in model_metadata.json."""
+
+    def __init__(self, classes):
+        self.classes_ = np.array(classes)
+
+    def inverse_transform(self, y):
+        return self.classes_[np.asarray(y)]
+
+
+class LazyModel:
+    """Stands in for a model and loads it on first attribute access."""
+
+    def __init__(self, load):
+        self._load = load
+        self._model = None
+        self._lock = os_lock()
+
+    def resolve(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+
+def _write_arrays(out_dir, name, arrays, digest):
+    files = {}
+    for key in sorted(arrays):
+        array = np.ascontiguousarray(arrays[key])
+        filename = f'{name}.{key}.npy'
+        path = os.path.join(out_dir, filename)
+        # New file swapped in: workers still mapping the old one keep its pages
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, array)
+        os.replace(path + '.tmp', path)
+        digest.update(filename.encode('utf-8'))
+        digest.update(array.tobytes())
+        files[key] = filename
+    return files
+
+
+def export_bundle(models_dir=MODELS_DIR):
+    """Compile the pickled models in models_dir into models_dir/bundle/."""
+    out_dir = os.path.join(models_dir, BUNDLE_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    digest = hashlib.sha1()
+    entries = {}
+
+    for name in MODEL_FILES + ('scaler',):
+        path = os.path.join(models_dir, f'{name}.pkl')
+        if not os.path.exists(path):
+            print(f"[WARNING] {name}.pkl not found, left out of the bundle")
+            continue
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+        if name == 'scaler':
+            kind, arrays, params = 'standard_scaler', {'mean': model.mean_, 'scale': model.scale_}, {}
+        else:
+            model = compile_model(model)
+            kind = next(k for k, cls in FOREST_KINDS.items() if isinstance(model, cls))
+            arrays, params = model.get_state()
+        digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        entries[name] = {'kind': kind, 'params': params,
+                         'arrays': _write_arrays(out_dir, name, arrays, digest)}
+
+    with open(os.path.join(models_dir, METADATA_FILE)) as f:
+        digest.update(f.read().encode('utf-8'))
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'fingerprint': digest.hexdigest()[:16],
+        'created_at': datetime.now().isoformat(),
+        'models': entries
+    }
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    print(f"[OK] Bundle {manifest['fingerprint']} written to {out_dir} ({', '.join(entries)})")
+    return manifest
+
+
+class ModelBundle:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(os.path.dirname(path), METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+        self.fingerprint = self.manifest['fingerprint']
+        self.features = self.metadata['features']
+        self.classes = self.metadata['classes']
+        self.loaded = {}
+        self.lock = os_lock()
+
+    def __contains__(self, name):
+        return name in self.manifest['models']
+
+    def load(self, name):
+        """Model name over read-only memory maps of its arrays (mapped once)."""
+        with self.lock:
+            if name not in self.loaded:
+                entry = self.manifest['models'][name]
+                arrays = {key: np.load(os.path.join(self.path, filename), mmap_mode='r')
+                          for key, filename in entry['arrays'].items()}
+                if entry['kind'] == 'standard_scaler':
+                    model = StandardScaling(np.asarray(arrays['mean']), np.asarray(arrays['scale']))
+                else:
+                    model = FOREST_KINDS[entry['kind']].from_state(arrays, entry['params'])
+                self.loaded[name] = model
+            return self.loaded[name]
+
+    def lazy(self, name):
+        return LazyModel(lambda: self.load(name))
+
+    def predictor(self):
+        """HealthPredictor over the bundled scaler and forests."""
+        return HealthPredictor(self.load('scaler'), self.load('anomaly_detector'),
+                               self.load('disease_classifier'), LabelIndex(self.classes))
+
+
+def pickle_fingerprint(models_dir=MODELS_DIR):
+    """Identifies the pickled models in models_dir (changes when any file is rewritten)."""
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(models_dir)):
+        if name.endswith('.pkl') or name == METADATA_FILE:
+            stat = os.stat(os.path.join(models_dir, name))
+            digest.update(f'{name}:{stat.st_size}:{stat.st_mtime_ns}'.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def open_bundle(models_dir=MODELS_DIR, required=()):
+    """The bundle in models_dir if it exists, is current and holds every required model."""
+    path = os.path.join(models_dir, BUNDLE_DIR)
+    if not os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        return None
+    bundle = ModelBundle(path)
+    if bundle.manifest.get('format') != BUNDLE_FORMAT or not all(name in bundle for name in required):
+        return None
+    return bundle
+
+
+def load_health_predictor(models_dir=MODELS_DIR, features=None):
+    """
+    (predictor, fingerprint): the bundle's HealthPredictor, mapped on first use,
+    else one over the compiled pickles. A bundle built for other features
+    than the given ones is ignored. Raises if neither can be loaded.
+    """
+    bundle = open_bundle(models_dir, required=PREDICTOR_MODELS)
+    if bundle and features is not None and bundle.features != list(features):
+        print("[WARNING] Model bundle was built for other features; loading the pickles")
+        bundle = None
+    if bundle:
+        return LazyModel(bundle.predictor), bundle.fingerprint
+
+    def load(name):
+        with open(os.path.join(models_dir, f'{name}.pkl'), 'rb') as f:
+            return pickle.load(f)
+    predictor = HealthPredictor(load('scaler'), compile_model(load('anomaly_detector')),
+                                compile_model(load('disease_classifier')), load('label_encoder'))
+    return predictor, pickle_fingerprint(models_dir)
+
+
+def load_trend_classifier(models_dir=MODELS_DIR):
+    """The bundled trend classifier (mapped on first use), else the compiled pickle."""
+    bundle = open_bundle(models_dir, required=('trend_classifier',))
+    if bundle:
+        return bundle.lazy('trend_classifier')
+    with open(os.path.join(models_dir, 'trend_classifier.pkl'), 'rb') as f:
+        return compile_model(pickle.load(f))
+
+
+if __name__ == "__main__":
+    export_bundle(*sys.argv[1:2])
@@ -0,0 +1,244 @@
+"""
+Versioned model registry with hot swapping.
+Shipping a retrained model used to mean restarting app.py, which drops
+every socket stream. The registry directory (models/registry/) holds one
+subdirectory per version, each a complete models directory: the pickles,
+model_metadata.json and the memory-mapped bundle. publish() builds a
+version under a temporary name and renames it into place, so a version
+is never seen half-written.
+
+activate() loads a version next to the one serving, warms it with a few
+predictions and then swaps a single reference: calls already running
+finish on the models they started with, so no prediction is dropped. The
+version it replaced stays loaded for an immediate rollback(). Swap
+callbacks re-point the app's predictors and the simulator. With an
+InferenceService the workers load and keep the versions instead.
+The first version (nothing serving yet) is swapped in unwarmed, so
+bundled models stay mapped on first use and startup does not wait for
+them; a background thread warms it right after. Later versions are warmed
+before the swap, since a version that fails to load must not replace one
+that works.
+Call activate(), rollback() and check() from green threads: only the
+local load and warm-up go to an OS thread (run_blocking), since waiting
+on the inference workers has to stay on the hub.
+
+Usage: python model_registry.py [models_dir] [registry_dir]
+       (publishes the models in models_dir as a new version)
+"""
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from green_runtime import run_blocking
+from model_bundle import (export_bundle, load_health_predictor, load_trend_classifier, LazyModel,
+                          METADATA_FILE, MODELS_DIR)
+
+REGISTRY_DIR = os.path.join(MODELS_DIR, 'registry')
+# Name of the models served straight from the models directory (nothing published yet)
+UNVERSIONED = 'unversioned'
+# Rows of zeros each model predicts after loading, before it serves
+WARMUP_ROWS = 8
+
+
+class ModelVersion:
+    """The loaded and warmed models of one version."""
+
+    def __init__(self, name, path, health, trend, fingerprint):
+        self.name = name
+        self.path = path
+        self.health = health  # HealthPredictor (or an InferenceClient)
+        self.trend = trend    # Trend classifier, None if the version has none
+        self.fingerprint = fingerprint
+        self.loaded_at = datetime.now().isoformat()
+        self.warmup_ms = 0.0
+
+    def describe(self):
+        return {'version': self.name, 'fingerprint': self.fingerprint, 'loaded_at': self.loaded_at,
+                'warmup_ms': self.warmup_ms, 'trend_classifier': self.trend is not None}
+
+
+def _resolve(model):
+    return model.resolve() if isinstance(model, LazyModel) else model
+
+
+class ModelRegistry:
+    def __init__(self, root=REGISTRY_DIR, fallback_dir=MODELS_DIR, features=None, inference=None):
+        self.root = root
+        self.fallback_dir = fallback_dir  # Served while nothing is published
+        self.features = features          # Health feature columns a bundle must match
+        self.inference = inference        # Optional InferenceService running the models
+        self.active = None
+        self.previous = None              # Kept loaded for rollback()
+        self.rejected = set()             # Versions rolled back from or failing to load
+        self.callbacks = []
+        self.lock = threading.Lock()      # One swap at a time
+        self.last_error = None
+        self.stats = {'swaps': 0, 'rollbacks': 0, 'failures': 0}
+
+    def versions(self):
+        """Published versions, oldest first (publish() names them by time)."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if not name.startswith('.') and os.path.exists(os.path.join(self.root, name, METADATA_FILE)))
+
+    def path(self, version):
+        if version == UNVERSIONED:
+            return self.fallback_dir
+        if version not in self.versions():
+            raise KeyError(f'Unknown model version {version}')
+        return os.path.join(self.root, version)
+
+    def publish(self, models_dir=MODELS_DIR, version=None):
+        """Copy the models in models_dir into a new version; returns its name."""
+        version = version or datetime.now().strftime('v%Y%m%d-%H%M%S')
+        target = os.path.join(self.root, version)
+        if os.path.exists(target):
+            raise ValueError(f'Model version {version} already exists')
+        staging = os.path.join(self.root, f'.{version}.tmp')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in os.listdir(models_dir):
+            if name.endswith('.pkl') or name == METADATA_FILE:
+                shutil.copy2(os.path.join(models_dir, name), staging)
+        export_bundle(staging)
+        os.rename(staging, target)
+        print(f"[OK] Published model version {version} to {target}")
+        return version
+
+    def on_swap(self, callback):
+        """Call callback(ModelVersion) after every swap, rollbacks included."""
+        self.callbacks.append(callback)
+
+    def load(self, version, warm=True):
+        """
+        ModelVersion of version, loaded in this process but not serving. With
+        warm=False bundled models are left to map on first use (see warm()).
+        """
+        path = self.path(version)
+        health, fingerprint = load_health_predictor(path, self.features)
+        try:
+            trend = load_trend_classifier(path)
+        except Exception as e:
+            print(f"[WARNING] Model version {version} has no usable trend classifier: {e}")
+            trend = None
+        loaded = ModelVersion(version, path, health, trend, fingerprint)
+        if warm:
+            self.warm(loaded)
+        return loaded
+
+    def warm(self, loaded):
+        """Map loaded's models and run a few predictions through them."""
+        start = time.perf_counter()
+        health = _resolve(loaded.health)
+        health.predict(np.zeros((WARMUP_ROWS, len(health.scaler.mean_))))
+        trend = loaded.trend
+        if trend is not None:
+            try:
+                trend = _resolve(trend)
+                trend.predict_proba(np.zeros((WARMUP_ROWS, trend.n_features_in_)))
+            except Exception as e:
+                print(f"[WARNING] Model version {loaded.name} has no usable trend classifier: {e}")
+                trend = None
+        loaded.health, loaded.trend = health, trend
+        loaded.warmup_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    def _warm_in_background(self, loaded):
+        try:
+            run_blocking(self.warm, loaded)
+        except Exception as e:
+            print(f"[WARNING] Model version {loaded.name} failed to warm up: {e}")
+
+    def _load_in_workers(self, version):
+        # The workers load, warm and keep the versions; this process only holds clients
+        path = self.path(version)
+        start = time.perf_counter()
+        if self.inference.running:
+            fingerprint = self.inference.reload(path)
+        else:
+            self.inference.models_dir = path
+            self.inference.start()
+            if 'health' not in self.inference.kinds:
+                raise RuntimeError('inference workers could not load the health models')
+            fingerprint = self.inference.fingerprint
+        trend = self.inference.client('trend') if 'trend' in self.inference.kinds else None
+        loaded = ModelVersion(version, path, self.inference.client('health'), trend, fingerprint)
+        loaded.warmup_ms = round((time.perf_counter() - start) * 1000, 2)
+        return loaded
+
+    def activate(self, version=None):
+        """
+        Load, warm and swap in version (default: the newest published one,
+        else the models in fallback_dir), and return it. If it fails to load
+        or warm up, the serving version stays and the error is raised.
+        """
+        with self.lock:
+            if version is None:
+                published = [v for v in self.versions() if v not in self.rejected]
+                version = published[-1] if published else UNVERSIONED
+            # Nothing serving yet: swap in unwarmed, bundled models map on first use
+            first = self.active is None
+            try:
+                if self.inference:
+                    loaded = self._load_in_workers(version)
+                else:
+                    loaded = run_blocking(self.load, version, warm=not first)
+            except Exception as e:
+                self.stats['failures'] += 1
+                self.last_error = f'{version}: {type(e).__name__}: {e}'
+                raise
+            self.rejected.discard(version)
+            self.previous, self.active = self.active, loaded
+            self.stats['swaps'] += 1
+            self._notify(loaded)
+            if first and not self.inference:
+                threading.Thread(target=self._warm_in_background, args=(loaded,), daemon=True).start()
+            return loaded
+
+    def rollback(self):
+        """Serve the previous version again; it is still loaded, so this is immediate."""
+        with self.lock:
+            if self.previous is None:
+                raise RuntimeError('No previous model version to roll back to')
+            if self.inference:
+                self.inference.rollback()
+            # The automatic check must not bring the rolled-back version straight back
+            self.rejected.add(self.active.name)
+            self.active, self.previous = self.previous, self.active
+            self.stats['rollbacks'] += 1
+            self._notify(self.active)
+            return self.active
+
+    def check(self):
+        """Activate the newest published version if it is not serving yet; the new ModelVersion or None."""
+        published = [v for v in self.versions() if v not in self.rejected]
+        if not published or (self.active is not None and self.active.name == published[-1]):
+            return None
+        try:
+            return self.activate(published[-1])
+        except Exception as e:
+            # Not retried on every check; activate(version) still can
+            self.rejected.add(published[-1])
+            print(f"[WARNING] Model version {published[-1]} not activated: {e}")
+            return None
+
+    def _notify(self, version):
+        for callback in self.callbacks:
+            callback(version)
+
+    def get_stats(self):
+        return dict(self.stats,
+                    active=self.active.describe() if self.active else None,
+                    previous=self.previous.describe() if self.previous else None,
+                    versions=self.versions(), rejected=sorted(self.rejected), last_error=self.last_error)
+
+
+if __name__ == "__main__":
+    models_dir = sys.argv[1] if len(sys.argv) > 1 else MODELS_DIR
+    registry_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(models_dir, 'registry')
+    ModelRegistry(registry_dir, models_dir).publish(models_dir)
@@ -0,0 +1,192 @@
+"""
+Write-behind persistence for live readings.
+The simulator hands emitted payloads to ReadingWriter, which buffers them
+in a bounded queue and flushes them into health_readings in batches with
+one executemany per transaction, so no SQLite commit sits on the emit path.
+The flush thread starts with the first submit(), however the app was
+started; close() writes out what is still queued.
+Only readings of pets that exist in the pets table are stored: socket
+clients can subscribe to any pet_id, and those streams are not clinical data.
+"""
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from green_runtime import run_blocking
+
+# Flush when this many readings are queued ...
+FLUSH_BATCH_SIZE = 500
+# ... or when the oldest queued reading is this many seconds old
+FLUSH_INTERVAL = 2.0
+# Readings beyond this are dropped (oldest first) and counted as overflow
+MAX_QUEUE_SIZE = 50_000
+
+# Live status values that are not diagnoses
+NON_LABEL_STATUSES = {'analyzing...', 'error'}
+
+# Inserts nothing for a pet_id missing from pets
+INSERT_READING = '''
+    INSERT INTO health_readings
+        (pet_id, timestamp, heart_rate, body_temperature, activity_level, stress_score, health_status)
+    SELECT ?, ?, ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM pets WHERE id = ?)
+'''
+
+
+def reading_row(payload):
+    """Map a live_reading payload onto INSERT_READING's parameters."""
+    # Stored as UTC 'YYYY-MM-DD HH:MM:SS', the CURRENT_TIMESTAMP format the
+    # other rows have, so queries sort and compare them alike
+    ts = datetime.fromisoformat(payload['timestamp']).astimezone(timezone.utc)
+    status = payload.get('ml_status')
+    return (
+        payload['pet_id'],
+        ts.strftime('%Y-%m-%d %H:%M:%S'),
+        payload.get('heart_rate'),
+        payload.get('temperature'),
+        payload.get('activity_level'),
+        payload.get('stress_score'),
+        None if status in NON_LABEL_STATUSES else status,
+        payload['pet_id']
+    )
+
+
+class ReadingWriter:
+    def __init__(self, database, batch_size=FLUSH_BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_queue_size=MAX_QUEUE_SIZE):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.queue = deque()
+        self.oldest_at = None  # Arrival time of the oldest queued reading
+        self.cond = threading.Condition()
+        self.write_lock = threading.Lock()  # Serializes flushes (worker vs. close)
+        self.running = False
+        self.closed = False  # After close(), submit() no longer restarts the thread
+        self.thread = None
+        self.conn = None
+        self.stats = {
+            'queued': 0,
+            'written': 0,
+            'dropped': 0,      # Overflow: readings evicted from a full queue
+            'failed': 0,       # Readings lost to a failed transaction
+            'unknown_pet': 0,  # Readings skipped: their pet_id is not in pets
+            'flushes': 0,
+            'last_flush_ms': 0.0
+        }
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, payloads):
+        """Queue a batch of live_reading payloads (non-blocking)."""
+        if not self.running and not self.closed:
+            self.start()
+        with self.cond:
+            for payload in payloads:
+                if len(self.queue) >= self.max_queue_size:
+                    self.queue.popleft()
+                    self.stats['dropped'] += 1
+                self.queue.append(payload)
+            if self.queue and self.oldest_at is None:
+                self.oldest_at = time.time()
+            self.stats['queued'] += len(payloads)
+            if len(self.queue) >= self.batch_size:
+                self.cond.notify()
+
+    def queue_depth(self):
+        with self.cond:
+            return len(self.queue)
+
+    def get_stats(self):
+        with self.cond:
+            stats = dict(self.stats)
+            stats['queue_depth'] = len(self.queue)
+        return stats
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.running and not self._flush_due():
+                    timeout = self.flush_interval
+                    if self.oldest_at is not None:
+                        timeout = max(0.0, self.oldest_at + self.flush_interval - time.time())
+                    self.cond.wait(timeout)
+                if not self.running:
+                    return
+                batch = self._take(self.batch_size)
+            self._write(batch)
+
+    def _flush_due(self):
+        # Caller holds self.cond
+        if len(self.queue) >= self.batch_size:
+            return True
+        return self.oldest_at is not None and time.time() - self.oldest_at >= self.flush_interval
+
+    def _take(self, limit):
+        # Caller holds self.cond
+        n = min(limit, len(self.queue))
+        batch = [self.queue.popleft() for _ in range(n)]
+        self.oldest_at = time.time() if self.queue else None
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        started = time.time()
+        with self.write_lock:
+            try:
+                rows = [reading_row(p) for p in batch]
+                if self.running:
+                    # The commit blocks in C; keep it off the eventlet hub
+                    written = run_blocking(self._insert, rows)
+                else:
+                    written = self._insert(rows)  # Final flush at exit, thread pool may be gone
+                failed = 0
+            except Exception as e:
+                print(f"[WARNING] Reading flush failed: {e}")
+                written, failed = 0, len(batch)
+        with self.cond:
+            self.stats['written'] += written
+            self.stats['failed'] += failed
+            self.stats['unknown_pet'] += len(batch) - written - failed
+            self.stats['flushes'] += 1
+            self.stats['last_flush_ms'] = (time.time() - started) * 1000
+
+    def _insert(self, rows):
+        # Caller holds self.write_lock
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.database, check_same_thread=False)
+        with self.conn:  # One transaction per batch
+            return self.conn.executemany(INSERT_READING, rows).rowcount
+
+    def flush(self):
+        """Write everything queued so far."""
+        while True:
+            with self.cond:
+                batch = self._take(self.batch_size)
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self):
+        """Stop the worker and flush the remaining queue (call on shutdown)."""
+        with self.cond:
+            self.running = False
+            self.closed = True
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join(timeout=self.flush_interval * 2)
+            self.thread = None
+        self.flush()
+        with self.write_lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
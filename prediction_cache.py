@@ -0,0 +1,112 @@
+"""
+Quantized-feature prediction cache.
+Many readings are near-identical (sleeping pets at night: same hour, sleep
+flag and rounded vitals), yet each one pays for a full scaler, classifier
+and anomaly-detector pass. CachedPredictor snaps every reading to its
+sensor's precision, so readings in the same cell share one cached result
+(and that result never depends on which reading came first), and keeps
+recent results in a bounded LRU with a TTL. bind() clears the cache when
+the loaded models change; a prediction still running on the models swapped
+out is then not cached.
+"""
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from green_runtime import os_lock
+
+# Resolution of each feature, in the order of app.FEATURE_COLUMNS
+SENSOR_PRECISION = {
+    'hour_of_day': 1, 'heart_rate': 1, 'body_temperature': 0.1, 'accel_magnitude': 0.05,
+    'gyro_x': 1, 'gyro_y': 1, 'gyro_z': 1, 'ambient_temperature': 0.5, 'humidity': 1,
+    'activity_level': 1, 'step_count': 1, 'sleep_indicator': 1, 'movement_intensity': 0.1,
+    'distance_meters': 1, 'calories_burned': 0.01, 'stress_score': 1, 'home_distance_m': 5,
+    'geofence_alert': 1
+}
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_CACHE_TTL = 300.0  # Seconds
+
+
+class PredictionCache:
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, precision=SENSOR_PRECISION):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.steps = np.array(list(precision.values()), dtype=np.float64)
+        self.entries = OrderedDict()  # {key: (expires_at, prediction)}, least recent first
+        self.fingerprint = None       # Models the cached predictions came from
+        self.lock = os_lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def quantize(self, features):
+        """(keys, snapped features): one key per row, rows moved onto the precision grid."""
+        cells = np.rint(np.asarray(features, dtype=np.float64) / self.steps).astype(np.int64)
+        return [row.tobytes() for row in cells], cells * self.steps
+
+    def bind(self, fingerprint):
+        """Serve predictions of the models identified by fingerprint; clears on change."""
+        with self.lock:
+            if fingerprint != self.fingerprint:
+                if self.entries:
+                    self.stats['invalidations'] += 1
+                self.entries.clear()
+                self.fingerprint = fingerprint
+
+    def get(self, key, now):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] < now:
+                del self.entries[key]
+                self.stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key, prediction, now, fingerprint=None):
+        """Cache prediction, unless it came from models (fingerprint) no longer bound."""
+        with self.lock:
+            if fingerprint is not None and fingerprint != self.fingerprint:
+                return
+            self.entries[key] = (now + self.ttl, prediction)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats, size=len(self.entries), max_size=self.max_size,
+                         ttl=self.ttl, fingerprint=self.fingerprint)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def _copy(prediction):
+    # Callers may modify what they get back; the cached dict must stay intact
+    return dict(prediction, class_probabilities=dict(prediction['class_probabilities']))
+
+
+class CachedPredictor:
+    """HealthPredictor.predict behind a PredictionCache."""
+
+    def __init__(self, predictor, cache, fingerprint=None):
+        self.predictor = predictor
+        self.cache = cache
+        self.fingerprint = fingerprint  # Models of predictor, as bound to the cache
+
+    def predict(self, features):
+        keys, snapped = self.cache.quantize(features)
+        now = time.monotonic()
+        results = [self.cache.get(key, now) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            for i, prediction in zip(missing, self.predictor.predict(snapped[missing])):
+                self.cache.put(keys[i], prediction, now, self.fingerprint)
+                results[i] = prediction
+        return [_copy(result) for result in results]
@@ -0,0 +1,186 @@
+"""
+Rolling-window features for the trend classifier, for training and serving.
+One definition (FEATURES) and one window kernel (_window_features) serve
+both modes, so training and live inference get bitwise-identical columns:
+  - extract_rolling_features: batch mode over whole arrays or DataFrames,
+    vectorized over every row at once (training, offline analysis)
+  - RollingFeatures: incremental mode, one sample per pet slot per push,
+    keeping only the last window + 1 samples (the live simulator)
+Features, as pandas rolling() computed them when the classifier was trained:
+  - hr/temp/stress means and hr/temp sample std over the last `window` samples
+  - hr/temp trend = x[t] - x[t - window]
+  - features that pandas would leave as NaN are reported as 0
+"""
+import numpy as np
+
+# Input columns, in order; the live store calls body_temperature 'temperature'
+INPUT_COLUMNS = ('heart_rate', 'body_temperature', 'stress_score')
+INPUT_ALIASES = {'body_temperature': ('temperature',)}
+HR, TEMP, STRESS = 0, 1, 2
+
+# (name, statistic, input) of every output column, in training order
+FEATURES = (
+    ('hr_mean', 'mean', HR),
+    ('hr_std', 'std', HR),
+    ('temp_mean', 'mean', TEMP),
+    ('temp_std', 'std', TEMP),
+    ('stress_mean', 'mean', STRESS),
+    ('hr_trend', 'trend', HR),
+    ('temp_trend', 'trend', TEMP),
+)
+FEATURE_NAMES = [name for name, _, _ in FEATURES]
+
+DEFAULT_WINDOW = 5
+BATCH_BLOCK_ROWS = 16384
+
+# Inputs that have a std feature, and the first trend column (trends come last)
+_STD_INPUTS = slice(HR, TEMP + 1)
+_TREND_START = [statistic for _, statistic, _ in FEATURES].index('trend')
+
+
+def _window_features(window, back, full, has_trend, out):
+    """
+    Fill out (n, len(FEATURES)) from window, the last samples oldest first
+    (a sequence of `window` arrays of shape (3, n), one row per input), the
+    samples `window` steps back (3, n), and masks of rows with a full window
+    and with a trend. Sums run sample by sample in window order, so both
+    modes round alike whatever the memory layout.
+    """
+    latest = window[-1]
+    mean = window[0].copy()
+    for sample in window[1:]:
+        mean += sample
+    mean /= len(window)
+    squares = np.zeros((_STD_INPUTS.stop, mean.shape[1]))
+    constant = np.ones(mean.shape, dtype=bool)
+    for sample in window:
+        diff = sample[_STD_INPUTS] - mean[_STD_INPUTS]
+        diff *= diff
+        squares += diff
+        constant &= sample == latest
+    squares /= len(window) - 1
+    std = np.sqrt(squares, out=squares)
+    # A window of equal values (e.g. a vital pinned at its clip bound) has
+    # exactly its value as mean and 0 as std, as pandas reports it
+    np.copyto(mean, latest, where=constant)
+    np.copyto(std, 0.0, where=constant[_STD_INPUTS])
+    trend = latest - back
+
+    stats = {'mean': mean, 'std': std, 'trend': trend}
+    for column, (_, statistic, source) in enumerate(FEATURES):
+        out[:, column] = stats[statistic][source]
+    out[~full, :_TREND_START] = 0.0
+    out[~has_trend, _TREND_START:] = 0.0
+    return out
+
+
+# ==================== BATCH MODE ====================
+
+def rolling_feature_matrix(values, window=DEFAULT_WINDOW, groups=None):
+    """
+    Features of every row of an (n, 3) array of heart_rate, body_temperature,
+    stress_score. With groups (one id per row, rows of a group contiguous and
+    in time order), windows never reach across a group boundary, as with one
+    RollingFeatures slot per group.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    # Column-major, so every feature is written (and handed to pandas) contiguously
+    out = np.zeros((len(FEATURES), n)).T
+    if n == 0:
+        return out
+
+    # Position of every row in its group (its stream's count - 1)
+    position = np.arange(n)
+    if groups is not None:
+        groups = np.asarray(groups)
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        position -= np.repeat(starts, np.diff(np.r_[starts, n]))
+
+    # Row t's window is values[t - window + 1 .. t], as shifted views of one
+    # zero-padded copy; the padding only reaches rows the masks discard
+    padded = np.zeros((3, window + n))
+    padded[:, window:] = values.T
+    full, has_trend = position >= window - 1, position >= window
+    # Blocks of rows small enough that the kernel's temporaries stay in cache
+    for start in range(0, n, BATCH_BLOCK_ROWS):
+        stop = min(start + BATCH_BLOCK_ROWS, n)
+        samples = [padded[:, start + k:stop + k] for k in range(1, window + 1)]
+        back = padded[:, start:stop]  # values[t - window]
+        _window_features(samples, back, full[start:stop], has_trend[start:stop], out[start:stop])
+    return out
+
+
+def extract_rolling_features(df, window=DEFAULT_WINDOW, group_column=None):
+    """FEATURE_NAMES columns for a DataFrame of readings (one per row, in time order)."""
+    import pandas as pd
+
+    columns = []
+    for name in INPUT_COLUMNS:
+        found = next((c for c in (name,) + INPUT_ALIASES.get(name, ()) if c in df.columns), None)
+        if found is None:
+            raise KeyError(f"DataFrame has no {name} column")
+        columns.append(found)
+    groups = df[group_column].to_numpy() if group_column else None
+    matrix = rolling_feature_matrix(df[columns].to_numpy(dtype=np.float64), window, groups)
+    return pd.DataFrame(matrix, columns=FEATURE_NAMES, index=df.index)
+
+
+# ==================== INCREMENTAL MODE ====================
+
+class RollingFeatures:
+    def __init__(self, window=DEFAULT_WINDOW, capacity=64):
+        self.window = window
+        self.capacity = 0
+        # window + 1 samples are kept so the trend can reach x[t - window]
+        self.samples = np.zeros((0, window + 1, 3))
+        self.count = np.zeros(0, dtype=np.int64)
+        self.features = np.zeros((0, len(FEATURES)))  # Preallocated output rows
+        self.ensure_capacity(capacity)
+
+    def ensure_capacity(self, capacity):
+        if capacity <= self.capacity:
+            return
+        for name in ('samples', 'count', 'features'):
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.capacity] = column
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def reset(self, slot):
+        """Forget everything about a slot (called when it is reallocated)."""
+        if slot >= self.capacity:
+            # Doubling, like VitalsStore, keeps a run of new slots linear
+            self.ensure_capacity(max(slot + 1, self.capacity * 2))
+        self.count[slot] = 0
+        self.samples[slot] = 0
+        self.features[slot] = 0
+
+    def ready(self, slots):
+        """Mask of slots whose window is full (pandas would emit non-NaN stats)."""
+        return self.count[slots] >= self.window
+
+    def push(self, slots, values):
+        """
+        Add one sample per slot and refresh their feature rows.
+
+        Args:
+            slots: int array of pet slots
+            values: (len(slots), 3) array of heart_rate, temperature, stress_score
+        """
+        w = self.window
+        size = w + 1
+        count = self.count[slots]
+        self.samples[slots, count % size] = values
+        count += 1
+        self.count[slots] = count
+
+        # The last w samples, oldest first, and x[t - window] from the ring;
+        # slots not yet full read zeros there, which the masks discard
+        rows = self.samples[slots].transpose(2, 0, 1)  # (3, len(slots), size)
+        index = np.arange(len(slots))
+        window = [rows[:, index, (count - w + k) % size] for k in range(w)]
+        back = rows[:, index, (count - 1 - w) % size]
+        self.features[slots] = _window_features(window, back, count >= w, count > w,
+                                                np.empty((len(slots), len(FEATURES))))
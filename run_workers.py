@@ -0,0 +1,51 @@
+"""
+Local multi-worker launcher.
+Starts the stand-in message broker and N app.py workers on consecutive
+ports, each simulating its share of the pets. Put a load balancer with
+sticky sessions (or websocket-only clients) in front for real traffic.
+
+Usage: python run_workers.py --workers 4 --base-port 5000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from message_broker import start_broker, DEFAULT_BROKER_PORT
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run several API/socket workers on one queue')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--base-port', type=int, default=5000)
+    parser.add_argument('--broker-port', type=int, default=DEFAULT_BROKER_PORT)
+    args = parser.parse_args()
+
+    start_broker(port=args.broker_port)
+    queue = f"tcp://127.0.0.1:{args.broker_port}"
+    print(f"[OK] Broker on {queue}")
+
+    workers = []
+    for i in range(args.workers):
+        env = dict(os.environ, MESSAGE_QUEUE=queue, WORKER_ID=str(i),
+                   WORKER_COUNT=str(args.workers), PORT=str(args.base_port + i))
+        workers.append(subprocess.Popen([sys.executable, 'app.py'], cwd=ROOT_DIR, env=env))
+        print(f"[OK] Worker {i} on port {args.base_port + i}")
+
+    try:
+        while all(w.poll() is None for w in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for w in workers:
+            w.terminate()
+        for w in workers:
+            w.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Pet sharding for multi-worker deployments.
+Each worker simulates only the pets that a consistent-hash ring assigns to
+it. ShardRouter stands in for the BackgroundSimulator on every worker: the
+subscription layer calls it as usual and it forwards the call to the
+owning worker over the shared message queue. Owners publish their frames
+on the same queue, addressed to the workers that hold listeners for them
+(nothing is published for pets watched only locally), and each of those
+delivers them to its own clients through its ClientFanout, so per-client
+backpressure still applies.
+"""
+import base64
+import bisect
+import hashlib
+import threading
+
+from stream_codec import DeltaDecoder
+
+# Points per worker on the ring; more points, more even spread
+VIRTUAL_NODES = 64
+
+
+def _ring_hash(key):
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    def __init__(self, nodes, replicas=VIRTUAL_NODES):
+        points = sorted((_ring_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        self.keys = [key for key, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def owner(self, key):
+        """Node owning key: the first ring point clockwise from its hash."""
+        i = bisect.bisect(self.keys, _ring_hash(str(key))) % len(self.keys)
+        return self.nodes[i]
+
+
+class ShardFanout:
+    """Publishes frames of owned pets to the workers holding their listeners; each delivers to its own clients."""
+
+    def __init__(self, local, manager, worker_id, holders):
+        self.local = local          # This worker's ClientFanout
+        self.manager = manager
+        self.worker_id = worker_id
+        self.holders = holders      # holders(room) -> set(worker_id) with listeners in room
+        self.mirrors = {}           # {room: DeltaDecoder} compact state of remote pets, for resyncs
+        local.local_only = True
+
+    def emit(self, event, data, room, resync=None):
+        remote = self.holders(room) - {self.worker_id}
+        if remote:
+            binary = isinstance(data, (bytes, bytearray))
+            self.manager.publish_control({
+                'op': 'frame', 'event': event, 'room': room, 'binary': binary, 'to': sorted(remote),
+                'data': base64.b64encode(data).decode('ascii') if binary else data
+            })
+        self.local.emit(event, data, room, resync)
+
+    def deliver(self, body):
+        """Frame published by another worker."""
+        data, resync = body['data'], None
+        if body['binary']:
+            data = base64.b64decode(data)
+            # Track the stream so a lagging client here can get a keyframe
+            mirror = self.mirrors.setdefault(body['room'], DeltaDecoder())
+            mirror.decode(data)
+            resync = mirror.keyframe
+        self.local.emit(body['event'], data, body['room'], resync)
+        # Workers without pets of their own have no tick loop calling flush
+        self.local.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.local, name)
+
+
+class ShardRouter:
+    """BackgroundSimulator stand-in for one worker of a sharded deployment."""
+
+    def __init__(self, simulator, manager, worker_id, worker_count):
+        self.simulator = simulator
+        self.manager = manager
+        self.worker_id = worker_id
+        self.ring = HashRing(range(worker_count))
+        # Owner side: which workers have listeners for each owned pet
+        self.holders = {}  # {pet_id: set(worker_id)}
+        self.compact = {}  # {pet_id: set(worker_id)} with compact listeners
+        self.ward_watchers = {}  # {sid: {ward_id: worker_id}} watchers of wards with pets owned here
+        self.lock = threading.Lock()
+        self.fanout = ShardFanout(simulator.fanout, manager, worker_id, self.room_holders)
+        simulator.fanout = self.fanout
+        manager.control_handler = self._on_control
+
+    def start(self):
+        """Start listening on the queue now, not on the first socket connection."""
+        server = self.manager.server
+        if not server.manager_initialized:
+            server.manager_initialized = True
+            self.manager.initialize()
+
+    def owner(self, pet_id):
+        return self.ring.owner(pet_id)
+
+    def _command(self, pet_id, op, **fields):
+        body = dict(fields, op=op, pet_id=pet_id, worker=self.worker_id, shard=self.owner(pet_id))
+        if body['shard'] == self.worker_id:
+            self._apply(body)
+        else:
+            self.manager.publish_control(body)
+
+    def room_holders(self, room):
+        """Workers with listeners in one of the rooms this worker's simulator emits to."""
+        with self.lock:
+            if room.startswith('pet_'):
+                pet_id, _, encoding = room[len('pet_'):].partition(':')
+                workers = self.compact if encoding == 'compact' else self.holders
+                return set(workers.get(int(pet_id), ()))
+            # Ward snapshots go to the watcher's sid room
+            return set(self.ward_watchers.get(room, {}).values())
+
+    def _on_control(self, body):
+        if body['op'] == 'frame':
+            if self.worker_id in body['to']:
+                self.fanout.deliver(body)
+        elif body['op'] == 'ward' or body.get('shard') == self.worker_id:
+            self._apply(body)
+
+    def _apply(self, body):
+        op, pet_id, worker = body['op'], body.get('pet_id'), body['worker']
+        if op == 'start':
+            with self.lock:
+                self.holders.setdefault(pet_id, set()).add(worker)
+            self.simulator.start_simulation(pet_id)
+        elif op == 'stop':
+            with self.lock:
+                holders = self.holders.get(pet_id, set())
+                holders.discard(worker)
+                idle = not holders
+                if idle:
+                    self.holders.pop(pet_id, None)
+            if idle:
+                self.simulator.stop_simulation(pet_id)
+        elif op == 'compact':
+            with self.lock:
+                workers = self.compact.setdefault(pet_id, set())
+                if body['enabled']:
+                    workers.add(worker)
+                else:
+                    workers.discard(worker)
+                enabled = bool(workers)
+                if not enabled:
+                    del self.compact[pet_id]
+            self.simulator.set_compact(pet_id, enabled)
+        elif op == 'priority':
+            self.simulator.set_priority(pet_id, body['tier'])
+        elif op == 'ward':
+            # Each owner sends the watcher a partial snapshot of its own pets; clients merge by pet_id
+            sid, ward_id = body['sid'], body['ward_id']
+            members = {p for p in body['pet_ids'] if self.owner(p) == self.worker_id}
+            with self.lock:
+                wards = self.ward_watchers.setdefault(sid, {})
+                if members:
+                    wards[ward_id] = worker
+                else:
+                    wards.pop(ward_id, None)
+                if not wards:
+                    del self.ward_watchers[sid]
+            self.simulator.set_ward(ward_id, sid, members)
+
+    # --- BackgroundSimulator interface used by SubscriptionTracker and app.py ---
+
+    def start_simulation(self, pet_id):
+        self._command(pet_id, 'start')
+
+    def stop_simulation(self, pet_id):
+        self._command(pet_id, 'stop')
+
+    def set_compact(self, pet_id, enabled):
+        self._command(pet_id, 'compact', enabled=enabled)
+
+    def set_priority(self, pet_id, tier):
+        """Forwarded to the owner; only local pets can report that they are unknown."""
+        if self.owner(pet_id) == self.worker_id:
+            return self.simulator.set_priority(pet_id, tier)
+        self._command(pet_id, 'priority', tier=tier)
+        return True
+
+    def set_ward(self, ward_id, sid, pet_ids):
+        body = {'op': 'ward', 'ward_id': ward_id, 'sid': sid, 'pet_ids': list(pet_ids),
+                'worker': self.worker_id}
+        self._apply(body)
+        self.manager.publish_control(body)
+
+    def get_stats(self):
+        stats = self.simulator.get_stats()
+        with self.lock:
+            stats['shard'] = {
+                'worker_id': self.worker_id,
+                'workers': len(set(self.ring.nodes)),
+                'remote_holders': sum(1 for w in self.holders.values() if w - {self.worker_id})
+            }
+        return stats
+
+    def __getattr__(self, name):
+        # Everything else (fanout stats, ring-buffer reads, shutdown) is local
+        return getattr(self.simulator, name)
@@ -1,159 +1,448 @@
 import time
+import math
 import threading
 import numpy as np
-import pandas as pd
-import pickle
 import os
-from collections import deque
 from datetime import datetime
 from flask_socketio import SocketIO
 
+from vitals_store import VitalsStore, PetSlot, GeneratorNoise, SeededNoise, HISTORY_WINDOW
+from rolling_features import RollingFeatures, DEFAULT_WINDOW
+from stream_codec import DeltaEncoder
+from backpressure import ClientFanout
+from green_runtime import run_blocking
+from model_bundle import load_trend_classifier, LazyModel
+from metrics import SIMULATOR_SECONDS
+
 # Model paths
 MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
 
+# Scheduler configuration
+TICK_INTERVAL = 1.0  # Seconds between two readings of the same pet
+TICK_BUCKETS = 10    # Pets are spread over this many sub-ticks per interval
+
+# Rolling window size (the one train_advanced trained the classifier with)
+FEATURE_WINDOW = DEFAULT_WINDOW
+
+# Adaptive per-pet tick rate: a pet reads every TIER_PERIODS[tier] intervals
+TIER_CRITICAL, TIER_STABLE = 0, 1
+TIER_NAMES = ('critical', 'stable')
+TIER_PERIODS = np.array([1, 10])  # 1 Hz / 0.1 Hz at the default interval
+STABLE_LABELS = {'healthy'}       # Trend labels that let a pet drop to stable
+PROMOTION_HOLD = 30               # Readings a pet stays critical after its label changes
+
+# Load shedding: inference stride per tier at each shed level. Each overrun
+# sub-tick raises the level; stable pets lose inference frequency first.
+SHED_STRIDES = np.array([[1, 1], [1, 2], [1, 4], [1, 8], [2, 8]])
+SHED_RECOVER_TICKS = 50  # Consecutive sub-ticks under half budget before easing a level
+
+# Per-bucket stage timings (metrics.SIMULATOR_SECONDS)
+STEP_SECONDS = SIMULATOR_SECONDS.labels('step')          # Data evolution and rolling features
+CLASSIFY_SECONDS = SIMULATOR_SECONDS.labels('classify')  # Trend classifier
+EMIT_SECONDS = SIMULATOR_SECONDS.labels('emit')          # Socket.IO fan-out
+PERSIST_SECONDS = SIMULATOR_SECONDS.labels('persist')    # Hand-off to the reading writer
+
 class BackgroundSimulator:
-    def __init__(self, socketio: SocketIO):
+    def __init__(self, socketio: SocketIO, tick_interval=TICK_INTERVAL, n_buckets=TICK_BUCKETS,
+                 history_window=HISTORY_WINDOW, writer=None, seed=None, speed=1.0, source=None,
+                 start_time=None, fanout=None, adaptive=None, inference=None):
         self.socketio = socketio
-        self.active_pets = {}  # {pet_id: {'thread': Thread, 'stop_event': Event, 'state': dict, 'history': deque}}
+        # Optional ReadingWriter for write-behind persistence; replayed data is
+        # synthetic and never reaches health_readings
+        self.writer = writer if source is None else None
+        # Room emits skip clients with a full outbound queue and conflate for them
+        self.fanout = fanout if fanout is not None else ClientFanout(socketio)
+        self.active_pets = {}  # {pet_id: PetSlot}
+        self.wards = {}  # {(ward_id, sid): set(pet_id)} receiving one ward_snapshot per interval
+        self.compact_encoders = {}  # {pet_id: DeltaEncoder} for pets with compact listeners
+        self.store = VitalsStore(history_window=history_window)  # Vitals for every pet, indexed by slot
+        self.features = RollingFeatures(FEATURE_WINDOW, self.store.capacity)
+        # A seed gives every pet its own reproducible noise stream
+        self.noise = SeededNoise(seed) if seed is not None else GeneratorNoise()
+        self.source = source  # Optional ReplaySource replacing the random walk
         self.lock = threading.Lock()
-        self.model = self._load_model()
+        # Optional InferenceService: classify in its worker processes instead
+        self.inference = inference
+        self.model = inference.client('trend') if inference else self._load_model()
+
+        # One scheduler task drives every pet. Each interval is split into
+        # n_buckets sub-ticks and each pet lives in exactly one bucket, so the
+        # per-wakeup work stays small and even as the pet count grows.
+        self.tick_interval = tick_interval
+        self.n_buckets = max(1, int(n_buckets))
+        self.bucket_counts = [0] * self.n_buckets
+        self.stop_event = threading.Event()
+        self.loop_done = threading.Event()
+        self.loop_running = False
+
+        # Tier-based tick rates (off for replays, which must keep their cadence)
+        self.adaptive = source is None if adaptive is None else adaptive
+        self.shed_level = 0
+        self.calm_ticks = 0
+
+        # Virtual clock: speed=1 with no start_time is plain wall-clock time.
+        # Otherwise simulated time starts at start_time and runs at speed x
+        # real time (speed=None: as fast as possible).
+        self.speed = speed
+        self.start_time = start_time
+        self.realtime = speed == 1.0 and start_time is None
+        self.virtual_now = start_time if start_time is not None else time.time()
+        self.stats = {
+            'ticks': 0,
+            'overruns': 0,        # Sub-ticks that finished after the next deadline
+            'skipped_ticks': 0,   # Sub-ticks dropped to stay aligned to wall-clock
+            'last_tick_ms': 0.0,
+            'max_tick_ms': 0.0,
+            'inferences_shed': 0  # Classifier runs skipped by load shedding
+        }
 
     def _load_model(self):
         try:
-            with open(os.path.join(MODELS_DIR, 'trend_classifier.pkl'), 'rb') as f:
-                print("[ML] Trend Classifier loaded successfully")
-                return pickle.load(f)
+            model = load_trend_classifier(MODELS_DIR)
         except Exception as e:
             print(f"[WARNING] Could not load trend classifier: {e}")
             return None
+        if isinstance(model, LazyModel):
+            # Mapped read-only on the first classification, shared across workers
+            print("[ML] Trend Classifier found in the model bundle")
+        else:
+            print("[ML] Trend Classifier loaded and compiled")
+        return model
+
+    def swap_model(self, model):
+        """Classify with model from the next bucket on; returns the one it replaces."""
+        previous, self.model = self.model, model
+        return previous
 
     def start_simulation(self, pet_id):
         with self.lock:
             if pet_id in self.active_pets:
                 return  # Already simulating
 
-            stop_event = threading.Event()
-            # Initial state
-            state = {
-                'heart_rate': 80,
-                'temperature': 38.5,
-                'activity': 10,
-                'stress_score': 20,
-                'timestamp': time.time(),
-                'trend_factor': 0  # Used for ML trend injection
-            }
-            
-            # History buffer for rolling window (size 5 to match training)
-            history = deque(maxlen=5)
-            
-            self.active_pets[pet_id] = {
-                'stop_event': stop_event,
-                'state': state,
-                'history': history
-            }
-            
-            thread = threading.Thread(target=self._simulation_loop, args=(pet_id, stop_event))
-            thread.daemon = True
-            thread.start()
+            # Least loaded bucket keeps sub-ticks balanced
+            bucket = min(range(self.n_buckets), key=lambda b: self.bucket_counts[b])
+            self.bucket_counts[bucket] += 1
+            now = self.now()
+            slot = self.store.allocate(pet_id, bucket, now, self.noise.key_for(pet_id))
+            self.features.reset(slot)
+            if self.source is not None:
+                self.source.attach(slot, pet_id)
+            self.active_pets[pet_id] = PetSlot(pet_id, slot, bucket, now)
+
+            if not self.loop_running:
+                # A socketio background task: a green thread under eventlet
+                self.stop_event.clear()
+                self.loop_done.clear()
+                self.loop_running = True
+                self.socketio.start_background_task(self._tick_loop)
             print(f"Started simulation for pet {pet_id}")
 
     def stop_simulation(self, pet_id):
         with self.lock:
             if pet_id in self.active_pets:
-                self.active_pets[pet_id]['stop_event'].set()
-                del self.active_pets[pet_id]
+                pet = self.active_pets.pop(pet_id)
+                self.bucket_counts[pet.bucket] -= 1
+                self.store.release(pet.slot)
                 print(f"Stopped simulation for pet {pet_id}")
 
-    def _extract_features(self, history):
-        """Calculate features from history buffer matches training logic"""
-        if len(history) < 2:
-            return None
-            
-        df = pd.DataFrame(list(history))
-        
-        # Simple rolling stats (using the whole buffer as the window)
-        features = pd.DataFrame([{
-            'hr_mean': df['heart_rate'].mean(),
-            'hr_std': df['heart_rate'].std() if len(df) > 1 else 0,
-            'temp_mean': df['temperature'].mean(),
-            'temp_std': df['temperature'].std() if len(df) > 1 else 0,
-            'stress_mean': df['stress_score'].mean(),
-            # Simple trend: last - first
-            'hr_trend': df['heart_rate'].iloc[-1] - df['heart_rate'].iloc[0],
-            'temp_trend': df['temperature'].iloc[-1] - df['temperature'].iloc[0]
-        }])
-        
-        return features.fillna(0)
-
-    def _simulation_loop(self, pet_id, stop_event):
-        """Continuous loop generating data every second"""
-        while not stop_event.is_set():
-            with self.lock:
-                pet_data = self.active_pets.get(pet_id)
-                if not pet_data: break
-                current_state = pet_data['state']
-                history = pet_data['history']
-
-            # --- Data Evolution Logic (Time-Series Style) ---
-            new_time = time.time()
-            
-            # Random Walk parameters
-            hr_noise = np.random.normal(0, 2)
-            current_state['heart_rate'] = np.clip(
-                current_state['heart_rate'] + hr_noise, 40, 200
-            )
-
-            current_state['temperature'] = np.clip(
-                current_state['temperature'] + np.random.normal(0, 0.1), 37.0, 41.0
-            )
-            
-            current_state['stress_score'] = np.clip(
-                current_state['stress_score'] + np.random.normal(0, 2), 0, 100
-            )
-
-            # Activity Bursts
-            if np.random.random() > 0.95:
-                current_state['activity'] = np.random.normal(50, 20)
+    def shutdown(self):
+        """Stop the scheduler task (pets stay registered)."""
+        if not self.loop_running:
+            return
+        self.stop_event.set()
+        self.loop_done.wait(timeout=self.tick_interval * 2)
+
+    def now(self):
+        """Current simulated time (epoch seconds)."""
+        return time.time() if self.realtime else self.virtual_now
+
+    def get_stats(self):
+        """Scheduler counters for monitoring."""
+        with self.lock:
+            stats = dict(self.stats)
+            stats['virtual_time'] = self.now()
+            stats['active_pets'] = len(self.active_pets)
+            stats['bucket_sizes'] = list(self.bucket_counts)
+            stats['shed_level'] = self.shed_level
+            tiers = np.bincount(self.store.tier[self.store.active_slots()], minlength=len(TIER_NAMES))
+            stats['tiers'] = dict(zip(TIER_NAMES, tiers.tolist()))
+        return stats
+
+    def set_priority(self, pet_id, tier):
+        """Pin a pet to 'critical' or 'stable', or with None let its trend label decide."""
+        with self.lock:
+            pet = self.active_pets.get(pet_id)
+            if pet is None:
+                return False
+            if tier is None:
+                self.store.tier_pinned[pet.slot] = False
+                return True
+            self.store.tier[pet.slot] = TIER_NAMES.index(tier)
+            self.store.tier_pinned[pet.slot] = True
+            self.store.next_due[pet.slot] = 0  # Take effect on the next sub-tick
+        return True
+
+    def set_ward(self, ward_id, sid, pet_ids):
+        """Define (or with no pets, remove) the members of sid's snapshot of a ward."""
+        with self.lock:
+            if pet_ids:
+                self.wards[(ward_id, sid)] = set(pet_ids)
             else:
-                current_state['activity'] = max(0, current_state['activity'] - 1) # Decay
-
-            current_state['timestamp'] = new_time
-
-            # Update History
-            history.append({
-                'heart_rate': current_state['heart_rate'],
-                'temperature': current_state['temperature'],
-                'stress_score': current_state['stress_score']
-            })
-
-            # --- ML Inference ---
-            status = "analyzing..."
-            confidence = 0
-            
-            if self.model and len(history) >= 5:
-                try:
-                    features = self._extract_features(history)
-                    prediction = self.model.predict(features)[0]
-                    probs = self.model.predict_proba(features)[0]
-                    confidence = max(probs) * 100
-                    status = prediction
-                except Exception as e:
-                    print(f"Inference error: {e}")
-                    status = "error"
-
-            # --- Emit Data ---
+                self.wards.pop((ward_id, sid), None)
+
+    def set_compact(self, pet_id, enabled):
+        """Turn compact frames for a pet on (forcing a keyframe) or off."""
+        with self.lock:
+            if not enabled:
+                self.compact_encoders.pop(pet_id, None)
+                return
+            encoder = self.compact_encoders.setdefault(pet_id, DeltaEncoder())
+            encoder.request_keyframe()  # New listener needs a full frame
+
+    def get_recent_readings(self, pet_id, limit=None):
+        """Readings still in the history ring, oldest first (for chart backfill)."""
+        with self.lock:
+            pet = self.active_pets.get(pet_id)
+            if pet is None:
+                return []
+            timestamps, values = self.store.recent(pet.slot, limit)
+        # Same keys and rounding as live_reading payloads
+        return [{
+            'pet_id': pet_id,
+            'timestamp': datetime.fromtimestamp(ts).isoformat(),
+            'heart_rate': round(hr, 1),
+            'temperature': round(temp, 2),
+            'activity_level': round(activity, 1),
+            'stress_score': round(stress, 1)
+        } for ts, (hr, temp, activity, stress) in zip(timestamps.tolist(), values.tolist())]
+
+    def _classify(self, rows):
+        """Run the trend classifier once over a stacked feature matrix"""
+        # Column order is FEATURE_NAMES; the compiled forest takes a plain array
+        features = np.asarray(rows, dtype=np.float64)
+        model = self.model  # Read once: swap_model() may replace it meanwhile
+        if self.inference:
+            # Runs in a worker process; waiting only parks this green thread
+            probs = model.predict_proba(features)
+        else:
+            # On a real OS thread, so the hub keeps serving sockets and HTTP meanwhile
+            probs = run_blocking(model.predict_proba, features)
+        best = probs.argmax(axis=1)
+        labels = model.classes_[best].tolist()
+        confidences = (probs[np.arange(len(best)), best] * 100).tolist()
+        return labels, confidences
+
+    def _tick_loop(self):
+        """Single scheduler loop, one bucket per sub-tick"""
+        try:
+            self._schedule()
+        finally:
+            self.loop_running = False
+            self.loop_done.set()
+
+    def _schedule(self):
+        period = self.tick_interval / self.n_buckets
+        if self.realtime:
+            # Align deadlines to wall-clock multiples of the sub-tick period
+            next_tick = math.ceil(time.time() / period) * period
+            wall_anchor = virtual_anchor = 0.0
+        else:
+            next_tick = virtual_anchor = self.virtual_now
+            wall_anchor = time.time()
+
+        while not self.stop_event.is_set():
+            # Wall-clock deadline of the next sub-tick (None: unthrottled replay)
+            deadline = wall_anchor + (next_tick - virtual_anchor) / self.speed if self.speed else None
+            if deadline is not None:
+                delay = deadline - time.time()
+                if delay > 0:
+                    self.socketio.sleep(delay)  # Cooperative: yields to the hub
+                    if self.stop_event.is_set():
+                        break
+
+            started = time.time()
+            now = started if self.realtime else next_tick
+            self.virtual_now = now
+            index = int(round(next_tick / period))
+            bucket = index % self.n_buckets
+            self._run_bucket(bucket, now, index // self.n_buckets)
+            if bucket == self.n_buckets - 1:
+                # Every bucket has advanced once since the last snapshot
+                self._emit_wards(now)
+            elapsed = time.time() - started
+
+            self.stats['ticks'] += 1
+            self.stats['last_tick_ms'] = elapsed * 1000
+            self.stats['max_tick_ms'] = max(self.stats['max_tick_ms'], elapsed * 1000)
+
+            next_tick += period
+            if deadline is None:
+                self.socketio.sleep(0)  # Unthrottled replay still yields to the hub
+                continue
+            self._adjust_shedding(elapsed, period / self.speed)
+            now = time.time()
+            behind = now - (deadline + period / self.speed)
+            if behind > 0:
+                self.stats['overruns'] += 1
+                # Real time only: more than a whole sub-tick behind, skip ahead
+                # instead of bursting. Replays never drop simulated data.
+                missed = int(behind // (period / self.speed))
+                if missed and self.realtime:
+                    self.stats['skipped_ticks'] += missed
+                    next_tick += missed * period
+
+    def _adjust_shedding(self, elapsed, budget):
+        """Raise the shed level on an overrun, ease it after a calm stretch"""
+        if elapsed > budget:
+            self.shed_level = min(self.shed_level + 1, len(SHED_STRIDES) - 1)
+            self.calm_ticks = 0
+        elif elapsed < budget / 2 and self.shed_level:
+            self.calm_ticks += 1
+            if self.calm_ticks >= SHED_RECOVER_TICKS:
+                self.shed_level -= 1
+                self.calm_ticks = 0
+        else:
+            self.calm_ticks = 0
+
+    def _retier(self, slots, labels, tick):
+        """Promote pets whose trend label changed or is not stable; demote after the hold"""
+        # Caller holds self.lock
+        store = self.store
+        labels = np.array(labels, dtype=object)
+        previous = store.ml_status[slots]
+        count = store.history_count[slots]
+        changed = (labels != previous) & (previous != "analyzing...") & (previous != "error")
+        auto = ~store.tier_pinned[slots]
+
+        hold = auto & changed
+        store.hold_until[slots[hold]] = count[hold] + PROMOTION_HOLD
+        stable = np.isin(labels, list(STABLE_LABELS))
+        promote = auto & (changed | ~stable) & (store.tier[slots] != TIER_CRITICAL)
+        promoted = slots[promote]
+        store.tier[promoted] = TIER_CRITICAL
+        store.next_due[promoted] = np.minimum(store.next_due[promoted], tick + 1)
+        demote = auto & stable & ~changed & (count >= store.hold_until[slots])
+        store.tier[slots[demote]] = TIER_STABLE
+
+    def _run_bucket(self, bucket, now, tick=None):
+        start = time.perf_counter()
+        with self.lock:
+            if self.adaptive and tick is not None:
+                slots = self.store.due_slots(bucket, tick, TIER_PERIODS)
+            else:
+                slots = self.store.bucket_slots(bucket)
+            if len(slots) == 0:
+                return
+            # --- Data Evolution Logic (vectorized over the whole bucket) ---
+            if self.source is not None:
+                self.source.step(self.store, slots, now)
+            else:
+                self.store.step(slots, self.noise, now)
+            owners = self.store.pet_ids[slots].copy()  # Who held each slot while it was stepped
+            pet_ids = owners.tolist()
+            heart_rate = self.store.heart_rate[slots].tolist()
+            temperature = self.store.temperature[slots].tolist()
+            stress_score = self.store.stress_score[slots].tolist()
+            activity = self.store.activity[slots].tolist()
+
+            # Rolling-window features, updated in place for the whole bucket
+            self.features.push(slots, np.column_stack((
+                self.store.heart_rate[slots],
+                self.store.temperature[slots],
+                self.store.stress_score[slots]
+            )))
+            ready = self.features.ready(slots)
+            # Previous label stands for pets whose inference is skipped
+            status = self.store.ml_status[slots].tolist()
+            confidence = self.store.ml_confidence[slots].tolist()
+            if self.shed_level:
+                strides = SHED_STRIDES[self.shed_level][self.store.tier[slots]]
+                due = self.store.history_count[slots] % strides == 0
+                self.stats['inferences_shed'] += int(np.count_nonzero(ready & ~due))
+                ready &= due
+            ready = np.flatnonzero(ready)
+            rows = self.features.features[slots[ready]]
+            ready = ready.tolist()
+
+        stepped = time.perf_counter()
+        STEP_SECONDS.observe(stepped - start)
+
+        # --- ML Inference (one call for every pet with a full window) ---
+        labels = None
+        if self.model and ready:
+            try:
+                labels, confidences = self._classify(rows)
+                for i, label, conf in zip(ready, labels, confidences):
+                    status[i] = label
+                    confidence[i] = conf
+            except Exception as e:
+                print(f"Inference error: {e}")
+                for i in ready:
+                    status[i] = "error"
+            CLASSIFY_SECONDS.observe(time.perf_counter() - stepped)
+
+        with self.lock:
+            # A pet stopped since the first section may have had its slot reused;
+            # write back only where the same pet still holds the slot
+            kept = self.store.active[slots] & (self.store.pet_ids[slots] == owners)
+            if self.adaptive and tick is not None and labels is not None:
+                retier = kept[ready]
+                self._retier(slots[ready][retier], [label for label, k in zip(labels, retier) if k], tick)
+            self.store.ml_status[slots[kept]] = np.array(status, dtype=object)[kept]
+            self.store.ml_confidence[slots[kept]] = np.array(confidence)[kept]
+
+        # --- Emit Data ---
+        emitting = time.perf_counter()
+        timestamp = datetime.fromtimestamp(now).isoformat()
+        payloads = []
+        for i, pet_id in enumerate(pet_ids):
             payload = {
                 'pet_id': pet_id,
-                'timestamp': datetime.fromtimestamp(new_time).isoformat(),
-                'heart_rate': round(current_state['heart_rate'], 1),
-                'temperature': round(current_state['temperature'], 2),
-                'activity_level': round(current_state['activity'], 1),
-                'stress_score': round(current_state['stress_score'], 1),
-                'ml_status': status,
-                'ml_confidence': round(confidence, 1)
+                'timestamp': timestamp,
+                'heart_rate': round(heart_rate[i], 1),
+                'temperature': round(temperature[i], 2),
+                'activity_level': round(activity[i], 1),
+                'stress_score': round(stress_score[i], 1),
+                'ml_status': status[i],
+                'ml_confidence': round(confidence[i], 1)
             }
-            
-            self.socketio.emit('live_reading', payload, to=f"pet_{pet_id}")
-            
-            # Sleep to match "real-time"
-            time.sleep(1.0)
+            self.fanout.emit('live_reading', payload, f"pet_{pet_id}")
+            payloads.append(payload)
+
+            encoder = self.compact_encoders.get(pet_id)
+            if encoder is not None:
+                # A lagging compact client gets a fresh keyframe, not a stale delta
+                self.fanout.emit('live_reading_compact', encoder.encode(payload),
+                                 f"pet_{pet_id}:compact", resync=encoder.keyframe)
+        self.fanout.flush()
+        persisting = time.perf_counter()
+        EMIT_SECONDS.observe(persisting - emitting)
+
+        # Persisted asynchronously; never blocks on SQLite
+        if self.writer is not None:
+            self.writer.submit(payloads)
+            PERSIST_SECONDS.observe(time.perf_counter() - persisting)
+
+    def _emit_wards(self, now):
+        """One columnar ward_snapshot frame per watcher with the latest vitals of its pets"""
+        frames = []
+        with self.lock:
+            for (ward_id, sid), members in self.wards.items():
+                slots = np.array([self.active_pets[p].slot for p in members if p in self.active_pets],
+                                 dtype=np.int64)
+                store = self.store
+                frames.append((sid, {
+                    'ward_id': ward_id,
+                    'timestamp': datetime.fromtimestamp(now).isoformat(),
+                    'pet_id': store.pet_ids[slots].tolist(),
+                    'heart_rate': np.round(store.heart_rate[slots], 1).tolist(),
+                    'temperature': np.round(store.temperature[slots], 2).tolist(),
+                    'activity_level': np.round(store.activity[slots], 1).tolist(),
+                    'stress_score': np.round(store.stress_score[slots], 1).tolist(),
+                    'ml_status': store.ml_status[slots].tolist(),
+                    'ml_confidence': np.round(store.ml_confidence[slots], 1).tolist()
+                }))
+
+        # Every client sits in a room named after its sid
+        for sid, frame in frames:
+            self.fanout.emit('ward_snapshot', frame, sid)
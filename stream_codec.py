@@ -0,0 +1,298 @@
+"""
+Compact live_reading encoding.
+Opt-in alternative to the JSON payload: a keyframe with every quantized
+field is sent periodically and the frames in between only carry the
+fields that changed, as integer deltas, packed in a MessagePack frame.
+The MessagePack subset needed here is implemented below so the server
+has no extra dependency; any MessagePack decoder can read the frames.
+
+Frame layouts (MessagePack arrays):
+  keyframe: [0, seq, pet_id, ts_ms, hr, temp, activity, stress, confidence, ml_status]
+  delta:    [1, seq, pet_id, dt_ms, mask, <changed deltas...>, <ml_status if bit 5>]
+"""
+import struct
+from datetime import datetime
+
+KEYFRAME, DELTA = 0, 1
+
+# Numeric fields and their quantization (value * scale, rounded)
+FIELDS = ('heart_rate', 'temperature', 'activity_level', 'stress_score', 'ml_confidence')
+SCALES = (10, 100, 10, 10, 10)
+STATUS_BIT = 1 << len(FIELDS)
+
+# A full keyframe is sent at least this often
+KEYFRAME_INTERVAL = 10
+
+
+# ==================== MESSAGEPACK SUBSET ====================
+
+def packb(obj):
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+def _pack(obj, out):
+    if obj is None:
+        out.append(0xc0)
+    elif obj is True:
+        out.append(0xc3)
+    elif obj is False:
+        out.append(0xc2)
+    elif isinstance(obj, int):
+        _pack_int(obj, out)
+    elif isinstance(obj, float):
+        out.append(0xcb)
+        out += struct.pack('>d', obj)
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        n = len(data)
+        if n < 32:
+            out.append(0xa0 | n)
+        elif n < 0x100:
+            out += bytes((0xd9, n))
+        elif n < 0x10000:
+            out.append(0xda)
+            out += struct.pack('>H', n)
+        else:
+            out.append(0xdb)
+            out += struct.pack('>I', n)
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        if n < 0x100:
+            out += bytes((0xc4, n))
+        elif n < 0x10000:
+            out.append(0xc5)
+            out += struct.pack('>H', n)
+        else:
+            out.append(0xc6)
+            out += struct.pack('>I', n)
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            out.append(0x90 | n)
+        elif n < 0x10000:
+            out.append(0xdc)
+            out += struct.pack('>H', n)
+        else:
+            out.append(0xdd)
+            out += struct.pack('>I', n)
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            out.append(0x80 | n)
+        elif n < 0x10000:
+            out.append(0xde)
+            out += struct.pack('>H', n)
+        else:
+            out.append(0xdf)
+            out += struct.pack('>I', n)
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"Cannot pack {type(obj).__name__}")
+
+
+def _pack_int(n, out):
+    if 0 <= n < 0x80:
+        out.append(n)
+    elif -32 <= n < 0:
+        out.append(n & 0xff)
+    elif n >= 0:
+        for code, fmt, limit in ((0xcc, '>B', 0x100), (0xcd, '>H', 0x10000),
+                                 (0xce, '>I', 0x100000000), (0xcf, '>Q', 1 << 64)):
+            if n < limit:
+                out.append(code)
+                out += struct.pack(fmt, n)
+                return
+        raise OverflowError(n)
+    else:
+        for code, fmt, limit in ((0xd0, '>b', 0x80), (0xd1, '>h', 0x8000),
+                                 (0xd2, '>i', 0x80000000), (0xd3, '>q', 1 << 63)):
+            if n >= -limit:
+                out.append(code)
+                out += struct.pack(fmt, n)
+                return
+        raise OverflowError(n)
+
+
+# (struct format, size) for fixed-width MessagePack scalars
+_FIXED = {
+    0xca: ('>f', 4), 0xcb: ('>d', 8),
+    0xcc: ('>B', 1), 0xcd: ('>H', 2), 0xce: ('>I', 4), 0xcf: ('>Q', 8),
+    0xd0: ('>b', 1), 0xd1: ('>h', 2), 0xd2: ('>i', 4), 0xd3: ('>q', 8)
+}
+
+
+def unpackb(data):
+    obj, _ = _unpack(memoryview(data), 0)
+    return obj
+
+
+def _unpack(buf, i):
+    code = buf[i]
+    i += 1
+    if code < 0x80:
+        return code, i
+    if code >= 0xe0:
+        return code - 0x100, i
+    if 0xa0 <= code <= 0xbf:
+        n = code & 0x1f
+        return str(buf[i:i + n], 'utf-8'), i + n
+    if 0x90 <= code <= 0x9f:
+        return _unpack_array(buf, i, code & 0x0f)
+    if 0x80 <= code <= 0x8f:
+        return _unpack_map(buf, i, code & 0x0f)
+    if code == 0xc0:
+        return None, i
+    if code in (0xc2, 0xc3):
+        return code == 0xc3, i
+    if code in _FIXED:
+        fmt, size = _FIXED[code]
+        return struct.unpack_from(fmt, buf, i)[0], i + size
+    if code in (0xd9, 0xda, 0xdb, 0xc4, 0xc5, 0xc6):
+        fmt, size = {0xd9: ('>B', 1), 0xda: ('>H', 2), 0xdb: ('>I', 4),
+                     0xc4: ('>B', 1), 0xc5: ('>H', 2), 0xc6: ('>I', 4)}[code]
+        n = struct.unpack_from(fmt, buf, i)[0]
+        i += size
+        raw = bytes(buf[i:i + n])
+        return (raw.decode('utf-8') if code >= 0xd9 else raw), i + n
+    if code in (0xdc, 0xdd):
+        fmt, size = ('>H', 2) if code == 0xdc else ('>I', 4)
+        return _unpack_array(buf, i + size, struct.unpack_from(fmt, buf, i)[0])
+    if code in (0xde, 0xdf):
+        fmt, size = ('>H', 2) if code == 0xde else ('>I', 4)
+        return _unpack_map(buf, i + size, struct.unpack_from(fmt, buf, i)[0])
+    raise ValueError(f"Unsupported MessagePack type 0x{code:02x}")
+
+
+def _unpack_array(buf, i, n):
+    items = []
+    for _ in range(n):
+        item, i = _unpack(buf, i)
+        items.append(item)
+    return items, i
+
+
+def _unpack_map(buf, i, n):
+    result = {}
+    for _ in range(n):
+        key, i = _unpack(buf, i)
+        result[key], i = _unpack(buf, i)
+    return result, i
+
+
+# ==================== DELTA ENCODING ====================
+
+def _quantize(payload):
+    return [int(round(payload[name] * scale)) for name, scale in zip(FIELDS, SCALES)]
+
+
+def _timestamp_ms(payload):
+    return int(round(datetime.fromisoformat(payload['timestamp']).timestamp() * 1000))
+
+
+class DeltaEncoder:
+    """Per-pet encoder state; one instance is shared by every compact listener."""
+    __slots__ = ('seq', 'pet_id', 'last_values', 'last_status', 'last_ts', 'since_key', 'force_key')
+
+    def __init__(self):
+        self.seq = 0
+        self.pet_id = None
+        self.last_values = None
+        self.last_status = None
+        self.last_ts = 0
+        self.since_key = 0
+        self.force_key = True
+
+    def request_keyframe(self):
+        """Make the next frame a keyframe (e.g. a new listener joined)."""
+        self.force_key = True
+
+    def encode(self, payload):
+        values = _quantize(payload)
+        status = payload['ml_status']
+        ts = _timestamp_ms(payload)
+        self.seq = (self.seq + 1) & 0xffff
+
+        if self.force_key or self.last_values is None or self.since_key >= KEYFRAME_INTERVAL - 1:
+            frame = [KEYFRAME, self.seq, payload['pet_id'], ts] + values + [status]
+            self.force_key = False
+            self.since_key = 0
+        else:
+            mask, deltas = 0, []
+            for bit, (new, old) in enumerate(zip(values, self.last_values)):
+                if new != old:
+                    mask |= 1 << bit
+                    deltas.append(new - old)
+            frame = [DELTA, self.seq, payload['pet_id'], ts - self.last_ts, mask] + deltas
+            if status != self.last_status:
+                frame[4] |= STATUS_BIT
+                frame.append(status)
+            self.since_key += 1
+
+        self.pet_id = payload['pet_id']
+        self.last_values = values
+        self.last_status = status
+        self.last_ts = ts
+        return packb(frame)
+
+    def keyframe(self):
+        """The last encoded reading as a keyframe at the current seq (resyncs one lagging client)."""
+        return packb([KEYFRAME, self.seq, self.pet_id, self.last_ts] + self.last_values + [self.last_status])
+
+
+class DeltaDecoder:
+    """Rebuilds live_reading payloads from compact frames of one pet."""
+
+    def __init__(self):
+        self.seq = None
+        self.pet_id = None
+        self.values = None
+        self.status = None
+        self.ts = 0
+        self.gaps = 0  # Deltas discarded while waiting for a keyframe
+
+    def decode(self, data):
+        """Returns the payload dict, or None until the stream is in sync."""
+        frame = unpackb(data)
+        kind, seq, pet_id, ts = frame[:4]
+        self.pet_id = pet_id
+        if kind == KEYFRAME:
+            self.values = list(frame[4:4 + len(FIELDS)])
+            self.status = frame[4 + len(FIELDS)]
+            self.ts = ts
+        else:
+            if self.values is None or seq != ((self.seq + 1) & 0xffff):
+                self.gaps += 1
+                self.values = None  # Out of sync until the next keyframe
+                return None
+            mask, rest = frame[4], frame[5:]
+            for bit in range(len(FIELDS)):
+                if mask & (1 << bit):
+                    self.values[bit] += rest.pop(0)
+            if mask & STATUS_BIT:
+                self.status = rest.pop(0)
+            self.ts += ts
+        self.seq = seq
+
+        payload = {
+            'pet_id': pet_id,
+            'timestamp': datetime.fromtimestamp(self.ts / 1000).isoformat()
+        }
+        for name, scale, value in zip(FIELDS[:4], SCALES, self.values):
+            payload[name] = round(value / scale, 2)
+        payload['ml_status'] = self.status
+        payload['ml_confidence'] = round(self.values[4] / SCALES[4], 1)
+        return payload
+
+    def keyframe(self):
+        """Re-encode the current state as a keyframe at the current seq (None until in sync)."""
+        if self.values is None:
+            return None
+        return packb([KEYFRAME, self.seq, self.pet_id, self.ts] + self.values + [self.status])
@@ -0,0 +1,137 @@
+"""
+Reference-counted stream subscriptions.
+Tracks which socket clients listen to each pet, either directly through
+its pet_{id} room or through a ward snapshot subscription, and stops the
+pet's simulation once nobody has listened for a grace period. Ward
+membership is per watcher: each client only ever gets the pets it asked
+for, never what other clients added to a ward of the same name.
+"""
+import threading
+
+# Seconds an empty room keeps its simulation alive (covers page reloads)
+IDLE_GRACE_PERIOD = 30.0
+
+
+class SubscriptionTracker:
+    def __init__(self, simulator, socketio, grace_period=IDLE_GRACE_PERIOD):
+        self.simulator = simulator
+        self.socketio = socketio
+        self.grace_period = grace_period
+        # A listener is a sid (direct pet subscription) or a (sid, ward_id) pair
+        self.listeners = {}     # {pet_id: set(listener)}
+        self.client_pets = {}   # {sid: {listener: set(pet_id)}}
+        self.wards = {}         # {ward_id: {sid: set(pet_id)}}
+        self.compact = {}       # {pet_id: set(sid)} using the compact encoding
+        self.pending_stop = {}  # {pet_id: token} for rooms waiting out the grace period
+        self.lock = threading.Lock()
+
+    def subscribe(self, sid, pet_id, compact=False):
+        """Register sid as a listener of pet_id and make sure it is simulated."""
+        with self.lock:
+            self._acquire(sid, sid, pet_id)
+            count = len(self.listeners[pet_id])
+            if compact:
+                self.compact.setdefault(pet_id, set()).add(sid)
+        self.simulator.start_simulation(pet_id)
+        if compact:
+            self.simulator.set_compact(pet_id, True)
+        return count
+
+    def unsubscribe(self, sid, pet_id):
+        with self.lock:
+            self.client_pets.get(sid, {}).get(sid, set()).discard(pet_id)
+            self._release(sid, pet_id)
+            self._drop_compact(sid, pet_id)
+
+    def subscribe_ward(self, sid, ward_id, pet_ids):
+        """(Re)define the pets sid watches through ward_id's snapshot frame."""
+        listener = (sid, ward_id)
+        wanted = set(pet_ids)
+        with self.lock:
+            current = self.client_pets.get(sid, {}).get(listener, set())
+            for pet_id in current - wanted:
+                current.discard(pet_id)
+                self._release(listener, pet_id)
+            for pet_id in wanted - current:
+                self._acquire(sid, listener, pet_id)
+            self.wards.setdefault(ward_id, {})[sid] = wanted
+        for pet_id in wanted:
+            self.simulator.start_simulation(pet_id)
+        self.simulator.set_ward(ward_id, sid, wanted)
+
+    def unsubscribe_ward(self, sid, ward_id):
+        with self.lock:
+            self._drop_ward(sid, ward_id)
+
+    def disconnect(self, sid):
+        """Drop every subscription held by a disconnected client."""
+        with self.lock:
+            for listener in list(self.client_pets.get(sid, {})):
+                if isinstance(listener, tuple):
+                    self._drop_ward(sid, listener[1])
+            for pet_id in self.client_pets.pop(sid, {}).get(sid, set()):
+                self._release(sid, pet_id)
+                self._drop_compact(sid, pet_id)
+
+    def _drop_compact(self, sid, pet_id):
+        # Caller holds self.lock
+        sids = self.compact.get(pet_id)
+        if sids is None:
+            return
+        sids.discard(sid)
+        if not sids:
+            del self.compact[pet_id]
+            self.simulator.set_compact(pet_id, False)
+
+    def _acquire(self, sid, listener, pet_id):
+        # Caller holds self.lock
+        self.listeners.setdefault(pet_id, set()).add(listener)
+        self.client_pets.setdefault(sid, {}).setdefault(listener, set()).add(pet_id)
+        self.pending_stop.pop(pet_id, None)  # Cancel any scheduled stop
+
+    def _drop_ward(self, sid, ward_id):
+        # Caller holds self.lock
+        listener = (sid, ward_id)
+        for pet_id in self.client_pets.get(sid, {}).pop(listener, set()):
+            self._release(listener, pet_id)
+        ward = self.wards.get(ward_id, {})
+        ward.pop(sid, None)
+        if not ward:
+            self.wards.pop(ward_id, None)
+        self.simulator.set_ward(ward_id, sid, set())
+
+    def _release(self, listener, pet_id):
+        # Caller holds self.lock
+        room = self.listeners.get(pet_id)
+        if room is None:
+            return
+        room.discard(listener)
+        if room:
+            return
+        del self.listeners[pet_id]
+        token = object()
+        self.pending_stop[pet_id] = token
+        self.socketio.start_background_task(self._stop_if_idle, pet_id, token)
+
+    def _stop_if_idle(self, pet_id, token):
+        self.socketio.sleep(self.grace_period)
+        with self.lock:
+            # A newer subscribe (or a newer empty period) owns this pet now
+            if self.pending_stop.get(pet_id) is not token:
+                return
+            del self.pending_stop[pet_id]
+        self.simulator.stop_simulation(pet_id)
+
+    def listener_count(self, pet_id):
+        with self.lock:
+            return len(self.listeners.get(pet_id, ()))
+
+    def listener_counts(self):
+        """Active listeners per pet, plus pets idling towards a stop."""
+        with self.lock:
+            return {
+                'rooms': {str(pet_id): len(listeners) for pet_id, listeners in self.listeners.items()},
+                'wards': {str(ward_id): len(sids) for ward_id, sids in self.wards.items()},
+                'clients': len(self.client_pets),
+                'pending_stop': [str(pet_id) for pet_id in self.pending_stop]
+            }
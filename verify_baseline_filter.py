@@ -0,0 +1,128 @@
+"""
+Checks the bounds on the health prefilter's per-pet state: BaselineFilter
+keeps at most MAX_PETS baselines, dropping the least recently screened pet,
+and calls for evicted pets neither fail nor bring them back. Also checks
+that /api/predict/batch only lets the caller's own pets (any pet for vets)
+reach the baselines: parse_batch_pet_ids is run with owner and vet tokens
+on a copy of pet_health.db that has a second owner.
+
+Usage: python verify_baseline_filter.py
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import numpy as np
+
+import app as server
+from baseline_filter import BaselineFilter, GatedPredictor, MAX_PETS
+from flask_jwt_extended import create_access_token, verify_jwt_in_request
+
+
+class HealthyPredictor:
+    """HealthPredictor stand-in: every row healthy; counts the rows it ran."""
+
+    def __init__(self):
+        self.rows = 0
+
+    def predict(self, features):
+        self.rows += len(features)
+        return [{'health_status': 'healthy', 'health_score': 90, 'is_anomaly': False,
+                 'anomaly_score': 10, 'confidence': 0.9, 'class_probabilities': {'healthy': 0.9}}
+                for _ in range(len(features))]
+
+
+def reading(hour=12):
+    row = np.zeros(len(server.FEATURE_COLUMNS))
+    row[server.FEATURE_COLUMNS.index('hour_of_day')] = hour
+    row[server.FEATURE_COLUMNS.index('heart_rate')] = 90
+    row[server.FEATURE_COLUMNS.index('body_temperature')] = 38.5
+    return row
+
+
+def check_eviction():
+    baselines = BaselineFilter(server.FEATURE_COLUMNS)
+    row = reading().tolist()
+    for pet_id in range(MAX_PETS):
+        baselines.screen(pet_id, row)
+    baselines.screen(0, row)  # Pet 0 is now the most recently screened, pet 1 the least
+    baselines.screen(MAX_PETS, row)
+    stats = baselines.get_stats()
+    checks = [
+        (f'baselines capped at MAX_PETS ({MAX_PETS})', stats['pets'] == MAX_PETS),
+        ('one pet evicted', stats['evicted'] == 1),
+        ('least recently screened pet evicted', 1 not in baselines.pets),
+        ('re-screened pet kept', 0 in baselines.pets and MAX_PETS in baselines.pets)
+    ]
+    baselines.learn(1, row, {'health_status': 'healthy'})
+    checks.append(('learning an evicted pet does not bring it back',
+                   1 not in baselines.pets and baselines.last_prediction(1) is None))
+
+    # A gated batch over more pets than the filter keeps still predicts every row
+    small = BaselineFilter(server.FEATURE_COLUMNS, max_pets=2)
+    models = HealthyPredictor()
+    results = GatedPredictor(models, small).predict(np.array([reading()] * 4), [1, 2, 3, 4])
+    checks.append(('gated batch past the cap predicts every row',
+                   len(results) == 4 and models.rows == 4 and len(small.pets) == 2))
+    return checks
+
+
+def make_database(source, path):
+    """Copy of source plus an owner with one pet; ids of (vet, owner, other owner's pet)."""
+    shutil.copy(source, path)
+    db = sqlite3.connect(path)
+    vet = db.execute("SELECT id FROM users WHERE role = 'vet'").fetchone()[0]
+    owner = db.execute("SELECT owner_id FROM pets GROUP BY owner_id ORDER BY COUNT(*) DESC").fetchone()[0]
+    other = db.execute("INSERT INTO users (email, password_hash, name) VALUES (?, ?, ?)",
+                       ('batch-check@example.com', '$2b$12$unused', 'Batch Check')).lastrowid
+    other_pet = db.execute("INSERT INTO pets (owner_id, name) VALUES (?, ?)", (other, 'Elsewhere')).lastrowid
+    db.commit()
+    db.close()
+    return vet, owner, other_pet
+
+
+def batch_pet_ids(user_id, pet_ids):
+    """parse_batch_pet_ids of a readings payload, as user_id sends it."""
+    with server.app.app_context():
+        token = create_access_token(identity=str(user_id))
+    headers = {'Authorization': f'Bearer {token}'}
+    with server.app.test_request_context(headers=headers):
+        verify_jwt_in_request()
+        return server.parse_batch_pet_ids({'readings': [{'pet_id': p} for p in pet_ids]}, len(pet_ids))
+
+
+def check_batch_pet_ids():
+    workdir = tempfile.mkdtemp()
+    source = server.DATABASE
+    try:
+        server.DATABASE = os.path.join(workdir, 'pet_health.db')
+        vet, owner, other_pet = make_database(source, server.DATABASE)
+        db = sqlite3.connect(server.DATABASE)
+        own = [r[0] for r in db.execute('SELECT id FROM pets WHERE owner_id = ?', (owner,))]
+        db.close()
+        return [
+            ("owner's own pets accepted", batch_pet_ids(owner, own) == own),
+            ("owner sending another owner's pet refused", batch_pet_ids(owner, own + [other_pet]) is None),
+            ('unknown pet refused', batch_pet_ids(owner, [10 ** 9]) is None),
+            ('non-integer pet id refused', batch_pet_ids(owner, [str(own[0])]) is None),
+            ("vet may send any owner's pets", batch_pet_ids(vet, own + [other_pet]) == own + [other_pet])
+        ]
+    finally:
+        server.DATABASE = source
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_checks():
+    print("--- STARTING BASELINE FILTER CHECK ---")
+    ok = True
+    for label, passed in check_eviction() + check_batch_pet_ids():
+        print(f"[{'PASS' if passed else 'FAIL'}] {label}")
+        ok &= bool(passed)
+    print("\n--- BASELINE FILTER CHECK COMPLETE ---")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_checks() else 1)
@@ -0,0 +1,101 @@
+"""
+Checks that the compiled forests in forest_engine.py reproduce sklearn's
+outputs exactly, for the whole dataset at once and row by row.
+
+Usage: python verify_forest_engine.py [models_dir]
+"""
+import json
+import os
+import pickle
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'data'))
+from forest_engine import compile_model, MODELS_DIR, NATIVE_BATCH_ROWS
+from rolling_features import FEATURE_NAMES
+
+DATA_PATH = os.path.join(ROOT_DIR, 'data', 'pet_health_data.csv')
+# Rows also checked one at a time (the live single-reading path)
+SINGLE_ROWS = 200
+
+
+def load(models_dir, name):
+    path = os.path.join(models_dir, f'{name}.pkl')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        model = pickle.load(f)
+    # Threaded prediction sums trees in whatever order threads finish
+    model.n_jobs = 1
+    return model
+
+
+def sensor_features(models_dir):
+    """Scaled sensor matrix as app.predict_health builds it."""
+    with open(os.path.join(models_dir, 'model_metadata.json')) as f:
+        columns = json.load(f)['features']
+    with open(os.path.join(models_dir, 'scaler.pkl'), 'rb') as f:
+        scaler = pickle.load(f)
+    return scaler.transform(pd.read_csv(DATA_PATH)[columns].to_numpy())
+
+
+def trend_features():
+    """Rolling-window features over simulated sequences of every condition."""
+    from train_advanced import AdvancedSimulator, extract_rolling_features
+    np.random.seed(7)
+    sim = AdvancedSimulator()
+    frames = [extract_rolling_features(sim.generate_sequence(c, 400))
+              for c in ('healthy', 'fever_onset', 'anxiety_attack', 'recovering')]
+    return pd.concat(frames)[FEATURE_NAMES].dropna().to_numpy()
+
+
+def compare(label, expected, actual):
+    if np.array_equal(expected, actual):
+        print(f"[PASS] {label}: {len(expected)} rows identical")
+        return True
+    print(f"[FAIL] {label}: max abs difference {np.abs(expected - actual).max():.3e}")
+    return False
+
+
+def check(name, model, X):
+    compiled = compile_model(model)
+    single = X[:SINGLE_ROWS]
+    if hasattr(model, 'predict_proba'):
+        outputs = ('predict_proba', 'predict')
+    else:
+        outputs = ('score_samples', 'decision_function', 'predict')
+    ok = True
+    for method in outputs:
+        ok &= compare(f"{name}.{method}", getattr(model, method)(X), getattr(compiled, method)(X))
+    # Small batches take the NumPy level walk, large ones sklearn's per-tree walk
+    walked = X[:NATIVE_BATCH_ROWS - 1]
+    ok &= compare(f"{name}.{outputs[0]} (level walk)",
+                  getattr(model, outputs[0])(walked), getattr(compiled, outputs[0])(walked))
+    rows = np.concatenate([getattr(compiled, outputs[0])(row) for row in single])
+    ok &= compare(f"{name}.{outputs[0]} (single rows)", getattr(model, outputs[0])(single), rows)
+    return ok
+
+
+def run_checks(models_dir=MODELS_DIR):
+    print("--- STARTING FOREST ENGINE PARITY CHECK ---")
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    X = sensor_features(models_dir)
+    cases = [('disease_classifier', X), ('anomaly_detector', X), ('trend_classifier', None)]
+
+    ok = True
+    for name, features in cases:
+        model = load(models_dir, name)
+        if model is None:
+            print(f"[SKIP] {name}: no {name}.pkl in {models_dir}")
+            continue
+        ok &= check(name, model, features if features is not None else trend_features())
+
+    print("\n--- PARITY CHECK COMPLETE ---")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_checks(*sys.argv[1:2]) else 1)
@@ -0,0 +1,125 @@
+"""
+Checks that the fused HealthPredictor returns exactly the prediction dicts
+of the original predict_health pipeline (separate predict/score_samples/
+predict_proba calls on the sklearn models, then inverse_transform), on the
+sklearn models, the compiled forests and the memory-mapped bundle.
+
+Usage: python verify_fused_predictor.py [models_dir]
+"""
+import os
+import pickle
+import sys
+import warnings
+import pandas as pd
+
+from forest_engine import compile_model, MODELS_DIR
+from health_predictor import HealthPredictor
+from model_bundle import open_bundle, PREDICTOR_MODELS
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(ROOT_DIR, 'data', 'pet_health_data.csv')
+# Same order as app.FEATURE_COLUMNS
+FEATURE_COLUMNS = [
+    'hour_of_day', 'heart_rate', 'body_temperature', 'accel_magnitude',
+    'gyro_x', 'gyro_y', 'gyro_z', 'ambient_temperature', 'humidity',
+    'activity_level', 'step_count', 'sleep_indicator', 'movement_intensity',
+    'distance_meters', 'calories_burned', 'stress_score', 'home_distance_m', 'geofence_alert'
+]
+# Rows also checked one at a time (the predict_health path)
+SINGLE_ROWS = 300
+
+
+def load_models(models_dir):
+    """The pickled predict_health models, or the name of the first one missing."""
+    models = {}
+    for name in ('scaler', 'anomaly_detector', 'disease_classifier', 'label_encoder'):
+        path = os.path.join(models_dir, f'{name}.pkl')
+        if not os.path.exists(path):
+            return name
+        with open(path, 'rb') as f:
+            models[name] = pickle.load(f)
+    # Threaded prediction sums trees in whatever order threads finish
+    models['disease_classifier'].n_jobs = 1
+    return models
+
+
+def reference_predictions(models, features):
+    """The unfused pipeline, as predict_health ran it, for every row."""
+    scaler, anomaly_detector = models['scaler'], models['anomaly_detector']
+    classifier, label_encoder = models['disease_classifier'], models['label_encoder']
+    features_scaled = scaler.transform(features)
+    anomaly_preds = anomaly_detector.predict(features_scaled)
+    anomaly_scores = anomaly_detector.score_samples(features_scaled)
+    disease_preds = classifier.predict(features_scaled)
+    disease_probas = classifier.predict_proba(features_scaled)
+
+    results = []
+    for anomaly_pred, anomaly_score_raw, disease_pred, disease_proba in zip(
+            anomaly_preds, anomaly_scores, disease_preds, disease_probas):
+        anomaly_score = max(0, min(100, 50 - anomaly_score_raw * 100))
+        disease_label = label_encoder.inverse_transform([disease_pred])[0]
+        confidence = float(max(disease_proba))
+        if disease_label == 'healthy':
+            health_score = min(100, max(50, 100 - anomaly_score))
+        else:
+            health_score = max(0, 100 - anomaly_score - (1 - confidence) * 30)
+        results.append({
+            'health_status': disease_label,
+            'health_score': round(health_score, 1),
+            'is_anomaly': bool(anomaly_pred == -1),
+            'anomaly_score': round(anomaly_score, 1),
+            'confidence': round(confidence * 100, 1),
+            'class_probabilities': {
+                label_encoder.classes_[i]: round(float(p) * 100, 1)
+                for i, p in enumerate(disease_proba)
+            }
+        })
+    return results
+
+
+def compare(label, expected, actual):
+    mismatches = [i for i, (e, a) in enumerate(zip(expected, actual)) if e != a]
+    if len(expected) == len(actual) and not mismatches:
+        print(f"[PASS] {label}: {len(expected)} predictions identical")
+        return True
+    first = mismatches[0] if mismatches else min(len(expected), len(actual))
+    print(f"[FAIL] {label}: {len(mismatches)} mismatches, first at row {first}")
+    return False
+
+
+def run_checks(models_dir=MODELS_DIR):
+    print("--- STARTING FUSED PREDICTOR PARITY CHECK ---")
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    models = load_models(models_dir)
+    if isinstance(models, str):
+        print(f"[SKIP] fused predictor: no {models}.pkl in {models_dir} (python data/train_models.py)")
+        print("\n--- PARITY CHECK COMPLETE ---")
+        return True
+    features = pd.read_csv(DATA_PATH)[FEATURE_COLUMNS].to_numpy(dtype=float)
+    expected = reference_predictions(models, features)
+
+    fused = {
+        'sklearn models': HealthPredictor(models['scaler'], models['anomaly_detector'],
+                                          models['disease_classifier'], models['label_encoder']),
+        'compiled models': HealthPredictor(models['scaler'], compile_model(models['anomaly_detector']),
+                                           compile_model(models['disease_classifier']),
+                                           models['label_encoder'])
+    }
+    bundle = open_bundle(models_dir, required=PREDICTOR_MODELS)
+    if bundle is None:
+        print(f"[SKIP] bundled models: no bundle in {models_dir} (python model_bundle.py)")
+    else:
+        fused['bundled models'] = bundle.predictor()
+
+    ok = True
+    for name, predictor in fused.items():
+        ok &= compare(f"{name}, batch", expected, predictor.predict(features))
+        single = [predictor.predict(row[None, :])[0] for row in features[:SINGLE_ROWS]]
+        ok &= compare(f"{name}, single rows", expected[:SINGLE_ROWS], single)
+
+    print("\n--- PARITY CHECK COMPLETE ---")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_checks(*sys.argv[1:2]) else 1)
@@ -0,0 +1,129 @@
+"""
+Checks that ward snapshots are scoped to each watcher: two socket clients
+watching the same ward name with different pets each get frames with only
+their own pets, and subscribe_ward refuses pet ids the caller may not see,
+malformed lists and messages without a valid access token, without
+simulating any of them.
+
+Runs app.py in-process with Flask-SocketIO test clients, on a copy of
+pet_health.db with a second owner added; nothing is persisted.
+
+Usage: python verify_ward_scoping.py
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import app as server
+from flask_jwt_extended import create_access_token
+
+WARD_ID = 'ward_a'
+# Seconds of ticks collected from the simulator
+COLLECT_SECONDS = 3
+
+
+def make_database(source, path):
+    """Copy of source plus an owner with one pet; ids of (vet, owner, other owner's pet)."""
+    shutil.copy(source, path)
+    db = sqlite3.connect(path)
+    vet = db.execute("SELECT id FROM users WHERE role = 'vet'").fetchone()[0]
+    owner = db.execute("SELECT owner_id FROM pets GROUP BY owner_id ORDER BY COUNT(*) DESC").fetchone()[0]
+    other = db.execute("INSERT INTO users (email, password_hash, name) VALUES (?, ?, ?)",
+                       ('ward-check@example.com', '$2b$12$unused', 'Ward Check')).lastrowid
+    other_pet = db.execute("INSERT INTO pets (owner_id, name) VALUES (?, ?)", (other, 'Elsewhere')).lastrowid
+    db.commit()
+    db.close()
+    return vet, owner, other_pet
+
+
+def status_messages(client):
+    return [m['args'][0] for m in client.get_received() if m['name'] == 'status']
+
+
+def ward_pets(client):
+    """Pet ids of every ward_snapshot frame client received."""
+    return [tuple(m['args'][0]['pet_id']) for m in client.get_received()
+            if m['name'] == 'ward_snapshot' and m['args'][0]['ward_id'] == WARD_ID]
+
+
+def run_checks():
+    print("--- STARTING WARD SCOPING CHECK ---")
+    workdir = tempfile.mkdtemp()
+    try:
+        source, server.DATABASE = server.DATABASE, os.path.join(workdir, 'pet_health.db')
+        vet, owner, other_pet = make_database(source, server.DATABASE)
+        server.simulator.writer = None
+        with server.app.app_context():
+            vet_token = create_access_token(identity=str(vet))
+            owner_token = create_access_token(identity=str(owner))
+        db = sqlite3.connect(server.DATABASE)
+        owner_pets = [r[0] for r in db.execute('SELECT id FROM pets WHERE owner_id = ?', (owner,))]
+        db.close()
+        ok = True
+
+        # Refused requests must not start a simulation
+        probe = server.socketio.test_client(server.app)
+        probe.get_received()
+        refused = [
+            ('no token', {'pet_ids': owner_pets[:1]}),
+            ('bad token', {'pet_ids': owner_pets[:1], 'token': 'not-a-jwt'}),
+            ("another owner's pet", {'pet_ids': [other_pet], 'token': owner_token}),
+            ('unknown pet', {'pet_ids': [10 ** 9], 'token': vet_token}),
+            ('non-integer ids', {'pet_ids': ['1', 2.0], 'token': vet_token}),
+            ('too many ids', {'pet_ids': list(range(1, server.MAX_WARD_PETS + 2)), 'token': vet_token})
+        ]
+        for label, message in refused:
+            before = set(server.simulator.active_pets)
+            probe.emit('subscribe_ward', dict(message, ward_id=WARD_ID))
+            statuses = status_messages(probe)
+            started = set(server.simulator.active_pets) - before
+            if statuses and statuses[-1].get('error') and not started:
+                print(f"[PASS] refused: {label}")
+            else:
+                print(f"[FAIL] {label}: {statuses}, started {sorted(started)}")
+                ok = False
+        probe.disconnect()
+
+        # Two watchers of the same ward name, with different pets
+        first = server.socketio.test_client(server.app)
+        second = server.socketio.test_client(server.app)
+        first_pets = {other_pet}
+        second_pets = set(owner_pets)
+        first.emit('subscribe_ward', {'ward_id': WARD_ID, 'pet_ids': sorted(first_pets), 'token': vet_token})
+        second.emit('subscribe_ward', {'ward_id': WARD_ID, 'pet_ids': sorted(second_pets), 'token': owner_token})
+        first.get_received()
+        second.get_received()
+        server.socketio.sleep(COLLECT_SECONDS)
+        for label, client, wanted in (('first', first, first_pets), ('second', second, second_pets)):
+            frames = ward_pets(client)
+            seen = set().union(*frames) if frames else set()
+            if frames and seen == wanted:
+                print(f"[PASS] {label} watcher: {len(frames)} frames, only pets {sorted(wanted)}")
+            else:
+                print(f"[FAIL] {label} watcher: {len(frames)} frames with pets {sorted(seen)}, "
+                      f"expected {sorted(wanted)}")
+                ok = False
+
+        # A watcher leaving must not change the other's frames
+        first.disconnect()
+        second.get_received()
+        server.socketio.sleep(COLLECT_SECONDS)
+        frames = ward_pets(second)
+        if frames and set().union(*frames) == second_pets:
+            print("[PASS] second watcher unaffected by the first leaving")
+        else:
+            print(f"[FAIL] second watcher after the first left: {frames[:3]}")
+            ok = False
+        second.disconnect()
+    finally:
+        server.simulator.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n--- WARD SCOPING CHECK COMPLETE ---")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_checks() else 1)
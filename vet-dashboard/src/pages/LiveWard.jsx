@@ -16,6 +16,18 @@ import TelemetryChart from '../components/TelemetryChart';
 // Max data points for sparkline
 const MAX_HISTORY = 30;
 
+// One ward_snapshot frame per tick carries every bed in the ward
+const WARD_ID = 'ward_a';
+
+const subscribeWard = (patients) => {
+    // The server only simulates pets the token's user may see
+    socket.emit('subscribe_ward', {
+        ward_id: WARD_ID,
+        pet_ids: patients.map(p => p.id),
+        token: localStorage.getItem('token')
+    });
+};
+
 export default function LiveWard() {
     const [patients, setPatients] = useState([]);
     const [liveData, setLiveData] = useState({});
@@ -28,7 +40,7 @@ export default function LiveWard() {
                 const res = await api.get('/vet/patients');
                 setPatients(res.data);
                 if (socket.connected) {
-                    res.data.forEach(p => socket.emit('subscribe_pet', { pet_id: p.id }));
+                    subscribeWard(res.data);
                 }
             } catch (err) {
                 console.error(err);
@@ -37,18 +49,36 @@ export default function LiveWard() {
         fetchPatients();
     }, []);
 
-    const handleLiveReading = useCallback((data) => {
-        setLiveData(prev => ({
-            ...prev,
-            [data.pet_id]: { ...data, lastUpdated: Date.now() }
-        }));
+    // Columnar frame: { pet_id: [...], heart_rate: [...], ml_status: [...], ... }
+    const handleWardSnapshot = useCallback((frame) => {
+        const now = Date.now();
+        setLiveData(prev => {
+            const next = { ...prev };
+            frame.pet_id.forEach((petId, i) => {
+                next[petId] = {
+                    pet_id: petId,
+                    timestamp: frame.timestamp,
+                    heart_rate: frame.heart_rate[i],
+                    temperature: frame.temperature[i],
+                    activity_level: frame.activity_level[i],
+                    stress_score: frame.stress_score[i],
+                    ml_status: frame.ml_status[i],
+                    ml_confidence: frame.ml_confidence[i],
+                    lastUpdated: now
+                };
+            });
+            return next;
+        });
 
         // Update Chart History
         setChartData(prev => {
-            const currentHistory = prev[data.pet_id] || [];
-            const newPoint = { time: Date.now(), value: data.heart_rate };
-            const newHistory = [...currentHistory, newPoint].slice(-MAX_HISTORY);
-            return { ...prev, [data.pet_id]: newHistory };
+            const next = { ...prev };
+            frame.pet_id.forEach((petId, i) => {
+                const currentHistory = prev[petId] || [];
+                const newPoint = { time: now, value: frame.heart_rate[i] };
+                next[petId] = [...currentHistory, newPoint].slice(-MAX_HISTORY);
+            });
+            return next;
         });
     }, []);
 
@@ -57,7 +87,7 @@ export default function LiveWard() {
 
         function onConnect() {
             setIsConnected(true);
-            patients.forEach(p => socket.emit('subscribe_pet', { pet_id: p.id }));
+            if (patients.length) subscribeWard(patients);
         }
 
         function onDisconnect() {
@@ -66,14 +96,17 @@ export default function LiveWard() {
 
         socket.on('connect', onConnect);
         socket.on('disconnect', onDisconnect);
-        socket.on('live_reading', handleLiveReading);
+        socket.on('ward_snapshot', handleWardSnapshot);
 
         return () => {
             socket.off('connect', onConnect);
             socket.off('disconnect', onDisconnect);
-            socket.off('live_reading', handleLiveReading);
+            socket.off('ward_snapshot', handleWardSnapshot);
         };
-    }, [patients, handleLiveReading]);
+    }, [patients, handleWardSnapshot]);
+
+    // Leave the ward when the page unmounts
+    useEffect(() => () => socket.emit('unsubscribe_ward', { ward_id: WARD_ID }), []);
 
     return (
         <div className="p-8 min-h-screen bg-background text-text-primary font-sans">
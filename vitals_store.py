@@ -0,0 +1,233 @@
+"""
+Struct-of-arrays vitals store for the background simulator.
+Every vital lives in its own NumPy array indexed by a pet slot, so one
+simulator tick advances any number of pets with a handful of vector ops.
+Recent readings are kept in a preallocated (n_pets, window, n_vitals)
+ring buffer that also serves short-term chart backfill.
+"""
+import zlib
+import numpy as np
+
+# Initial state for a freshly allocated slot
+INITIAL_VITALS = {
+    'heart_rate': 80.0,
+    'temperature': 38.5,
+    'activity': 10.0,
+    'stress_score': 20.0
+}
+
+# Vitals recorded in the history ring, in column order
+HISTORY_VITALS = ('heart_rate', 'temperature', 'activity', 'stress_score')
+
+# Default ring length: one minute of readings at 1 Hz
+HISTORY_WINDOW = 60
+
+
+def _splitmix64(x):
+    """Vectorized SplitMix64 finalizer over a uint64 array."""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class GeneratorNoise:
+    """Noise from one shared NumPy Generator (fast, not reproducible per pet)."""
+
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def key_for(self, pet_id):
+        return 0
+
+    def draw(self, store, slots):
+        n = len(slots)
+        return self.rng.standard_normal((n, 4)), self.rng.random(n)
+
+
+class SeededNoise:
+    """
+    Per-pet reproducible noise streams.
+    Each pet gets its own key derived from (seed, pet_id) and draws are a
+    counter-based hash of (key, step), so a pet's stream does not depend on
+    which other pets are running or which bucket it lands in.
+    """
+
+    def __init__(self, seed):
+        self.seed = int(seed)
+
+    def key_for(self, pet_id):
+        mixed = np.array([(self.seed << 32) ^ zlib.crc32(str(pet_id).encode())], dtype=np.uint64)
+        return int(_splitmix64(mixed)[0])
+
+    def draw(self, store, slots):
+        n = len(slots)
+        base = _splitmix64(store.rng_key[slots] ^ _splitmix64(store.history_count[slots].astype(np.uint64)))
+        bits = _splitmix64(base[:, None] + np.arange(5, dtype=np.uint64)[None, :])
+        u = (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+        # Box-Muller: two uniform pairs give four standard normals
+        radius = np.sqrt(-2.0 * np.log1p(-u[:, [0, 2]]))
+        angle = 2.0 * np.pi * u[:, [1, 3]]
+        normals = np.empty((n, 4))
+        normals[:, [0, 2]] = radius * np.cos(angle)
+        normals[:, [1, 3]] = radius * np.sin(angle)
+        return normals, u[:, 4]
+
+
+class PetSlot:
+    """Bookkeeping for one simulated pet."""
+    __slots__ = ('pet_id', 'slot', 'bucket', 'started_at')
+
+    def __init__(self, pet_id, slot, bucket, started_at):
+        self.pet_id = pet_id
+        self.slot = slot
+        self.bucket = bucket
+        self.started_at = started_at
+
+
+class VitalsStore:
+    def __init__(self, capacity=64, history_window=HISTORY_WINDOW):
+        self.capacity = 0
+        self.history_window = history_window
+        self.heart_rate = np.empty(0)
+        self.temperature = np.empty(0)
+        self.activity = np.empty(0)
+        self.stress_score = np.empty(0)
+        self.timestamp = np.empty(0)
+        self.bucket = np.empty(0, dtype=np.int32)
+        self.active = np.empty(0, dtype=bool)
+        self.pet_ids = np.empty(0, dtype=object)
+        self.rng_key = np.empty(0, dtype=np.uint64)  # Per-pet noise stream key
+        # Latest trend classifier output per slot
+        self.ml_status = np.empty(0, dtype=object)
+        self.ml_confidence = np.empty(0)
+        # Adaptive tick rate: priority tier, next interval due, readings left promoted
+        self.tier = np.empty(0, dtype=np.int8)
+        self.tier_pinned = np.empty(0, dtype=bool)
+        self.next_due = np.empty(0, dtype=np.int64)
+        self.hold_until = np.empty(0, dtype=np.int64)
+        # History ring: float32 is plenty for display precision
+        self.history = np.empty((0, history_window, len(HISTORY_VITALS)), dtype=np.float32)
+        self.history_ts = np.empty((0, history_window))
+        self.history_count = np.empty(0, dtype=np.int64)
+        self.free_slots = []
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        """Resize every column, keeping existing slots in place."""
+        old = self.capacity
+        for name in ('heart_rate', 'temperature', 'activity', 'stress_score', 'timestamp',
+                     'bucket', 'active', 'pet_ids', 'rng_key', 'ml_status', 'ml_confidence',
+                     'tier', 'tier_pinned', 'next_due', 'hold_until',
+                     'history', 'history_ts', 'history_count'):
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:old] = column
+            setattr(self, name, grown)
+        # Hand out low slots first
+        self.free_slots.extend(range(capacity - 1, old - 1, -1))
+        self.capacity = capacity
+
+    def allocate(self, pet_id, bucket=0, now=0.0, rng_key=0):
+        """Reserve a slot for pet_id and reset its vitals."""
+        if not self.free_slots:
+            self._grow(max(64, self.capacity * 2))
+        slot = self.free_slots.pop()
+        self.heart_rate[slot] = INITIAL_VITALS['heart_rate']
+        self.temperature[slot] = INITIAL_VITALS['temperature']
+        self.activity[slot] = INITIAL_VITALS['activity']
+        self.stress_score[slot] = INITIAL_VITALS['stress_score']
+        self.timestamp[slot] = now
+        self.bucket[slot] = bucket
+        self.active[slot] = True
+        self.pet_ids[slot] = pet_id
+        self.rng_key[slot] = rng_key
+        self.ml_status[slot] = "analyzing..."
+        self.ml_confidence[slot] = 0
+        self.tier[slot] = 0  # Highest priority until the classifier says otherwise
+        self.tier_pinned[slot] = False
+        self.next_due[slot] = 0
+        self.hold_until[slot] = 0
+        self.history_count[slot] = 0
+        return slot
+
+    def release(self, slot):
+        """Return a slot to the free list."""
+        self.active[slot] = False
+        self.pet_ids[slot] = None
+        self.free_slots.append(slot)
+
+    def bucket_slots(self, bucket):
+        """Active slots that belong to the given tick bucket."""
+        return np.flatnonzero(self.active & (self.bucket == bucket))
+
+    def due_slots(self, bucket, tick, periods):
+        """
+        Slots of a bucket whose next reading is due at interval tick; their
+        next due interval is advanced by the period of their tier.
+        """
+        slots = self.bucket_slots(bucket)
+        slots = slots[self.next_due[slots] <= tick]
+        self.next_due[slots] = tick + periods[self.tier[slots]]
+        return slots
+
+    def active_slots(self):
+        return np.flatnonzero(self.active)
+
+    def bucket_sizes(self, n_buckets):
+        return np.bincount(self.bucket[self.active], minlength=n_buckets).tolist()
+
+    def step(self, slots, noise, now=0.0):
+        """Advance the given slots by one random-walk step."""
+        n = len(slots)
+        if n == 0:
+            return
+        normals, uniform = noise.draw(self, slots)
+
+        hr = self.heart_rate[slots] + 2 * normals[:, 0]
+        self.heart_rate[slots] = np.clip(hr, 40, 200, out=hr)
+
+        temp = self.temperature[slots] + 0.1 * normals[:, 1]
+        self.temperature[slots] = np.clip(temp, 37.0, 41.0, out=temp)
+
+        stress = self.stress_score[slots] + 2 * normals[:, 2]
+        self.stress_score[slots] = np.clip(stress, 0, 100, out=stress)
+
+        # Activity: occasional bursts, otherwise linear decay towards rest
+        activity = np.maximum(self.activity[slots] - 1, 0)
+        burst = uniform > 0.95
+        activity[burst] = 50 + 20 * normals[burst, 3]
+        self.activity[slots] = activity
+
+        self.timestamp[slots] = now
+        self.record(slots, now)
+
+    def record(self, slots, now):
+        """Append the current vitals of each slot to its history ring."""
+        pos = self.history_count[slots] % self.history_window
+        for col, name in enumerate(HISTORY_VITALS):
+            self.history[slots, pos, col] = getattr(self, name)[slots]
+        self.history_ts[slots, pos] = now
+        self.history_count[slots] += 1
+
+    def recent(self, slot, limit=None):
+        """
+        Readings of one slot in chronological order.
+
+        Returns:
+            (timestamps, values) where values has one column per HISTORY_VITALS
+        """
+        count = int(self.history_count[slot])
+        n = min(count, self.history_window)
+        if limit is not None:
+            n = min(n, limit)
+        idx = np.arange(count - n, count) % self.history_window
+        return self.history_ts[slot, idx], self.history[slot, idx]
+
+    def nbytes_per_slot(self):
+        """Bytes of array storage behind each slot."""
+        columns = (self.heart_rate, self.temperature, self.activity, self.stress_score,
+                   self.timestamp, self.bucket, self.active, self.pet_ids, self.rng_key,
+                   self.ml_status, self.ml_confidence, self.tier, self.tier_pinned, self.next_due,
+                   self.hold_until, self.history, self.history_ts, self.history_count)
+        return sum(c.nbytes for c in columns) / max(1, self.capacity)